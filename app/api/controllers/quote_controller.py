@@ -1,48 +1,658 @@
+import asyncio
+import contextlib
+import functools
 import logging
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from contextlib import AbstractAsyncContextManager
 from datetime import datetime
 
-from app.api.models import QuoteCategory, QuoteRequest, QuoteResponse
-from app.api.utils import AIClient, PromptBuilder
+from fastapi import HTTPException
+
+from app.api.models import (
+    BatchQuoteRequest,
+    BatchQuoteResponse,
+    QuoteCategory,
+    QuoteRequest,
+    QuoteResponse,
+)
+from app.api.utils import (
+    EMPTY_QUOTE_TEXT,
+    AdmissionController,
+    AdmissionRejected,
+    BaseAIClient,
+    CacheKey,
+    CircuitBreaker,
+    CircuitOpenError,
+    FallbackCorpus,
+    HistoryRecord,
+    LibraryRecord,
+    ModelRouter,
+    NoveltyFilter,
+    PoolKey,
+    Priority,
+    PromptBuilder,
+    QuoteCache,
+    QuoteHistory,
+    QuoteLibrary,
+    QuotePool,
+    ResilientCaller,
+    SingleFlight,
+    create_ai_client,
+    is_retryable,
+    model_tier,
+    preload_backend,
+    track_usage,
+)
+from app.api.utils.metrics import GaugeSample, model_errors, quotes_served
+from app.api.utils.timing import record_stage, stage
+from app.config import settings
 
 
 logger = logging.getLogger(__name__)
 
 
 class QuoteController:
-    def __init__(self):
-        self._ai_client = None
+    def __init__(self, ai_client: BaseAIClient | None = None):
+        self._ai_client = ai_client
         self.prompt_builder = PromptBuilder()
+        self.cache = QuoteCache() if settings.cache_enabled else None
+        self.pool = QuotePool(self._generate_pool_text) if settings.pool_enabled else None
+        self.single_flight = SingleFlight() if settings.single_flight_enabled else None
+        self.admission = (
+            AdmissionController(rate_per_minute=self._admission_rate())
+            if settings.admission_enabled
+            else None
+        )
+        self.resilience = ResilientCaller()
+        self.breaker = CircuitBreaker() if settings.circuit_enabled else None
+        self.fallback = FallbackCorpus() if settings.fallback_enabled else None
+        self.library = QuoteLibrary() if settings.library_enabled else None
+        self.novelty = NoveltyFilter() if settings.novelty_enabled else None
+        self.history = QuoteHistory() if settings.history_enabled else None
+        self._warmup_task: asyncio.Task | None = None
+        self._learn_tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _admission_rate() -> float:
+        """
+        Model calls per minute for admission control.
+
+        The Gemini backend spreads calls over its API keys, each with its own
+        quota (kept by the model router), so the combined rate grows with them.
+        """
+        if settings.ai_backend.lower() != "gemini":
+            return settings.admission_rate_per_minute
+        keys = {key for key in ModelRouter.configured_keys() if key}
+        return settings.admission_rate_per_minute * max(1, len(keys))
 
     @property
-    def ai_client(self):
-        """Lazy initialization of AIClient to avoid startup errors."""
+    def ai_client(self) -> BaseAIClient:
+        """Lazy initialization of the configured backend to avoid startup errors."""
         if self._ai_client is None:
-            self._ai_client = AIClient()
+            self._ai_client = create_ai_client()
         return self._ai_client
 
-    async def generate_quote(self, request: QuoteRequest) -> QuoteResponse:
-        """Generate a quote without retry logic for faster response."""
-        system_prompt = self.prompt_builder.build_system_prompt()
-        user_prompt = self.prompt_builder.build_quote_prompt(
+    async def start(self) -> None:
+        """Start background work (backend warmup, quote pool refill)."""
+        # Once per process: Mangum runs the lifespan around every invocation
+        if settings.ai_warmup and self._ai_client is None and self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self.warmup(), name="backend-warmup")
+        if self.pool is not None:
+            await self.pool.start()
+
+    async def warmup(self) -> None:
+        """Import the backend SDK in a worker thread, off the event loop."""
+        try:
+            await asyncio.to_thread(preload_backend)
+        except Exception as e:
+            logger.warning(f"Backend warmup failed: {e!s}")
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Return the counters of every enabled component, keyed by component name."""
+        components = {
+            "cache": self.cache,
+            "pool": self.pool,
+            "single_flight": self.single_flight,
+            "admission": self.admission,
+            "resilience": self.resilience,
+            "circuit": self.breaker,
+            "library": self.library,
+            "novelty": self.novelty,
+            "history": self.history,
+            # Only the Gemini backend routes over keys and models
+            "router": getattr(self._ai_client, "router", None),
+        }
+        return {
+            name: component.stats()
+            for name, component in components.items()
+            if component is not None
+        }
+
+    def metrics_samples(self) -> Iterable[GaugeSample]:
+        """Gauge samples for /metrics: every numeric component stat, e.g. hit ratios."""
+        for component, stats in self.stats().items():
+            for stat, value in stats.items():
+                if isinstance(value, int | float):
+                    yield (
+                        "swan_component_stat",
+                        "Current counters and ratios of the quote pipeline components.",
+                        {"component": component, "stat": stat},
+                        value,
+                    )
+
+    async def stop(self) -> None:
+        """Stop background work, write pending history and release the quote library mapping."""
+        if self.pool is not None:
+            await self.pool.stop()
+        if self._learn_tasks:
+            await asyncio.gather(*self._learn_tasks, return_exceptions=True)
+        if self.history is not None:
+            await asyncio.to_thread(self.history.flush)
+        if self.library is not None:
+            await asyncio.to_thread(self.library.close)
+
+    async def generate_quote(
+        self, request: QuoteRequest, priority: Priority = Priority.INTERACTIVE
+    ) -> QuoteResponse:
+        """
+        Generate a quote, preferring pre-generated pools and the response cache.
+
+        Requests without topic or style are served from the matching quote pool
+        when it has stock; everything else goes through the cache and then the model,
+        where ``priority`` decides the order in which waiting model calls are admitted.
+        While the backend is failing, quotes come from the local fallback corpus.
+        Quotes too similar to ones served recently are skipped or regenerated.
+        Every served quote is recorded in the quote history.
+        """
+        started, usage = time.perf_counter(), track_usage()
+        with stage("lookup"):
+            quote_text, source, cache_key = await self._lookup(request)
+        if quote_text is None:
+            try:
+                self._check_circuit()
+                quote_text = await self._generate_coalesced(request, priority)
+                for _ in range(settings.novelty_max_regenerations):
+                    if self._is_novel(request, quote_text):
+                        break
+                    quote_text = await self._generate_text(request, priority)
+            except Exception as e:
+                quote_text, source = self._fallback_text(request, e), "fallback"
+            else:
+                source = "model"
+                self._remember(request, cache_key, quote_text)
+        self._mark_served(request, quote_text)
+        response = self._build_response(request, quote_text, source)
+        self._record_history(request, response, started, usage)
+        return response
+
+    async def stream_quote(self, request: QuoteRequest) -> AsyncIterator[str | QuoteResponse]:
+        """
+        Stream a quote as cleaned text deltas, followed by the complete QuoteResponse.
+
+        Pooled, cached and fallback quotes are already complete and arrive as a
+        single delta. A stream that fails before its first delta falls back too.
+        """
+        started, usage = time.perf_counter(), track_usage()
+        with stage("lookup"):
+            quote_text, source, cache_key = await self._lookup(request)
+        if quote_text is None:
+            parts: list[str] = []
+            try:
+                self._check_circuit()
+                with stage("prompt"):
+                    prompt = self._build_prompt(request)
+                queued = time.perf_counter()
+                with self._count_errors():
+                    async with self._admit(Priority.INTERACTIVE), self._guard():
+                        record_stage("queue", time.perf_counter() - queued)
+                        with stage("model"):
+                            async for delta in self.ai_client.stream_quote(
+                                prompt=prompt,
+                                max_tokens=request.max_tokens,
+                                temperature=request.temperature,
+                                tier=model_tier(request.length, request.style),
+                            ):
+                                parts.append(delta)
+                                yield delta
+            except Exception as e:
+                if parts:
+                    raise
+                quote_text, source = self._fallback_text(request, e), "fallback"
+                yield quote_text
+            else:
+                quote_text, source = "".join(parts).strip(), "model"
+                self._remember(request, cache_key, quote_text)
+        else:
+            yield quote_text
+
+        self._mark_served(request, quote_text)
+        response = self._build_response(request, quote_text, source)
+        self._record_history(request, response, started, usage)
+        yield response
+
+    async def _lookup(self, request: QuoteRequest) -> tuple[str | None, str, CacheKey | None]:
+        """
+        Look for a ready quote in the pools, the response cache, then (for requests
+        with a topic) the quote library, skipping quotes that were served recently.
+
+        Returns:
+            tuple: The quote text (None on a miss), where it came from, and the cache
+            key to store a freshly generated quote under (None when caching is disabled).
+        """
+        if self.pool is not None and self._is_poolable(request):
+            pool_key = self._pool_key(request)
+            pooled_text = self._first_novel(request, lambda: self.pool.pop(pool_key))
+            if pooled_text is not None:
+                return pooled_text, "pool", None
+
+        cache_key = QuoteCache.make_key(request) if self.cache is not None else None
+        if cache_key is not None:
+            accept = (lambda text: self._is_novel(request, text)) if self.novelty else None
+            cached_text = self.cache.get(cache_key, accept=accept)
+            if cached_text is not None:
+                return cached_text, "cache", None
+
+        if self.library is not None and request.topic and request.topic.strip():
+            library_text = await self._search_library(request)
+            if library_text is not None:
+                return library_text, "library", None
+        return None, "model", cache_key
+
+    async def _search_library(self, request: QuoteRequest) -> str | None:
+        """Search the quote library in a worker thread, skipping quotes served recently."""
+        search = functools.partial(
+            self.library.search,
+            topic=request.topic,
+            category=request.category.value,
+            language=request.language or "en",
+            length=request.length or "medium",
+            style=PromptBuilder.validate_style(request.style),
+        )
+        attempts = settings.novelty_max_attempts if self.novelty is not None else 1
+        for _ in range(attempts):
+            text = await asyncio.to_thread(search)
+            if text is None or self._is_novel(request, text):
+                return text
+        return None
+
+    def _first_novel(self, request: QuoteRequest, draw: Callable[[], str | None]) -> str | None:
+        """Draw candidates until one was not served recently; None when none qualifies."""
+        attempts = settings.novelty_max_attempts if self.novelty is not None else 1
+        for _ in range(attempts):
+            text = draw()
+            if text is None or self._is_novel(request, text):
+                return text
+        return None
+
+    def _is_novel(self, request: QuoteRequest, quote_text: str) -> bool:
+        if self.novelty is None:
+            return True
+        return self.novelty.is_novel(self._novelty_key(request), quote_text)
+
+    def _mark_served(self, request: QuoteRequest, quote_text: str) -> None:
+        if self.novelty is not None and quote_text and quote_text != EMPTY_QUOTE_TEXT:
+            self.novelty.remember(self._novelty_key(request), quote_text)
+
+    @staticmethod
+    def _novelty_key(request: QuoteRequest) -> tuple[str, str]:
+        return request.category.value, request.language or "en"
+
+    def _check_circuit(self) -> None:
+        """Fail fast while the circuit is open, before coalescing or queueing the call."""
+        if self.breaker is not None:
+            self.breaker.check()
+
+    def _fallback_text(self, request: QuoteRequest, error: Exception) -> str:
+        """
+        Serve a curated quote in place of a failed or rejected model call.
+
+        Raises:
+            Exception: ``error`` itself when it is not a backend failure or the
+            corpus has no quote for the request.
+        """
+        if self.fallback is None or not (
+            is_retryable(error) or isinstance(error, AdmissionRejected)
+        ):
+            raise error
+        quote_text = self._first_novel(
+            request, lambda: self.fallback.pick(request.category.value, request.language or "en")
+        )
+        if quote_text is None:
+            # Everything drawn was served recently; a repeat beats an error here
+            quote_text = self.fallback.pick(request.category.value, request.language or "en")
+        if quote_text is None:
+            raise error
+        fingerprint = PromptBuilder.fingerprint(
+            request.category.value, request.length or "medium", request.language or "en"
+        )
+        logger.warning(f"Serving fallback quote for prompt {fingerprint}: {error!s}")
+        return quote_text
+
+    def _record_history(
+        self,
+        request: QuoteRequest,
+        response: QuoteResponse,
+        started: float,
+        usage: dict[str, int],
+        share: int = 1,
+    ) -> None:
+        """Queue a served quote for the history; ``share`` splits a multi-quote call's tokens."""
+        if self.history is None or response.quote == EMPTY_QUOTE_TEXT:
+            return
+        language = request.language or "en"
+        length = request.length or "medium"
+        self.history.record(
+            HistoryRecord(
+                created_at=response.timestamp,
+                quote=response.quote,
+                category=response.category,
+                language=language,
+                length=length,
+                topic=request.topic,
+                style=request.style,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                source=response.source,
+                prompt=PromptBuilder.fingerprint(request.category.value, length, language),
+                latency_ms=(time.perf_counter() - started) * 1000,
+                prompt_tokens=usage["prompt"] // share,
+                completion_tokens=usage["completion"] // share,
+            )
+        )
+
+    def _remember(self, request: QuoteRequest, cache_key: CacheKey | None, quote_text: str) -> None:
+        """Keep a freshly generated quote in the cache and the quote library."""
+        if not quote_text or quote_text == EMPTY_QUOTE_TEXT:
+            return
+        if cache_key is not None:
+            self.cache.put(cache_key, quote_text)
+        self._learn(request, [quote_text])
+
+    def _learn(self, request: QuoteRequest, texts: list[str]) -> None:
+        """Add generated quotes to the quote library in the background."""
+        if self.library is None or not settings.library_learn:
+            return
+        records = [
+            LibraryRecord(
+                text=text,
+                category=request.category.value,
+                language=request.language or "en",
+                length=request.length or "medium",
+                style=PromptBuilder.validate_style(request.style),
+                topic=request.topic.strip() if request.topic else None,
+            )
+            for text in texts
+        ]
+        task = asyncio.create_task(asyncio.to_thread(self._store_learned, records))
+        self._learn_tasks.add(task)
+        task.add_done_callback(self._learn_tasks.discard)
+
+    def _store_learned(self, records: list[LibraryRecord]) -> None:
+        """Append learned quotes to the library journal, compacting it once it is long."""
+        try:
+            self.library.add_many(records)
+            self.library.compact_if_needed()
+        except Exception as e:
+            logger.warning(f"Could not add generated quotes to the library: {e!s}")
+
+    def _build_prompt(self, request: QuoteRequest) -> str:
+        # The system prompt is the client's system instruction, not part of each prompt
+        return self.prompt_builder.build_quote_prompt(
             category=request.category.value,
             topic=request.topic,
             style=request.style,
             length=request.length or "medium",
             language=request.language or "en",
         )
-        # Combine system and user prompts for Gemini
-        combined_prompt = f"{system_prompt}\n\n{user_prompt}"
 
-        quote_text = await self.ai_client.generate_quote(
-            prompt=combined_prompt, max_tokens=request.max_tokens, temperature=request.temperature
+    async def _generate_coalesced(self, request: QuoteRequest, priority: Priority) -> str:
+        """Generate quote text, sharing the upstream call with identical concurrent requests."""
+        if self.single_flight is None:
+            return await self._generate_text(request, priority)
+
+        quote_text = await self.single_flight.do(
+            QuoteCache.make_key(request),
+            lambda count: self._generate_many(request, count, priority),
         )
-        return QuoteResponse(
-            quote=quote_text,
-            author="Swan",
+        # The shared call returned fewer quotes than waiters; generate this one alone
+        if quote_text is None:
+            quote_text = await self._generate_text(request, priority)
+        return quote_text
+
+    async def _generate_many(
+        self, request: QuoteRequest, count: int, priority: Priority
+    ) -> list[str]:
+        """Generate ``count`` distinct quotes, in a single backend call either way."""
+        if count == 1:
+            return [await self._generate_text(request, priority)]
+        return await self._generate_batch_text(request, count, priority)
+
+    async def _generate_text(
+        self, request: QuoteRequest, priority: Priority = Priority.INTERACTIVE
+    ) -> str:
+        """Generate one quote with the backend; user-facing calls are hedged when slow."""
+        with stage("prompt"):
+            prompt = self._build_prompt(request)
+        return await self._call_backend(
+            prompt=prompt,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            priority=priority,
+            hedge=priority != Priority.BACKGROUND,
+            tier=model_tier(request.length, request.style),
+        )
+
+    async def _call_backend(
+        self,
+        prompt: str,
+        max_tokens: int | None,
+        temperature: float | None,
+        priority: Priority,
+        hedge: bool = False,
+        tier: str | None = None,
+    ) -> str:
+        """
+        Single entry point for non-streaming model calls.
+
+        Each attempt (first try, retry or hedge) passes admission control on its own,
+        so retries and hedges are throttled and queued like any other call. ``tier``
+        tells multi-model backends which models suit the quote.
+        """
+
+        async def attempt() -> str:
+            queued = time.perf_counter()
+            with self._count_errors():
+                # Queue first, so the breaker times the backend call and not the wait
+                async with self._admit(priority), self._guard():
+                    record_stage("queue", time.perf_counter() - queued)
+                    with stage("model"), self.resilience.measure():
+                        return await self.ai_client.generate_quote(
+                            prompt=prompt,
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                            tier=tier,
+                        )
+
+        return await self.resilience.call(attempt, hedge=hedge)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _count_errors() -> Iterator[None]:
+        """Count failed model calls by type (cancelled hedges are not failures)."""
+        try:
+            yield
+        except Exception as e:
+            model_errors.inc(QuoteController._error_type(e))
+            raise
+
+    @staticmethod
+    def _error_type(error: Exception) -> str:
+        """Coarse error type used to label the model error counter."""
+        if isinstance(error, CircuitOpenError):
+            return "circuit_open"
+        if isinstance(error, AdmissionRejected):
+            return "rejected"
+        if isinstance(error, HTTPException):
+            if error.status_code == 504:
+                return "timeout"
+            if error.status_code == 429:
+                return "quota"
+            return "upstream" if error.status_code >= 500 else "invalid"
+        if isinstance(error, TimeoutError):
+            return "timeout"
+        if isinstance(error, ConnectionError):
+            return "connection"
+        return "other"
+
+    def _admit(self, priority: Priority) -> AbstractAsyncContextManager:
+        if self.admission is None:
+            return contextlib.nullcontext()
+        return self.admission.slot(priority)
+
+    def _guard(self) -> AbstractAsyncContextManager:
+        if self.breaker is None:
+            return contextlib.nullcontext()
+        return self.breaker.guard()
+
+    async def generate_batch(self, batch: BatchQuoteRequest) -> BatchQuoteResponse:
+        """
+        Generate several quotes, grouping compatible requests into multi-quote prompts.
+
+        Requests with the same normalized parameters are asked for together in one
+        numbered-list prompt (up to ``batch_group_size`` quotes per prompt). Lone
+        requests, and any quotes a grouped call failed to return, are generated
+        individually and concurrently.
+        """
+        requests = batch.expand()
+        results: list[str | None] = [None] * len(requests)
+        sources = ["model"] * len(requests)
+        # Quotes from grouped calls: (call start, call usage, quotes in the call)
+        grouped: dict[int, tuple[float, dict[str, int], int]] = {}
+
+        groups: dict[CacheKey, list[int]] = {}
+        for index, request in enumerate(requests):
+            groups.setdefault(QuoteCache.make_key(request), []).append(index)
+
+        chunks: list[list[int]] = []
+        singles: list[int] = []
+        for indices in groups.values():
+            for start in range(0, len(indices), settings.batch_group_size):
+                chunk = indices[start : start + settings.batch_group_size]
+                if len(chunk) > 1:
+                    chunks.append(chunk)
+                else:
+                    singles.extend(chunk)
+
+        semaphore = asyncio.Semaphore(settings.batch_concurrency)
+
+        async def run_chunk(chunk: list[int]) -> None:
+            async with semaphore:
+                started, usage = time.perf_counter(), track_usage()
+                try:
+                    texts = await self._generate_batch_text(
+                        requests[chunk[0]], len(chunk), Priority.BATCH
+                    )
+                except Exception as e:
+                    # Leave the slots empty so they are retried one by one below
+                    logger.warning(f"Grouped generation of {len(chunk)} quotes failed: {e!s}")
+                    return
+            request = requests[chunk[0]]
+            for index, text in zip(chunk, texts, strict=False):
+                # Near-duplicates are left empty and regenerated one by one below
+                if self._is_novel(request, text):
+                    results[index] = text
+                    grouped[index] = (started, usage, len(chunk))
+                    self._mark_served(request, text)
+
+        async def run_single(index: int) -> None:
+            async with semaphore:
+                response = await self.generate_quote(requests[index], Priority.BATCH)
+                results[index], sources[index] = response.quote, response.source
+
+        await asyncio.gather(
+            *(run_chunk(chunk) for chunk in chunks), *(run_single(index) for index in singles)
+        )
+        leftovers = [index for index, text in enumerate(results) if text is None]
+        if leftovers:
+            await asyncio.gather(*(run_single(index) for index in leftovers))
+
+        quotes = [
+            self._build_response(request, text, source)
+            for request, text, source in zip(requests, results, sources, strict=True)
+        ]
+        # Quotes generated one by one were recorded by generate_quote
+        for index, (started, usage, share) in grouped.items():
+            self._record_history(requests[index], quotes[index], started, usage, share)
+        return BatchQuoteResponse(quotes=quotes, count=len(quotes))
+
+    async def _generate_batch_text(
+        self, request: QuoteRequest, count: int, priority: Priority = Priority.BATCH
+    ) -> list[str]:
+        """Ask the backend for ``count`` quotes in one call and split the answer."""
+        with stage("prompt"):
+            prompt = self.prompt_builder.build_batch_prompt(
+                category=request.category.value,
+                count=count,
+                topic=request.topic,
+                style=request.style,
+                length=request.length or "medium",
+                language=request.language or "en",
+            )
+        raw_text = await self._call_backend(
+            prompt=prompt,
+            max_tokens=min(settings.max_tokens * count, settings.batch_max_tokens),
+            temperature=request.temperature,
+            priority=priority,
+            tier=model_tier(request.length, request.style),
+        )
+        with stage("cleanup"):
+            texts = self.prompt_builder.parse_batch_response(raw_text, expected=count)
+
+        if self.cache is not None:
+            cache_key = QuoteCache.make_key(request)
+            for text in texts:
+                self.cache.put(cache_key, text)
+        self._learn(request, texts)
+        return texts
+
+    async def _generate_pool_text(self, key: PoolKey) -> str:
+        """Generate one quote for a background pool refill."""
+        request = QuoteRequest(category=key.category, language=key.language, length=key.length)
+        quote_text = await self._generate_text(request, Priority.BACKGROUND)
+        if quote_text == EMPTY_QUOTE_TEXT:
+            raise ValueError("Model returned no quote text")
+        return quote_text
+
+    @staticmethod
+    def _is_poolable(request: QuoteRequest) -> bool:
+        return not (request.topic and request.topic.strip()) and not request.style
+
+    @staticmethod
+    def _pool_key(request: QuoteRequest) -> PoolKey:
+        language = request.language or "en"
+        length = request.length or "medium"
+        return PoolKey(
             category=request.category.value,
-            timestamp=datetime.utcnow().isoformat() + "Z",
+            language=language,
+            length=length,
+            prompt=PromptBuilder.fingerprint(request.category.value, length, language),
         )
 
+    @staticmethod
+    def _build_response(
+        request: QuoteRequest, quote_text: str, source: str = "model"
+    ) -> QuoteResponse:
+        quotes_served.inc(source)
+        with stage("response"):
+            return QuoteResponse(
+                quote=quote_text,
+                author="Swan",
+                category=request.category.value,
+                timestamp=datetime.utcnow().isoformat() + "Z",
+                source=source,
+            )
+
     async def get_random_quote(self) -> QuoteResponse:
         request = QuoteRequest(category=QuoteCategory.RANDOM)
         return await self.generate_quote(request)
@@ -2,7 +2,27 @@
 Data models for the API.
 """
 
-from .quote_models import ErrorResponse, QuoteCategory, QuoteRequest, QuoteResponse
+from .quote_models import (
+    BatchQuoteRequest,
+    BatchQuoteResponse,
+    ErrorResponse,
+    HistoryEntry,
+    HistoryPage,
+    LibraryImportResponse,
+    QuoteCategory,
+    QuoteRequest,
+    QuoteResponse,
+)
 
 
-__all__ = ["ErrorResponse", "QuoteCategory", "QuoteRequest", "QuoteResponse"]
+__all__ = [
+    "BatchQuoteRequest",
+    "BatchQuoteResponse",
+    "ErrorResponse",
+    "HistoryEntry",
+    "HistoryPage",
+    "LibraryImportResponse",
+    "QuoteCategory",
+    "QuoteRequest",
+    "QuoteResponse",
+]
@@ -94,6 +94,10 @@ class QuoteResponse(BaseModel):
     author: str = Field(default="Swan", description="Author attribution")
     category: str = Field(..., description="Category of the quote")
     timestamp: str = Field(..., description="Generation timestamp")
+    source: str = Field(
+        default="model",
+        description="Where the quote came from: 'model', 'cache', 'pool', 'library' or 'fallback'",
+    )
 
     class Config:
         json_schema_extra: ClassVar[dict] = {
@@ -102,10 +106,95 @@ class QuoteResponse(BaseModel):
                 "author": "Swan",
                 "category": "motivation",
                 "timestamp": "2025-10-27T18:30:00Z",
+                "source": "model",
+            }
+        }
+
+
+class BatchQuoteRequest(BaseModel):
+    """Request model for generating several quotes in one call."""
+
+    count: int | None = Field(
+        default=None,
+        description="Number of quotes to generate with the `template` parameters",
+        ge=1,
+        le=50,
+    )
+    template: QuoteRequest | None = Field(
+        default=None, description="Parameters shared by every quote when `count` is used"
+    )
+    requests: list[QuoteRequest] | None = Field(
+        default=None,
+        description="Individual (possibly different) quote requests",
+        min_length=1,
+        max_length=50,
+    )
+
+    @validator("requests", always=True)
+    def validate_mode(cls, v, values):
+        if (v is None) == (values.get("count") is None):
+            raise ValueError("Provide either 'count' (with optional 'template') or 'requests'")
+        return v
+
+    def expand(self) -> list[QuoteRequest]:
+        """Return one QuoteRequest per quote to generate."""
+        if self.requests is not None:
+            return list(self.requests)
+        return [self.template or QuoteRequest()] * self.count
+
+    class Config:
+        json_schema_extra: ClassVar[dict] = {
+            "example": {
+                "count": 5,
+                "template": {"category": "motivation", "language": "en", "length": "short"},
             }
         }
 
 
+class BatchQuoteResponse(BaseModel):
+    """Response model containing several generated quotes, in request order."""
+
+    quotes: list[QuoteResponse] = Field(..., description="Generated quotes")
+    count: int = Field(..., description="Number of quotes returned")
+
+
+class HistoryEntry(BaseModel):
+    """A served quote with the parameters and cost of its generation."""
+
+    id: int = Field(..., description="Entry id, increasing over time")
+    created_at: str = Field(..., description="Timestamp of the quote response")
+    quote: str = Field(..., description="The quote text")
+    category: str = Field(..., description="Category of the quote")
+    language: str = Field(..., description="Language of the quote")
+    length: str = Field(..., description="Requested length")
+    topic: str | None = Field(None, description="Requested topic")
+    style: str | None = Field(None, description="Requested style")
+    temperature: float | None = Field(None, description="Requested temperature")
+    max_tokens: int | None = Field(None, description="Requested token limit")
+    source: str = Field(..., description="Where the quote came from (see QuoteResponse)")
+    prompt: str = Field(..., description="Fingerprint of the generation prompt")
+    latency_ms: float = Field(..., description="Time taken to produce the quote")
+    prompt_tokens: int = Field(..., description="Prompt tokens spent on the quote")
+    completion_tokens: int = Field(..., description="Completion tokens spent on the quote")
+
+
+class HistoryPage(BaseModel):
+    """One page of quote history, newest first."""
+
+    items: list[HistoryEntry] = Field(..., description="Entries of this page")
+    next_cursor: str | None = Field(
+        None, description="Pass as `cursor` to get the next page; null on the last page"
+    )
+
+
+class LibraryImportResponse(BaseModel):
+    """Result of a bulk import into the quote library."""
+
+    imported: int = Field(..., description="Quotes added to the library")
+    skipped: int = Field(..., description="Invalid or duplicate lines")
+    total: int = Field(..., description="Quotes in the library after the import")
+
+
 class ErrorResponse(BaseModel):
     """Error response model."""
 
@@ -113,4 +202,14 @@ class ErrorResponse(BaseModel):
     detail: str | None = Field(None, description="Detailed error information")
 
 
-__all__ = ["ErrorResponse", "QuoteCategory", "QuoteRequest", "QuoteResponse"]
+__all__ = [
+    "BatchQuoteRequest",
+    "BatchQuoteResponse",
+    "ErrorResponse",
+    "HistoryEntry",
+    "HistoryPage",
+    "LibraryImportResponse",
+    "QuoteCategory",
+    "QuoteRequest",
+    "QuoteResponse",
+]
@@ -2,7 +2,8 @@
 API routes for the application.
 """
 
+from .admin_routes import router as admin_router
 from .quote_routes import router as quote_router
 
 
-__all__ = ["quote_router"]
+__all__ = ["admin_router", "quote_router"]
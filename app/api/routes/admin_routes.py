@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.api.models import ErrorResponse, LibraryImportResponse
+from app.api.utils.profiler import profiler
+from app.api.utils.timing import TimedRoute
+from app.config import settings
+
+from .quote_routes import get_controller
+
+
+logger = logging.getLogger(__name__)
+
+
+async def require_admin(x_admin_key: str | None = Header(default=None)) -> None:
+    """Allow the request only with the configured admin key; hide the API when unset."""
+    if not settings.admin_api_key:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.admin_api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    route_class=TimedRoute,
+)
+
+
+@router.post(
+    "/library/import",
+    response_model=LibraryImportResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Bulk-import quotes into the library",
+    description=(
+        "Request body is JSON lines, one quote per line: `quote` and `category`, plus optional "
+        "`language`, `length`, `style` and `topic`. Invalid and duplicate lines are skipped."
+    ),
+    responses={
+        401: {"model": ErrorResponse, "description": "Missing or invalid admin key"},
+        409: {"model": ErrorResponse, "description": "Quote library is disabled"},
+    },
+)
+async def import_library(request: Request) -> LibraryImportResponse:
+    library = get_controller().library
+    if library is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Quote library is disabled"
+        )
+
+    body = await request.body()
+    # Parsing, journal writes and compaction are file work; keep them off the event loop
+    imported, skipped = await asyncio.to_thread(library.import_jsonl, body.splitlines())
+    total = await asyncio.to_thread(len, library)
+    logger.info(f"Imported {imported} quotes into the library ({skipped} skipped)")
+    return LibraryImportResponse(imported=imported, skipped=skipped, total=total)
+
+
+@router.get(
+    "/library/stats",
+    status_code=status.HTTP_200_OK,
+    summary="Quote library statistics",
+    responses={
+        401: {"model": ErrorResponse, "description": "Missing or invalid admin key"},
+        409: {"model": ErrorResponse, "description": "Quote library is disabled"},
+    },
+)
+async def library_stats() -> dict:
+    library = get_controller().library
+    if library is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Quote library is disabled"
+        )
+    return library.stats()
+
+
+@router.get(
+    "/profile",
+    status_code=status.HTTP_200_OK,
+    summary="Sampling profiler results",
+    description=(
+        "Hottest stacks and functions sampled while profiled requests were running. "
+        "Profiling runs only with `DEBUG=True` and `PROFILE_SAMPLE_RATE` above 0. "
+        "`format=folded` returns every stack in the folded format used by flame graph tools."
+    ),
+    responses={
+        401: {"model": ErrorResponse, "description": "Missing or invalid admin key"},
+        409: {"model": ErrorResponse, "description": "Profiling is disabled"},
+    },
+)
+async def profile(
+    format: str = Query(default="json", pattern="^(json|folded)$"),
+    limit: int = Query(default=50, ge=1, le=1000),
+    reset: bool = Query(default=False, description="Clear the samples after reading them"),
+):
+    if profiler is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Profiling is disabled")
+    result = PlainTextResponse(profiler.folded()) if format == "folded" else profiler.report(limit)
+    if reset:
+        profiler.reset()
+    return result
@@ -1,23 +1,31 @@
+import asyncio
+import json
 import logging
+from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 
 from app.api.controllers import QuoteController
-from app.api.models import ErrorResponse, QuoteCategory, QuoteRequest, QuoteResponse
-
+from app.api.models import (
+    BatchQuoteRequest,
+    BatchQuoteResponse,
+    ErrorResponse,
+    HistoryPage,
+    QuoteCategory,
+    QuoteRequest,
+    QuoteResponse,
+)
+from app.api.utils.http_cache import weak_etag
+from app.api.utils.rate_limiter import RateLimiter
+from app.api.utils.serialization import ModelJSONResponse, dumps
+from app.api.utils.timing import TimedRoute
+from app.config import settings
 
-# Disable rate limiting for serverless - Redis not available
-# try:
-#     from fastapi_limiter import FastAPILimiter
-#     from fastapi_limiter.depends import RateLimiter
-#     import redis.asyncio as redis
-#     RATE_LIMITING_AVAILABLE = True
-# except ImportError:
-#     RATE_LIMITING_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/quotes", tags=["quotes"])
+router = APIRouter(prefix="/api/quotes", tags=["quotes"], route_class=TimedRoute)
 
 # Lazy initialization of controller
 _controller = None
@@ -31,16 +39,36 @@ def get_controller() -> QuoteController:
     return _controller
 
 
-# Initialize rate limiter (only if Redis is configured)
-async def init_rate_limiter():
-    """Initialize rate limiter - disabled on Vercel serverless."""
-    # Skip Redis on serverless environments
-    logger.info("Rate limiter disabled for serverless deployment")
-    return
+# Per-client limit shared by every model-backed endpoint
+rate_limiter = RateLimiter()
+
+# The category list never changes, so it is encoded once
+CATEGORIES_JSON = dumps([category.value for category in QuoteCategory])
+
 
+def _quote_etag(model: QuoteResponse | BatchQuoteResponse) -> str:
+    """Weak ETag over the quotes themselves, ignoring the per-response timestamp."""
+    quotes = model.quotes if isinstance(model, BatchQuoteResponse) else [model]
+    return weak_etag(*(part for q in quotes for part in (q.quote, q.author, q.category, q.source)))
 
-# Rate limiter disabled for serverless
-# rate_limiter = RateLimiter(times=10, seconds=60) if settings.debug else RateLimiter(times=10, seconds=60)
+
+def _respond(
+    model: QuoteResponse | BatchQuoteResponse, response: Response
+) -> QuoteResponse | BatchQuoteResponse | Response:
+    """
+    Attach the quote ETag and, with fast JSON, encode trusted controller output
+    directly, skipping response_model re-validation.
+
+    Without fast JSON the ETag goes on the endpoint's ``response`` parameter,
+    whose headers FastAPI copies onto the response it serializes.
+    """
+    etag = _quote_etag(model)
+    if not settings.fast_json_enabled:
+        response.headers["etag"] = etag
+        return model
+    encoded = ModelJSONResponse(model)
+    encoded.headers["etag"] = etag
+    return encoded
 
 
 @router.post(
@@ -54,15 +82,19 @@ async def init_rate_limiter():
         400: {"model": ErrorResponse, "description": "Invalid request parameters"},
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
         500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Server busy, retry shortly"},
+        504: {"model": ErrorResponse, "description": "Quote generation timed out"},
     },
-    # Temporarily disabled rate limiting
-    # dependencies=[Depends(rate_limiter)] if settings.debug else [Depends(rate_limiter)]
+    dependencies=[Depends(rate_limiter)],
 )
-async def generate_quote(request: QuoteRequest) -> QuoteResponse:
+async def generate_quote(request: QuoteRequest, response: Response) -> QuoteResponse | Response:
     try:
-        logger.info(f"Received quote generation request: {request.model_dump()}")
+        logger.info("Received quote generation request: %r", request)
         controller = get_controller()
-        return await controller.generate_quote(request)
+        return _respond(await controller.generate_quote(request), response)
+    except HTTPException:
+        # Already carries the right status (429/503 overload, 504 timeout, ...)
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {e!s}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
@@ -74,6 +106,103 @@ async def generate_quote(request: QuoteRequest) -> QuoteResponse:
         ) from e
 
 
+def _sse_event(event: str, data: str) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _quote_events(controller: QuoteController, request: QuoteRequest) -> AsyncIterator[str]:
+    """Translate the controller's quote stream into SSE `chunk`, `done` and `error` events."""
+    try:
+        async for item in controller.stream_quote(request):
+            if isinstance(item, QuoteResponse):
+                yield _sse_event("done", item.model_dump_json())
+            else:
+                yield _sse_event("chunk", json.dumps({"text": item}, ensure_ascii=False))
+    except HTTPException as e:
+        logger.error(f"Error streaming quote: {e.detail}")
+        yield _sse_event("error", json.dumps({"status": e.status_code, "detail": e.detail}))
+    except ValueError as e:
+        logger.error(f"Validation error: {e!s}")
+        yield _sse_event("error", json.dumps({"status": 400, "detail": str(e)}))
+    except Exception as e:
+        logger.error(f"Error streaming quote: {e!s}", exc_info=True)
+        detail = f"Failed to generate quote: {e!s}"
+        yield _sse_event("error", json.dumps({"status": 500, "detail": detail}))
+
+
+@router.post(
+    "/generate/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Stream a custom quote",
+    description=(
+        "Generate a quote like `/generate`, streamed as server-sent events: `chunk` events "
+        'carry cleaned text deltas (`{"text": ...}`), a final `done` event carries the full '
+        'quote response, and an `error` event (`{"status": ..., "detail": ...}`) reports failures.'
+    ),
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "Event stream"},
+        422: {"description": "Invalid request parameters"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+    },
+    dependencies=[Depends(rate_limiter)],
+)
+async def generate_quote_stream(request: QuoteRequest) -> StreamingResponse:
+    logger.info("Received streaming quote request: %r", request)
+    controller = get_controller()
+    return StreamingResponse(
+        _quote_events(controller, request),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=BatchQuoteResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Generate several quotes",
+    description=(
+        "Generate `count` quotes from one `template`, or one quote per entry in `requests`. "
+        "Compatible requests are generated together in a single model call."
+    ),
+    responses={
+        200: {"description": "Quotes generated successfully"},
+        400: {"model": ErrorResponse, "description": "Invalid request parameters"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Server busy, retry shortly"},
+        504: {"model": ErrorResponse, "description": "Quote generation timed out"},
+    },
+)
+async def generate_batch(
+    request: BatchQuoteRequest, http_request: Request, response: Response
+) -> BatchQuoteResponse | Response:
+    # Each quote in the batch counts against the caller's limit
+    await rate_limiter.check(http_request, cost=len(request.expand()))
+    try:
+        logger.info(
+            "Received batch generation request for %d quotes",
+            request.count or len(request.requests),
+        )
+        controller = get_controller()
+        return _respond(await controller.generate_batch(request), response)
+    except HTTPException:
+        # Already carries the right status (429/503 overload, 504 timeout, ...)
+        raise
+    except ValueError as e:
+        logger.error(f"Validation error: {e!s}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except Exception as e:
+        logger.error(f"Error generating quote batch: {e!s}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate quotes: {e!s}",
+        ) from e
+
+
 @router.get(
     "/random",
     response_model=QuoteResponse,
@@ -84,13 +213,19 @@ async def generate_quote(request: QuoteRequest) -> QuoteResponse:
         200: {"description": "Quote generated successfully"},
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
         500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Server busy, retry shortly"},
+        504: {"model": ErrorResponse, "description": "Quote generation timed out"},
     },
+    dependencies=[Depends(rate_limiter)],
 )
-async def get_random_quote() -> QuoteResponse:
+async def get_random_quote(response: Response) -> QuoteResponse | Response:
     try:
         logger.info("Received random quote request")
         controller = get_controller()
-        return await controller.get_random_quote()
+        return _respond(await controller.get_random_quote(), response)
+    except HTTPException:
+        # Already carries the right status (429/503 overload, 504 timeout, ...)
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {e!s}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
@@ -102,6 +237,53 @@ async def get_random_quote() -> QuoteResponse:
         ) from e
 
 
+@router.get(
+    "/history",
+    response_model=HistoryPage,
+    status_code=status.HTTP_200_OK,
+    summary="Browse served quotes",
+    description=(
+        "Quotes served so far, newest first, with their request parameters, latency and "
+        "token usage. Pass `next_cursor` as `cursor` to get the next page."
+    ),
+    responses={
+        200: {"description": "One page of history"},
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        404: {"model": ErrorResponse, "description": "Quote history is disabled"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def get_history(
+    cursor: str | None = Query(None, description="Cursor from the previous page"),
+    category: QuoteCategory | None = Query(None, description="Only quotes of this category"),
+    language: str | None = Query(None, description="Only quotes in this language", max_length=2),
+    limit: int = Query(
+        settings.history_page_size, ge=1, le=settings.history_max_page_size, description="Page size"
+    ),
+) -> HistoryPage | Response:
+    history = get_controller().history
+    if history is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Quote history is disabled"
+        )
+    try:
+        items, next_cursor = await asyncio.to_thread(
+            history.page, limit, cursor, category.value if category else None, language
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except Exception as e:
+        logger.error(f"Error reading quote history: {e!s}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read quote history: {e!s}",
+        ) from e
+    page = HistoryPage(items=items, next_cursor=next_cursor)
+    if settings.fast_json_enabled:
+        return ModelJSONResponse(page)
+    return page
+
+
 @router.get(
     "/categories",
     response_model=list[str],
@@ -109,9 +291,11 @@ async def get_random_quote() -> QuoteResponse:
     summary="Get available categories",
     description="Retrieve a list of all available quote categories.",
 )
-async def get_categories() -> list[str]:
+async def get_categories() -> list[str] | Response:
     """
     Get a list of all available quote categories.
     """
     logger.info("Retrieved quote categories")
+    if settings.fast_json_enabled:
+        return ModelJSONResponse(CATEGORIES_JSON)
     return [category.value for category in QuoteCategory]
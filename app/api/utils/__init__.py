@@ -2,8 +2,106 @@
 Utility functions for the API.
 """
 
-from .ai_client import AIClient
+import importlib
+
+from .admission import AdmissionController, AdmissionRejected, Priority, TokenBucket
+from .base_client import EMPTY_QUOTE_TEXT, BaseAIClient, create_ai_client, preload_backend
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from .fallback_corpus import FallbackCorpus
+from .history import HistoryRecord, QuoteHistory, track_usage
+from .http_cache import HTTPCacheMiddleware
+from .metrics import MetricsMiddleware, MetricsRegistry
+from .model_router import ModelRouter, RouteCandidate, model_tier
+from .novelty import NoveltyFilter
+from .postprocess import QuotePostProcessor, StreamingPostProcessor
+from .profiler import StackSampler
 from .prompt_builder import PromptBuilder
+from .quote_cache import CacheKey, QuoteCache
+from .quote_library import LibraryRecord, QuoteLibrary
+from .quote_pool import (
+    MemoryPoolStore,
+    PoolKey,
+    PoolStore,
+    QuotePool,
+    SQLitePoolStore,
+    create_pool_store,
+)
+from .rate_limiter import (
+    MemoryRateLimitStore,
+    RateLimiter,
+    RateLimitStore,
+    SQLiteRateLimitStore,
+    create_rate_limit_store,
+)
+from .resilience import LatencyTracker, ResilientCaller, RetryBudget, is_retryable
+from .serialization import ModelJSONResponse
+from .simulated_client import SimulatedAIClient
+from .single_flight import SingleFlight
+from .timing import ServerTimingMiddleware, TimedRoute
+
+
+__all__ = [
+    "EMPTY_QUOTE_TEXT",
+    "AIClient",
+    "AdmissionController",
+    "AdmissionRejected",
+    "BaseAIClient",
+    "CacheKey",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CircuitState",
+    "FallbackCorpus",
+    "HTTPCacheMiddleware",
+    "HistoryRecord",
+    "LatencyTracker",
+    "LibraryRecord",
+    "MemoryPoolStore",
+    "MemoryRateLimitStore",
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "ModelJSONResponse",
+    "ModelRouter",
+    "NoveltyFilter",
+    "PoolKey",
+    "PoolStore",
+    "Priority",
+    "PromptBuilder",
+    "QuoteCache",
+    "QuoteHistory",
+    "QuoteLibrary",
+    "QuotePool",
+    "QuotePostProcessor",
+    "RateLimitStore",
+    "RateLimiter",
+    "ResilientCaller",
+    "RetryBudget",
+    "RouteCandidate",
+    "SQLitePoolStore",
+    "SQLiteRateLimitStore",
+    "ServerTimingMiddleware",
+    "SimulatedAIClient",
+    "SingleFlight",
+    "StackSampler",
+    "StreamingPostProcessor",
+    "TimedRoute",
+    "TokenBucket",
+    "create_ai_client",
+    "create_pool_store",
+    "create_rate_limit_store",
+    "is_retryable",
+    "model_tier",
+    "preload_backend",
+    "track_usage",
+]
+
+
+# Exports imported on first access: the Gemini client pulls in google-generativeai,
+# which would otherwise load with every import of this package
+_LAZY_EXPORTS = {"AIClient": ".ai_client"}
 
 
-__all__ = ["AIClient", "PromptBuilder"]
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
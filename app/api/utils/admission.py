@@ -0,0 +1,274 @@
+"""
+Admission control for outbound model calls.
+Combines a token bucket sized to the model quota, an AIMD concurrency limit
+and a bounded priority queue with fast rejection.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Scheduling priority of a model call; lower values are admitted first."""
+
+    INTERACTIVE = 0  # /generate, /random, streaming
+    BATCH = 1  # /batch
+    BACKGROUND = 2  # Pool refills
+
+
+class AdmissionRejected(HTTPException):
+    """A call was refused locally before reaching the model; retrying it only adds load."""
+
+
+class TokenBucket:
+    """Classic token bucket; a rate of 0 disables rate limiting."""
+
+    def __init__(self, rate_per_second: float, burst: float):
+        self.rate = rate_per_second
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        """Take one token if available."""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until(self, tokens: float = 1) -> float:
+        """Seconds until ``tokens`` tokens will have accumulated."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def drain(self) -> None:
+        """Drop all tokens, e.g. after the provider reported quota exhaustion."""
+        self._refill()
+        self.tokens = 0.0
+
+
+class AdmissionController:
+    """
+    Decides when a model call may start.
+
+    Calls are admitted while fewer than ``limit`` are in flight and the token
+    bucket has a token. Otherwise they wait in a priority queue, where
+    interactive calls overtake batch and background work. The concurrency limit
+    adapts AIMD-style: it grows by one per ``limit`` fast successes and is cut
+    multiplicatively on 429s or slow calls. Callers are rejected immediately
+    (503 when the queue is full, 429 when the quota cannot serve them in time)
+    instead of hanging until the request timeout.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float | None = None,
+        burst: float | None = None,
+        min_concurrency: int | None = None,
+        max_concurrency: int | None = None,
+        max_queue: int | None = None,
+        max_wait: float | None = None,
+        latency_target: float | None = None,
+    ):
+        rate = settings.admission_rate_per_minute if rate_per_minute is None else rate_per_minute
+        self.bucket = TokenBucket(rate / 60, burst or settings.admission_burst)
+        self.min_concurrency = max(1, min_concurrency or settings.admission_min_concurrency)
+        self.max_concurrency = max(
+            self.min_concurrency, max_concurrency or settings.admission_max_concurrency
+        )
+        self.max_queue = max_queue if max_queue is not None else settings.admission_max_queue
+        self.max_wait = max_wait or settings.admission_max_wait_seconds
+        self.latency_target = latency_target or settings.admission_latency_target_ms / 1000
+
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._last_decrease = 0.0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.preempted = 0
+        self.timed_out = 0
+        self.overloads = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[None]:
+        """
+        Hold an admission slot for the duration of one model call.
+
+        Raises:
+            HTTPException: 429 or 503 if the call cannot be admitted in time.
+        """
+        await self.acquire(priority)
+        started = time.monotonic()
+        overloaded = False
+        try:
+            yield
+        except HTTPException as e:
+            overloaded = e.status_code == 429
+            raise
+        finally:
+            self.release(time.monotonic() - started, overloaded=overloaded)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Wait for permission to start a model call."""
+        if not self._queue and self._try_admit():
+            return
+
+        # Only waiters this call cannot overtake stand between it and a token
+        ahead = sum(1 for entry in self._queue if entry[0] <= priority and not entry[2].done())
+        if self.bucket.time_until(ahead + 1) > self.max_wait:
+            self.rejected += 1
+            raise AdmissionRejected(
+                429,
+                "Model quota exhausted. Please retry shortly.",
+                headers={"Retry-After": str(math.ceil(self.bucket.time_until()) or 1)},
+            )
+        if len(self._queue) >= self.max_queue and not self._preempt(priority):
+            self.rejected += 1
+            raise AdmissionRejected(
+                503, "Server is busy. Please retry shortly.", headers={"Retry-After": "1"}
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future))
+        self._schedule()
+
+        try:
+            await asyncio.wait({future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+        if not future.done():
+            self._abandon(future)
+            self.timed_out += 1
+            raise AdmissionRejected(
+                503, "Server is busy. Please retry shortly.", headers={"Retry-After": "1"}
+            )
+        # Raises the 503 set on the future when this waiter was preempted
+        future.result()
+
+    def release(self, latency: float, overloaded: bool = False) -> None:
+        """Finish a model call and adapt the concurrency limit."""
+        self.in_flight -= 1
+        now = time.monotonic()
+
+        if overloaded or latency > self.latency_target:
+            if overloaded:
+                self.overloads += 1
+                self.bucket.drain()
+            # Decrease at most once per latency target so one burst counts once
+            if now - self._last_decrease > self.latency_target:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self._last_decrease = now
+                logger.warning(
+                    f"Admission limit decreased to {self.limit:.1f} "
+                    f"({'429 from provider' if overloaded else f'latency {latency:.1f}s'})"
+                )
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+        self._dispatch()
+
+    def _try_admit(self) -> bool:
+        if self.in_flight >= int(self.limit) or not self.bucket.try_take():
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def _dispatch(self) -> None:
+        """Admit queued calls in priority order while capacity allows."""
+        while self._queue:
+            future = self._queue[0][2]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            if not self._try_admit():
+                break
+            heapq.heappop(self._queue)
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Wake the dispatcher when the next token is due if calls are waiting on the bucket."""
+        if self._timer is not None or not self._queue:
+            return
+        if self.in_flight >= int(self.limit):
+            return  # A release will dispatch
+        delay = self.bucket.time_until()
+        if delay <= 0:
+            asyncio.get_running_loop().call_soon(self._dispatch)
+            return
+
+        def wake() -> None:
+            self._timer = None
+            self._dispatch()
+
+        self._timer = asyncio.get_running_loop().call_later(delay, wake)
+
+    def _preempt(self, priority: Priority) -> bool:
+        """Reject the lowest-priority queued call to make room for a more urgent one."""
+        waiting = [entry for entry in self._queue if not entry[2].done()]
+        if not waiting:
+            return True
+        victim = max(waiting, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= priority:
+            return False
+        victim[2].set_exception(
+            AdmissionRejected(
+                503, "Server is busy. Please retry shortly.", headers={"Retry-After": "1"}
+            )
+        )
+        self._queue.remove(victim)
+        heapq.heapify(self._queue)
+        self.preempted += 1
+        return True
+
+    def _abandon(self, future: asyncio.Future) -> None:
+        """Give back a slot granted to a waiter that stopped waiting."""
+        if future.done() and not future.cancelled() and future.exception() is None:
+            self.in_flight -= 1
+            self._dispatch()
+        else:
+            future.cancel()
+
+    def stats(self) -> dict[str, float]:
+        """Return the current limit, queue depth and admission counters."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for entry in self._queue if not entry[2].done()),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "preempted": self.preempted,
+            "timed_out": self.timed_out,
+            "overloads": self.overloads,
+        }
@@ -1,39 +1,145 @@
 """
 AI client for quote generation using Google Gemini API.
 Optimized for Vercel serverless deployment with fast response times.
+Calls are routed over the configured API keys and models (see model_router).
 """
 
 import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator
+from typing import ClassVar
 
-import google.generativeai as genai
 from fastapi import HTTPException
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
 
 from app.config import settings
 
+from .base_client import EMPTY_QUOTE_TEXT, BaseAIClient
+from .history import record_usage
+from .model_router import ModelRouter, RouteCandidate
+from .postprocess import quote_postprocessor
+from .prompt_builder import SYSTEM_PROMPT
+from .timing import stage
+
 
 logger = logging.getLogger(__name__)
 
 
-class AIClient:
+class AIClient(BaseAIClient):
     """Client for AI text generation using Google Gemini."""
 
-    def __init__(self):
+    name = "gemini"
+
+    # Simplified safety settings for speed
+    SAFETY_SETTINGS: ClassVar[dict[str, str]] = {
+        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+        "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    }
+    SYSTEM_INSTRUCTION = glm.Content(parts=[glm.Part(text=SYSTEM_PROMPT)])
+
+    def __init__(self, router: ModelRouter | None = None):
         """Initialize Google Gemini client."""
-        if not settings.gemini_api_key:
+        self.router = router or ModelRouter()
+        if not self.router.candidates:
             raise RuntimeError("GEMINI_API_KEY not set. Configure in Vercel environment variables.")
 
-        genai.configure(api_key=settings.gemini_api_key)
-        # Initialize model with system instruction
-        self.model = genai.GenerativeModel(
-            settings.default_model,
-            system_instruction="You are Swan, a quote generator. Generate one original quote only. Do not include meta-commentary, explanations, translations, or any additional text. Output only the requested quote text in the specified language.",
-        )
+        self._clients: dict[int, glm.GenerativeServiceAsyncClient] = {}
         self.available = True
-        logger.info(f"✓ Gemini initialized: {settings.default_model}")
+        models = sorted({candidate.model for candidate in self.router.candidates})
+        keys = len({candidate.key_index for candidate in self.router.candidates})
+        logger.info(f"✓ Gemini initialized: {', '.join(models)} over {keys} API key(s)")
+
+    def _client(self, candidate: RouteCandidate) -> glm.GenerativeServiceAsyncClient:
+        """
+        The API client for the candidate's key.
+
+        Each API key gets its own ``glm.GenerativeServiceAsyncClient``, which
+        carries the key in its ``client_options``. It is created on first use,
+        inside the event loop, and shared by that key's models.
+        """
+        if candidate.handle is None:
+            client = self._clients.get(candidate.key_index)
+            if client is None:
+                client = glm.GenerativeServiceAsyncClient(
+                    client_options={"api_key": candidate.api_key}
+                )
+                self._clients[candidate.key_index] = client
+            candidate.handle = client
+        return candidate.handle
+
+    def _request(
+        self, model: str, prompt: str, max_tokens: int | None, temperature: float | None
+    ) -> glm.GenerateContentRequest:
+        return glm.GenerateContentRequest(
+            model=f"models/{model}",
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+            system_instruction=self.SYSTEM_INSTRUCTION,
+            generation_config=glm.GenerationConfig(
+                max_output_tokens=max_tokens or settings.max_tokens,
+                temperature=temperature or settings.temperature,
+                top_p=0.95,
+                top_k=40,  # Speed optimization
+            ),
+            safety_settings=[
+                glm.SafetySetting(category=category, threshold=threshold)
+                for category, threshold in self.SAFETY_SETTINGS.items()
+            ],
+        )
+
+    async def _send(
+        self,
+        prompt: str,
+        max_tokens: int | None,
+        temperature: float | None,
+        tier: str | None,
+        stream: bool = False,
+    ):
+        """
+        Send the request to the best candidate, failing over on quota exhaustion.
+
+        For streams the call returns the first chunk and an iterator over the
+        rest once the first chunk arrived, so a 429 fails over before anything
+        was yielded.
+
+        Raises:
+            google_exceptions.ResourceExhausted: If no candidate has quota left.
+        """
+        tried: list[RouteCandidate] = []
+        while (candidate := self.router.acquire(tier, exclude=tried)) is not None:
+            tried.append(candidate)
+            started = time.perf_counter()
+            client = self._client(candidate)
+            request = self._request(candidate.model, prompt, max_tokens, temperature)
+            try:
+                if stream:
+                    chunks = aiter(await client.stream_generate_content(request))
+                    response = await anext(chunks, None), chunks
+                else:
+                    response = await client.generate_content(request)
+            except google_exceptions.ResourceExhausted as e:
+                self.router.record_quota_exhausted(candidate)
+                logger.warning(f"Gemini quota exhausted on {candidate.label}, failing over: {e!s}")
+                continue
+            except asyncio.CancelledError:
+                self.router.record(candidate, time.perf_counter() - started, failed=None)
+                raise
+            except Exception:
+                self.router.record(candidate, time.perf_counter() - started, failed=True)
+                raise
+            self.router.record(candidate, time.perf_counter() - started, failed=False)
+            return response
+        raise google_exceptions.ResourceExhausted("No API key has quota left for this model tier")
 
     async def generate_quote(
-        self, prompt: str, max_tokens: int | None = None, temperature: float | None = None
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        tier: str | None = None,
     ) -> str:
         """
         Generate a quote using Google Gemini API with speed optimizations.
@@ -42,6 +148,7 @@ class AIClient:
             prompt: The generation prompt
             max_tokens: Maximum tokens (default from settings)
             temperature: Creativity level 0.0-1.0 (default from settings)
+            tier: Model tier to route the call to (see model_router.model_tier)
 
         Returns:
             Generated quote text (cleaned)
@@ -55,84 +162,110 @@ class AIClient:
         try:
             # Use timeout to prevent hanging requests
             response = await asyncio.wait_for(
-                self.model.generate_content_async(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        max_output_tokens=max_tokens or settings.max_tokens,
-                        temperature=temperature or settings.temperature,
-                        top_p=0.95,
-                        top_k=40,  # Speed optimization
-                    ),
-                    # Simplified safety settings for speed
-                    safety_settings={
-                        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-                        "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-                        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-                        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-                    },
-                ),
+                self._send(prompt, max_tokens, temperature, tier),
                 timeout=settings.request_timeout,
             )
 
-            # Robust extraction - handle both simple and complex responses
-            try:
-                # Try simple text accessor first
-                quote = response.text.strip().strip("\"'")
-            except (ValueError, AttributeError):
-                # Fallback: extract from parts if simple text fails
-                if response.candidates and response.candidates[0].content.parts:
-                    quote = response.candidates[0].content.parts[0].text.strip().strip("\"'")
-                else:
-                    raise ValueError("No valid quote content in response") from None
+            if not response.candidates or not response.candidates[0].content.parts:
+                raise ValueError("No valid quote content in response")
+            quote = self._chunk_text(response)
 
-            # Clean up unwanted meta-commentary and formatting
-            quote = self._clean_quote_response(quote)
+            self._record_usage(response)
 
-            return quote if quote else "Unable to generate quote. Please try again."
+            # Clean up unwanted meta-commentary, translations and formatting
+            with stage("cleanup"):
+                quote = quote_postprocessor.process(quote)
+
+            return quote if quote else EMPTY_QUOTE_TEXT
 
         except TimeoutError as e:
             logger.error(f"Gemini request timeout after {settings.request_timeout}s")
             raise HTTPException(504, "Quote generation timed out. Please try again.") from e
+        except google_exceptions.ResourceExhausted as e:
+            logger.error(f"Gemini quota exhausted: {e!s}")
+            raise HTTPException(429, "Model quota exhausted. Please retry shortly.") from e
         except Exception as e:
             logger.error(f"Gemini error: {e!s}")
             raise HTTPException(500, f"Quote generation failed: {e!s}") from e
 
-    def _clean_quote_response(self, text: str) -> str:
+    async def stream_quote(
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        tier: str | None = None,
+    ) -> AsyncIterator[str]:
         """
-        Clean the AI response to extract only the quote text.
-
-        Removes meta-commentary, markdown formatting, and unwanted prefixes.
+        Stream a quote from Gemini, cleaning the text incrementally.
 
         Args:
-            text: Raw response from AI
+            prompt: The generation prompt
+            max_tokens: Maximum tokens (default from settings)
+            temperature: Creativity level 0.0-1.0 (default from settings)
+            tier: Model tier to route the call to (see model_router.model_tier)
 
-        Returns:
-            Cleaned quote text
+        Yields:
+            Cleaned text deltas, with meta-commentary prefixes already removed
+
+        Raises:
+            HTTPException: If generation fails or the stream exceeds the request timeout
         """
-        # Remove common meta-commentary prefixes
-        unwanted_prefixes = [
-            "As a large language model,",
-            "As an AI,",
-            "Here is your quote:",
-            "Here's a quote:",
-            "**Arabic:**",
-            "**English:**",
-            "**English Translation:**",
-        ]
-
-        for prefix in unwanted_prefixes:
-            if text.startswith(prefix):
-                # Remove everything up to and including the prefix
-                text = text[len(prefix) :].strip()
-
-        # If there are multiple sections (like Arabic + English), take only the first
-        if "**English Translation:**" in text:
-            text = text.split("**English Translation:**")[0].strip()
-
-        # Remove markdown bold formatting
-        text = text.replace("**Arabic:**", "").replace("**English:**", "")
-
-        # Clean up any remaining markdown
-        text = text.strip("*").strip()
-
-        return text
+        if not self.available:
+            raise HTTPException(503, "Gemini API unavailable")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.request_timeout
+        cleaner = quote_postprocessor.stream()
+        emitted = False
+        last_chunk = None
+
+        try:
+            chunk, chunks = await asyncio.wait_for(
+                self._send(prompt, max_tokens, temperature, tier, stream=True),
+                timeout=settings.request_timeout,
+            )
+            while chunk is not None:
+                last_chunk = chunk
+                with stage("cleanup"):
+                    delta = cleaner.feed(self._chunk_text(chunk))
+                if delta:
+                    emitted = True
+                    yield delta
+                # The timeout covers the whole stream, not each chunk
+                chunk = await asyncio.wait_for(anext(chunks, None), timeout=deadline - loop.time())
+
+            # Usage metadata of the last chunk covers the whole answer
+            self._record_usage(last_chunk)
+            tail = cleaner.finish()
+            if tail or not emitted:
+                yield tail or EMPTY_QUOTE_TEXT
+
+        except TimeoutError as e:
+            logger.error(f"Gemini stream timeout after {settings.request_timeout}s")
+            raise HTTPException(504, "Quote generation timed out. Please try again.") from e
+        except google_exceptions.ResourceExhausted as e:
+            logger.error(f"Gemini quota exhausted: {e!s}")
+            raise HTTPException(429, "Model quota exhausted. Please retry shortly.") from e
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Gemini stream error: {e!s}")
+            raise HTTPException(500, f"Quote generation failed: {e!s}") from e
+
+    @staticmethod
+    def _record_usage(response) -> None:
+        """Add the token counts from a response's usage metadata to metrics and history."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        record_usage(
+            getattr(usage, "prompt_token_count", 0) or 0,
+            getattr(usage, "candidates_token_count", 0) or 0,
+        )
+
+    @staticmethod
+    def _chunk_text(chunk: glm.GenerateContentResponse) -> str:
+        """Extract the text of a response or streamed chunk (empty for text-less chunks)."""
+        if not chunk.candidates:
+            return ""
+        return "".join(part.text for part in chunk.candidates[0].content.parts)
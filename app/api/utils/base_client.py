@@ -0,0 +1,119 @@
+"""
+Backend interface for quote generation providers.
+"""
+
+import importlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Returned by backends when the model produced no usable text; never cached
+EMPTY_QUOTE_TEXT = "Unable to generate quote. Please try again."
+
+# Backend name -> (module, class). Modules are imported on demand, so an unused
+# SDK is never loaded and the Gemini SDK (with gRPC and protobuf, most of the
+# cold-start import time) only when the first quote is generated
+BACKENDS = {
+    "gemini": (".ai_client", "AIClient"),
+    "simulated": (".simulated_client", "SimulatedAIClient"),
+}
+
+
+class BaseAIClient(ABC):
+    """Interface every text generation backend must implement."""
+
+    #: Short backend identifier used in logs and health output
+    name: str = "base"
+
+    @abstractmethod
+    async def generate_quote(
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        tier: str | None = None,
+    ) -> str:
+        """
+        Generate a quote for the given prompt.
+
+        Args:
+            prompt: The generation prompt
+            max_tokens: Maximum tokens (default from settings)
+            temperature: Creativity level 0.0-1.0 (default from settings)
+            tier: Model tier hint ('fast' or 'large'); single-model backends ignore it
+
+        Returns:
+            Generated quote text (cleaned)
+
+        Raises:
+            HTTPException: If generation fails
+        """
+
+    async def stream_quote(
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        tier: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a quote as cleaned text deltas.
+
+        Backends without native streaming yield the whole quote as a single delta.
+
+        Yields:
+            Cleaned text deltas that concatenate to the final quote
+
+        Raises:
+            HTTPException: If generation fails
+        """
+        yield await self.generate_quote(
+            prompt, max_tokens=max_tokens, temperature=temperature, tier=tier
+        )
+
+
+def _backend_class(backend: str | None) -> type[BaseAIClient]:
+    backend = (backend or settings.ai_backend).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown AI backend: {backend}. Use 'gemini' or 'simulated'.")
+    module, class_name = BACKENDS[backend]
+    return getattr(importlib.import_module(module, __package__), class_name)
+
+
+def create_ai_client(backend: str | None = None) -> BaseAIClient:
+    """
+    Create the generation backend selected in settings.
+
+    Args:
+        backend (Optional[str]): Backend name ('gemini' or 'simulated'),
+            defaults to ``settings.ai_backend``.
+
+    Returns:
+        BaseAIClient: A ready-to-use backend instance.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    return _backend_class(backend)()
+
+
+def preload_backend(backend: str | None = None) -> None:
+    """
+    Import a backend's module (and SDK) without creating a client.
+
+    Used by the startup warmup so the first request does not pay for the
+    import; creating the client stays lazy, so a missing API key still only
+    fails requests that need the model.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    started = time.perf_counter()
+    cls = _backend_class(backend)
+    logger.info(f"Preloaded {cls.name} backend in {(time.perf_counter() - started) * 1000:.0f}ms")
@@ -0,0 +1,199 @@
+"""
+Circuit breaker around the model backend.
+Opens on a high error or slow-call rate so callers fail fast instead of waiting
+out timeouts, and probes for recovery in the half-open state.
+"""
+
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import StrEnum
+
+from app.config import settings
+
+from .admission import AdmissionRejected
+from .resilience import is_retryable
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"  # Calls flow normally
+    OPEN = "open"  # Calls are rejected without reaching the backend
+    HALF_OPEN = "half_open"  # A few probe calls test whether the backend recovered
+
+
+class CircuitOpenError(AdmissionRejected):
+    """The backend circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Count-based circuit breaker over the last ``window`` backend calls.
+
+    The circuit opens once at least ``min_calls`` were recorded and either the
+    failure rate or the slow-call rate reaches its threshold. After
+    ``open_seconds`` it lets ``half_open_probes`` calls through; if they all
+    succeed quickly the circuit closes, any failure re-opens it.
+
+    Only upstream failures (those worth retrying: 429, 5xx, timeouts) count;
+    invalid requests and locally rejected calls do not.
+    """
+
+    def __init__(
+        self,
+        window: int | None = None,
+        min_calls: int | None = None,
+        failure_rate: float | None = None,
+        slow_call_rate: float | None = None,
+        slow_call_seconds: float | None = None,
+        open_seconds: float | None = None,
+        half_open_probes: int | None = None,
+    ):
+        self.min_calls = min_calls or settings.circuit_min_calls
+        self.failure_rate = failure_rate or settings.circuit_failure_rate
+        self.slow_call_rate = slow_call_rate or settings.circuit_slow_call_rate
+        self.slow_call_seconds = slow_call_seconds or settings.circuit_slow_call_ms / 1000
+        self.open_seconds = open_seconds or settings.circuit_open_seconds
+        self.half_open_probes = max(1, half_open_probes or settings.circuit_half_open_probes)
+
+        # (failed, slow) per recorded call
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window or settings.circuit_window)
+        self.state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+
+        self.opened = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """
+        Run one backend call through the breaker.
+
+        Raises:
+            CircuitOpenError: 503 if the circuit is open.
+        """
+        if not self.allow():
+            raise self._rejection()
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_retryable(e):
+                self.record(failed=True, latency=time.monotonic() - started)
+            else:
+                self._release_probe()
+            raise
+        except BaseException:
+            # Cancelled (e.g. a losing hedge); says nothing about backend health
+            self._release_probe()
+            raise
+        self.record(failed=False, latency=time.monotonic() - started)
+
+    def allow(self) -> bool:
+        """Whether a call may go to the backend now; reserves a probe when half-open."""
+        if self.state is CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probes_started >= self.half_open_probes:
+                return False
+            self._probes_started += 1
+        return True
+
+    def check(self) -> None:
+        """
+        Fail fast without reserving a probe, e.g. before queueing or coalescing a call.
+
+        Raises:
+            CircuitOpenError: 503 if the circuit is open.
+        """
+        if self.is_open():
+            raise self._rejection()
+
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected (without reserving a probe)."""
+        if self.state is CircuitState.OPEN:
+            return time.monotonic() - self._opened_at < self.open_seconds
+        return (
+            self.state is CircuitState.HALF_OPEN and self._probes_started >= self.half_open_probes
+        )
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will next let a call through."""
+        if self.state is CircuitState.OPEN:
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        return 0.0
+
+    def record(self, failed: bool, latency: float) -> None:
+        """Record the outcome of one backend call."""
+        slow = latency > self.slow_call_seconds
+
+        if self.state is CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._transition(CircuitState.OPEN)
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self.half_open_probes:
+                self._transition(CircuitState.CLOSED)
+            return
+
+        if self.state is CircuitState.OPEN:
+            return  # A call admitted before the circuit opened
+
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._outcomes if f) / len(self._outcomes)
+        slow_calls = sum(1 for _, s in self._outcomes if s) / len(self._outcomes)
+        if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+            logger.warning(
+                f"Opening circuit: failure rate {failures:.0%}, slow-call rate {slow_calls:.0%} "
+                f"over the last {len(self._outcomes)} calls"
+            )
+            self._transition(CircuitState.OPEN)
+
+    def _rejection(self) -> CircuitOpenError:
+        self.rejected += 1
+        return CircuitOpenError(
+            503,
+            "Quote service is temporarily unavailable.",
+            headers={"Retry-After": str(max(1, round(self.retry_after())))},
+        )
+
+    def _release_probe(self) -> None:
+        """Give back a probe slot whose call ended without a verdict."""
+        if self.state is CircuitState.HALF_OPEN and self._probes_started > 0:
+            self._probes_started -= 1
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is self.state:
+            return
+        logger.info(f"Circuit {self.state.value} -> {state.value}")
+        self.state = state
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        if state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+        elif state is CircuitState.CLOSED:
+            self._outcomes.clear()
+
+    def stats(self) -> dict[str, float | str]:
+        """Return the circuit state and counters."""
+        return {
+            "state": self.state.value,
+            "recent_calls": len(self._outcomes),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,72 @@
+"""
+Local corpus of curated quotes served when the model backend is unavailable.
+"""
+
+import json
+import logging
+import random
+from pathlib import Path
+
+from app.api.models import QuoteCategory
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = Path(__file__).resolve().parents[2] / "data" / "fallback_quotes.json"
+
+
+class FallbackCorpus:
+    """
+    Curated quotes per category and language, loaded once from a JSON data file.
+
+    The file maps ``category -> language -> [quotes]``. Lookups fall back to
+    English when a language has no quotes, and the random category draws from
+    every category.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path or settings.fallback_corpus_path or DEFAULT_CORPUS_PATH)
+        self._quotes: dict[str, dict[str, list[str]]] | None = None
+        self._rng = random.Random()
+        self.served = 0
+
+    @property
+    def quotes(self) -> dict[str, dict[str, list[str]]]:
+        """Lazy load so the file is only read once a fallback is actually needed."""
+        if self._quotes is None:
+            with self.path.open(encoding="utf-8") as f:
+                self._quotes = json.load(f)["quotes"]
+            total = sum(
+                len(texts) for by_lang in self._quotes.values() for texts in by_lang.values()
+            )
+            logger.info(f"Loaded {total} fallback quotes from {self.path}")
+        return self._quotes
+
+    def candidates(self, category: str, language: str = "en") -> list[str]:
+        """Return the quotes available for a category and language."""
+        if category == QuoteCategory.RANDOM.value:
+            pools = [
+                by_lang.get(language) or by_lang.get("en", []) for by_lang in self.quotes.values()
+            ]
+            return [text for pool in pools for text in pool]
+
+        by_lang = self.quotes.get(category, {})
+        return by_lang.get(language) or by_lang.get("en", [])
+
+    def pick(self, category: str, language: str = "en") -> str | None:
+        """
+        Pick a random curated quote.
+
+        Args:
+            category (str): Quote category value.
+            language (str): Language code ('en' or 'ar').
+
+        Returns:
+            Optional[str]: A quote, or None if the corpus has nothing for the category.
+        """
+        texts = self.candidates(category, language)
+        if not texts:
+            return None
+        self.served += 1
+        return self._rng.choice(texts)
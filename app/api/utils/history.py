@@ -0,0 +1,289 @@
+"""
+Persistent history of served quotes.
+Every quote is queued together with its request parameters, prompt
+fingerprint, latency and token usage, and a background thread appends the
+queue to SQLite in batches, so recording never blocks a request. Pages are
+read newest first with keyset (cursor) pagination.
+"""
+
+import atexit
+import base64
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, NamedTuple
+
+from app.config import settings
+
+from .metrics import model_tokens
+
+
+logger = logging.getLogger(__name__)
+
+# Tokens used by model calls of the quote being generated, None when not tracked
+_usage: ContextVar[dict[str, int] | None] = ContextVar("quote_usage", default=None)
+
+
+def track_usage() -> dict[str, int]:
+    """
+    Start counting model tokens for the current task.
+
+    Returns:
+        dict: Live ``prompt``/``completion`` counts, updated by ``record_usage``
+        for calls made from this task and the tasks it starts (hedges, retries).
+    """
+    usage = {"prompt": 0, "completion": 0}
+    _usage.set(usage)
+    return usage
+
+
+def record_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    """Count the tokens of a model call in the metrics and the current quote's usage."""
+    model_tokens.inc("prompt", amount=prompt_tokens)
+    model_tokens.inc("completion", amount=completion_tokens)
+    usage = _usage.get()
+    if usage is not None:
+        usage["prompt"] += prompt_tokens
+        usage["completion"] += completion_tokens
+
+
+class HistoryRecord(NamedTuple):
+    """One served quote, in the column order of the ``quote_history`` table."""
+
+    created_at: str
+    quote: str
+    category: str
+    language: str
+    length: str
+    topic: str | None
+    style: str | None
+    temperature: float | None
+    max_tokens: int | None
+    source: str
+    prompt: str  # Fingerprint of the prompt the quote was generated with
+    latency_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+
+
+COLUMNS = HistoryRecord._fields
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS quote_history ("
+    "id INTEGER PRIMARY KEY, created_at TEXT NOT NULL, quote TEXT NOT NULL, "
+    "category TEXT NOT NULL, language TEXT NOT NULL, length TEXT NOT NULL, "
+    "topic TEXT, style TEXT, temperature REAL, max_tokens INTEGER, "
+    "source TEXT NOT NULL, prompt TEXT NOT NULL, latency_ms REAL NOT NULL, "
+    "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL)",
+    # One index per filter combination, each ending in id so that a page is a
+    # range scan of at most limit + 1 entries, whatever the table size
+    "CREATE INDEX IF NOT EXISTS quote_history_by_category "
+    "ON quote_history (category, language, id)",
+    "CREATE INDEX IF NOT EXISTS quote_history_by_category_only ON quote_history (category, id)",
+    "CREATE INDEX IF NOT EXISTS quote_history_by_language ON quote_history (language, id)",
+)
+
+
+def encode_cursor(entry_id: int) -> str:
+    """Opaque cursor pointing just past an entry."""
+    return base64.urlsafe_b64encode(str(entry_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Entry id a cursor points past.
+
+    Raises:
+        ValueError: If the cursor was not produced by ``encode_cursor``.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid history cursor") from e
+
+
+class QuoteHistory:
+    """
+    Append-only quote history in a SQLite file shared by all workers.
+
+    ``record`` only puts the entry on a bounded in-memory queue; a daemon
+    thread writes queued entries in one transaction per batch of up to
+    ``batch_size``, at least every ``flush_interval`` seconds while entries
+    are waiting. When the queue is full, entries are dropped and counted
+    rather than slowing down the request.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        queue_size: int | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+    ):
+        self.path = path or settings.history_db_path
+        self.batch_size = batch_size or settings.history_batch_size
+        self.flush_interval = flush_interval or settings.history_flush_interval_seconds
+        self._queue: queue.Queue[HistoryRecord | None] = queue.Queue(
+            maxsize=queue_size or settings.history_queue_size
+        )
+        self._writer: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._reader: sqlite3.Connection | None = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=settings.history_db_busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # A crash may lose the last batches, never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    def record(self, entry: HistoryRecord) -> None:
+        """Queue an entry for the background writer without blocking."""
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait(entry)
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_writer(self) -> None:
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="quote-history-writer", daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _write_loop(self) -> None:
+        conn: sqlite3.Connection | None = None
+        insert = (
+            f"INSERT INTO quote_history ({', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(COLUMNS))})"
+        )
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            entries = [entry for entry in batch if entry is not None]
+            try:
+                if entries:
+                    if conn is None:
+                        conn = self._connect()
+                    with conn:
+                        conn.execute("BEGIN")
+                        conn.executemany(insert, entries)
+                    self.written += len(entries)
+            except sqlite3.Error as e:
+                self.write_errors += len(entries)
+                logger.warning(f"Dropped {len(entries)} history entries: {e!s}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        if conn is not None:
+            conn.close()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every queued entry has been written.
+
+        Returns:
+            bool: False if entries were still pending after ``timeout`` seconds.
+        """
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: not self._queue.unfinished_tasks, timeout=timeout
+            )
+
+    def page(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        category: str | None = None,
+        language: str | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """
+        Read one page of history, newest first.
+
+        Args:
+            limit (int): Maximum entries to return.
+            cursor (Optional[str]): ``next_cursor`` of the previous page.
+            category (Optional[str]): Only entries of this category.
+            language (Optional[str]): Only entries in this language.
+
+        Returns:
+            tuple: The entries (with their ``id``) and the cursor of the next
+            page, None on the last page.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        conditions, params = [], []
+        if cursor is not None:
+            conditions.append("id < ?")
+            params.append(decode_cursor(cursor))
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if language is not None:
+            conditions.append("language = ?")
+            params.append(language)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            rows = self._reader.execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM quote_history {where}"
+                "ORDER BY id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+
+        entries = [dict(zip(("id", *COLUMNS), row, strict=True)) for row in rows[:limit]]
+        next_cursor = encode_cursor(entries[-1]["id"]) if len(rows) > limit else None
+        return entries, next_cursor
+
+    def close(self) -> None:
+        """Write what is queued, stop the writer and close the read connection."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+            self._writer = None
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def stats(self) -> dict[str, int]:
+        """Return write counters and the current queue depth."""
+        return {
+            "recorded": self.recorded,
+            "written": self.written,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+        }
@@ -0,0 +1,148 @@
+"""
+Conditional HTTP caching for API responses.
+Adds ETag, Cache-Control and Vary headers per route and answers matching
+If-None-Match requests with 304 Not Modified, so browsers and CDNs can reuse
+responses without the body being sent again.
+"""
+
+import hashlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+
+# Request headers that the CORS headers of a response depend on
+CORS_VARY = ("Origin",)
+
+# Headers a 304 must repeat from the 200 it stands for (RFC 9110, 15.4.5)
+NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "vary")
+
+
+def strong_etag(body: bytes) -> str:
+    """Strong ETag for an exact byte representation."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def weak_etag(*parts: str) -> str:
+    """
+    Weak ETag for semantically equivalent responses.
+
+    Used for quotes, whose body carries a per-response timestamp: two
+    responses with the same quote, category and source are interchangeable.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110, 13.1.2)."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(",")
+    )
+
+
+def merge_vary(existing: str | None, *fields: str) -> str:
+    """Add fields to a Vary header value, keeping its order and dropping duplicates."""
+    if existing is not None and existing.strip() == "*":
+        return "*"
+    merged: dict[str, str] = {}
+    for field in [*(existing or "").split(","), *fields]:
+        field = field.strip()
+        if field:
+            merged.setdefault(field.lower(), field)
+    return ", ".join(merged.values())
+
+
+class HTTPCacheMiddleware:
+    """
+    ASGI middleware applying per-route caching policies.
+
+    ``policies`` maps route templates to a Cache-Control value; other routes
+    pass through untouched, as do streamed (event-stream) responses. For a
+    matched route, JSON responses are buffered so that a strong ETag can be
+    computed from the body when the endpoint did not set one, and GET
+    requests whose If-None-Match matches get a 304 with the same validators.
+    Cacheable responses vary on ``Origin`` because CORS headers do.
+    """
+
+    def __init__(self, app: ASGIApp, policies: dict[str, str] | None = None):
+        self.app = app
+        self.policies = settings.http_cache_policies if policies is None else policies
+        self.not_modified = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                policy = self._policy(scope)
+                headers = Headers(raw=message["headers"])
+                if policy is None or not headers.get("content-type", "").startswith(
+                    "application/json"
+                ):
+                    await send(message)
+                    return
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._send_buffered(scope, start, b"".join(chunks), send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _policy(self, scope: Scope) -> str | None:
+        route = scope.get("route")
+        return self.policies.get(getattr(route, "path", None))
+
+    async def _send_buffered(self, scope: Scope, start: Message, body: bytes, send: Send) -> None:
+        policy = self._policy(scope)
+        headers = MutableHeaders(raw=list(start["headers"]))
+        status_code = start["status"]
+
+        if status_code == 200:
+            if "etag" not in headers:
+                headers["etag"] = strong_etag(body)
+            headers.setdefault("cache-control", policy)
+            if "no-store" not in policy:
+                headers["vary"] = merge_vary(headers.get("vary"), *CORS_VARY)
+
+            if_none_match = Headers(scope=scope).get("if-none-match")
+            if (
+                scope["method"] in ("GET", "HEAD")
+                and if_none_match is not None
+                and etag_matches(if_none_match, headers["etag"])
+            ):
+                self.not_modified += 1
+                kept = [
+                    (name, value)
+                    for name, value in headers.raw
+                    if name.decode("latin-1").lower() in NOT_MODIFIED_HEADERS
+                ]
+                await send({"type": "http.response.start", "status": 304, "headers": kept})
+                await send({"type": "http.response.body", "body": b""})
+                return
+        else:
+            # Errors (429, 5xx, ...) must not be stored in place of the real answer
+            headers.setdefault("cache-control", "no-store")
+
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,416 @@
+"""
+In-process metrics with a Prometheus text exposition.
+Counters and histograms are plain per-worker dicts updated from the event loop,
+so recording a sample is a dict update; with several workers, snapshots are
+shared through a directory and summed at scrape time.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Request latencies, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage latencies, down to the tens of microseconds spent building prompts
+STAGE_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# (name, help, labels, value) samples produced at scrape time
+GaugeSample = tuple[str, str, dict[str, str], float]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = []
+    for name, value in zip(names, values, strict=True):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _process_running(pid: str) -> bool:
+    """Whether a process with this id runs on this host (True when it cannot be told)."""
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except OSError:
+        return True  # Exists, but belongs to another user
+    return True
+
+
+class Counter:
+    """Monotonic counter; label values are passed positionally in ``labelnames`` order."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add ``amount`` to the series for these label values."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def snapshot(self) -> list:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, snapshot: list) -> None:
+        for labels, value in snapshot:
+            self.inc(*labels, amount=value)
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+    def _empty(self) -> "Counter":
+        return Counter(self.name, self.help, self.labelnames)
+
+
+class _Timer:
+    """Observes the time spent in a ``with`` block."""
+
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram: "Histogram", labels: tuple[str, ...]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started, *self._labels)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    Each series is one list: a count per bucket (non-cumulative, plus the
+    overflow bucket) followed by the sum, so an observation is a bisect and
+    two list updates. Buckets are made cumulative only when rendering.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation for these label values."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def snapshot(self) -> list:
+        return [[list(labels), series] for labels, series in self._series.items()]
+
+    def merge(self, snapshot: list) -> None:
+        for labels, other in snapshot:
+            series = self._series.get(tuple(labels))
+            if series is None or len(series) != len(other):
+                self._series[tuple(labels)] = list(other)
+            else:
+                for i, value in enumerate(other):
+                    series[i] += value
+
+    def render(self) -> list[str]:
+        lines = []
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series[:-1], strict=True):
+                cumulative += count
+                bucket_labels = _format_labels((*self.labelnames, "le"), (*labels, bound))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+    def _empty(self) -> "Histogram":
+        return Histogram(self.name, self.help, self.labelnames, self.buckets)
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of one worker and renders them for Prometheus.
+
+    Gauges are not stored: collectors registered with :meth:`add_collector` are
+    called at scrape time and return current values (cache hit ratios, pool
+    sizes). When ``directory`` is set, every worker writes its counters and
+    histograms there every ``flush_interval`` seconds and a scrape of any
+    worker returns the sum over all of them. A worker removes its file when it
+    stops; files not rewritten for three flush intervals are left out of the
+    sum, and deleted once their worker process is gone.
+    """
+
+    def __init__(self, directory: str | Path | None = None, flush_interval: float | None = None):
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval or settings.metrics_flush_seconds
+        self.stale_after = 3 * self.flush_interval
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._collectors: list[Callable[[], Iterable[GaugeSample]]] = []
+        self._task: asyncio.Task | None = None
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        """Create (or return the existing) counter with this name."""
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create (or return the existing) histogram with this name."""
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[GaugeSample]]) -> None:
+        """Register a callable returning gauge samples at scrape time."""
+        self._collectors.append(collector)
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    async def scrape(self) -> str:
+        """Render for a scrape, reading the other workers' snapshots in a worker thread."""
+        snapshots = await asyncio.to_thread(self.read_snapshots) if self.directory else []
+        return self.render(snapshots)
+
+    def render(self, snapshots: Iterable[dict] = ()) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format (version 0.0.4).
+
+        Args:
+            snapshots: Other workers' counters and histograms (from
+                :meth:`read_snapshots`) to add to this worker's.
+
+        Returns:
+            str: Counters and histograms (summed over workers when sharing a
+            directory), followed by this worker's gauges.
+        """
+        snapshots = list(snapshots)
+        metrics = self._merged(snapshots) if snapshots else self._metrics
+        lines = []
+        for metric in metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        described = set()
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e!s}")
+                continue
+            for name, help, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {name} {help}")
+                    lines.append(f"# TYPE {name} gauge")
+                labels_text = _format_labels(labels.keys(), labels.values())
+                lines.append(f"{name}{labels_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _merged(self, snapshots: list[dict]) -> dict[str, Counter | Histogram]:
+        """Sum this worker's live metrics with the snapshots of the other workers."""
+        merged = {name: metric._empty() for name, metric in self._metrics.items()}
+        for snapshot in (self._snapshot(), *snapshots):
+            for name, series in snapshot.items():
+                if name in merged:
+                    merged[name].merge(series)
+        return merged
+
+    def _snapshot(self) -> dict[str, list]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    @property
+    def _path(self) -> Path:
+        return self.directory / f"{os.getpid()}.json"
+
+    def read_snapshots(self) -> list[dict]:
+        """
+        Read the snapshots of the other live workers from the shared directory.
+
+        Snapshots older than ``stale_after`` seconds are skipped, and their
+        files removed when the process that wrote them no longer runs.
+        """
+        snapshots = []
+        stale_before = time.time() - self.stale_after
+        for path in self.directory.glob("*.json"):
+            if path == self._path:
+                continue
+            try:
+                if path.stat().st_mtime < stale_before:
+                    if not _process_running(path.stem):
+                        path.unlink(missing_ok=True)
+                    continue
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Being replaced, or a worker died mid-write
+        return snapshots
+
+    def flush(self) -> None:
+        """Write this worker's snapshot to the shared directory (atomically)."""
+        if self.directory is not None:
+            self._write(self._snapshot())
+
+    def _write(self, snapshot: dict[str, list]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snapshot, separators=(",", ":")))
+        tmp.replace(self._path)
+
+    async def start(self) -> None:
+        """Start flushing snapshots periodically (only when sharing a directory)."""
+        if self.directory is not None and self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(), name="metrics-flush")
+
+    async def stop(self) -> None:
+        """Stop flushing and remove this worker's snapshot, so it leaves the sums."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self.directory is not None:
+            with contextlib.suppress(OSError):
+                self._path.unlink(missing_ok=True)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                # Copy the series on the loop, write the file off it
+                await asyncio.to_thread(self._write, self._snapshot())
+            except OSError as e:
+                logger.warning(f"Could not write metrics snapshot: {e!s}")
+            await asyncio.sleep(self.flush_interval)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route.
+
+    Requests are labelled with the route's path template (``/api/quotes/generate``),
+    so path parameters do not create new series; anything that did not match an
+    API route is labelled ``other``. Streaming responses are timed until their
+    last body chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "other")
+            method = scope["method"]
+            http_requests.inc(method, path, str(status_code))
+            http_request_seconds.observe(time.perf_counter() - started, method, path)
+
+
+# Per-worker registry, shared across workers through METRICS_DIR when set
+registry = MetricsRegistry(directory=settings.metrics_dir)
+
+http_requests = registry.counter(
+    "swan_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_request_seconds = registry.histogram(
+    "swan_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+stage_seconds = registry.histogram(
+    "swan_stage_duration_seconds",
+    "Time spent in each quote generation stage.",
+    ("stage",),
+    buckets=STAGE_BUCKETS,
+)
+model_tokens = registry.counter(
+    "swan_model_tokens_total", "Model tokens used, from the response usage metadata.", ("kind",)
+)
+model_errors = registry.counter(
+    "swan_model_errors_total", "Failed model call attempts by error type.", ("type",)
+)
+quotes_served = registry.counter(
+    "swan_quotes_served_total", "Quotes served by where they came from.", ("source",)
+)
@@ -0,0 +1,178 @@
+"""
+Routing of model calls over several API keys and models.
+Each (key, model) pair is a candidate with its own request quota; calls go to
+the candidate with the best latency and error record in the tier that suits
+the quote, and move on to the next candidate when a key's quota runs out.
+"""
+
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import settings
+
+from .admission import TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "fast"  # Short, plain quotes
+LARGE_TIER = "large"  # Long or styled quotes
+
+
+def model_tier(length: str | None, style: str | None) -> str:
+    """Tier for a quote: larger models for long or styled quotes, the fast one otherwise."""
+    if length == "long" or (style and style.strip()):
+        return LARGE_TIER
+    return FAST_TIER
+
+
+@dataclass(eq=False)
+class RouteCandidate:
+    """One API key and model pair, with its quota and running scores."""
+
+    key_index: int
+    api_key: str = field(repr=False)
+    model: str
+    tier: str
+    bucket: TokenBucket = field(repr=False)
+    latency: float | None = None  # EWMA of call seconds, None until the first call
+    error_rate: float = 0.0  # EWMA of failed calls (0..1)
+    cooldown_until: float = 0.0  # Monotonic time the key's quota is expected back
+    handle: Any = field(default=None, repr=False)  # Backend client, created on first use
+
+    calls: int = 0
+    errors: int = 0
+    quota_exhausted: int = 0
+
+    @property
+    def label(self) -> str:
+        """Name for logs and stats; never includes the key itself."""
+        return f"{self.model}#{self.key_index}"
+
+
+class ModelRouter:
+    """
+    Chooses the (key, model) candidate for each model call.
+
+    Candidates of the requested tier are ranked by their latency EWMA,
+    inflated by ``1 + error_penalty * error rate``; candidates never used rank
+    first, so each gets tried. A candidate is skipped while its request bucket
+    (``rate_per_minute`` per key and model, as Gemini quotas are) is empty or
+    while it cools down after a quota error. When the tier has nothing left,
+    the other tiers are used rather than failing the call.
+    """
+
+    def __init__(
+        self,
+        api_keys: Iterable[str] | None = None,
+        tiers: dict[str, list[str]] | None = None,
+        rate_per_minute: float | None = None,
+        burst: float | None = None,
+        cooldown: float | None = None,
+        alpha: float | None = None,
+        error_penalty: float | None = None,
+    ):
+        keys = list(dict.fromkeys(k for k in (api_keys or self.configured_keys()) if k))
+        tiers = tiers or settings.router_tiers or {FAST_TIER: [settings.default_model]}
+        rate = settings.router_key_rate_per_minute if rate_per_minute is None else rate_per_minute
+        burst = burst or settings.router_key_burst
+        self.cooldown = settings.router_quota_cooldown_seconds if cooldown is None else cooldown
+        self.alpha = alpha or settings.router_ewma_alpha
+        self.error_penalty = (
+            settings.router_error_penalty if error_penalty is None else error_penalty
+        )
+        self.candidates = [
+            RouteCandidate(
+                key_index=index,
+                api_key=key,
+                model=model,
+                tier=tier,
+                bucket=TokenBucket(rate / 60, burst),
+            )
+            for tier, models in tiers.items()
+            for model in models
+            for index, key in enumerate(keys)
+        ]
+        self.failovers = 0
+        self.unavailable = 0
+
+    @staticmethod
+    def configured_keys() -> list[str]:
+        """The primary API key followed by the extra ones."""
+        return [settings.gemini_api_key, *settings.gemini_api_keys]
+
+    def _score(self, candidate: RouteCandidate) -> float:
+        if candidate.latency is None:
+            return 0.0
+        return candidate.latency * (1 + self.error_penalty * candidate.error_rate)
+
+    def acquire(
+        self, tier: str | None = None, exclude: Iterable[RouteCandidate] = ()
+    ) -> RouteCandidate | None:
+        """
+        Take a request from the best candidate that still has quota.
+
+        Args:
+            tier (Optional[str]): Preferred tier; None (or an unknown tier) ranks all candidates.
+            exclude: Candidates already tried for this call.
+
+        Returns:
+            Optional[RouteCandidate]: The chosen candidate, or None when every
+            candidate is excluded, cooling down or out of quota.
+        """
+        excluded = set(exclude)
+        now = time.monotonic()
+        usable = [c for c in self.candidates if c not in excluded and c.cooldown_until <= now]
+        preferred = [c for c in usable if c.tier == tier]
+        others = [c for c in usable if c.tier != tier] if preferred else usable
+        for group in (preferred, others):
+            for candidate in sorted(group, key=self._score):
+                if candidate.bucket.try_take():
+                    if excluded:
+                        self.failovers += 1
+                    candidate.calls += 1
+                    return candidate
+        self.unavailable += 1
+        return None
+
+    def record(self, candidate: RouteCandidate, seconds: float, failed: bool | None) -> None:
+        """
+        Update a candidate's scores after a call.
+
+        ``failed`` is None when the outcome is unknown (the call was cancelled,
+        e.g. by a hedge or a timeout); its duration still counts as latency.
+        """
+        if candidate.latency is None:
+            candidate.latency = seconds
+        else:
+            candidate.latency += self.alpha * (seconds - candidate.latency)
+        if failed is not None:
+            candidate.error_rate += self.alpha * (float(failed) - candidate.error_rate)
+            candidate.errors += failed
+
+    def record_quota_exhausted(self, candidate: RouteCandidate) -> None:
+        """Take a candidate out of rotation after the provider reported its quota exhausted."""
+        candidate.quota_exhausted += 1
+        candidate.bucket.drain()
+        candidate.cooldown_until = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict[str, float]:
+        """Return routing counters and the scores of every candidate."""
+        stats: dict[str, float] = {
+            "candidates": len(self.candidates),
+            "failovers": self.failovers,
+            "unavailable": self.unavailable,
+        }
+        now = time.monotonic()
+        for c in self.candidates:
+            stats[f"{c.label}.calls"] = c.calls
+            stats[f"{c.label}.errors"] = c.errors
+            stats[f"{c.label}.quota_exhausted"] = c.quota_exhausted
+            stats[f"{c.label}.error_rate"] = round(c.error_rate, 3)
+            if c.latency is not None:
+                stats[f"{c.label}.latency_ms"] = round(c.latency * 1000, 1)
+            stats[f"{c.label}.cooling"] = int(c.cooldown_until > now)
+        return stats
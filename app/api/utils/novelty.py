@@ -0,0 +1,158 @@
+"""
+Near-duplicate suppression for served quotes.
+MinHash signatures of character shingles, indexed with LSH banding over a
+bounded window of recently served quotes per category and language.
+"""
+
+import logging
+import re
+from collections import deque
+from collections.abc import Hashable
+
+from app.config import settings
+
+from .quote_library import normalize
+
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_MASK64 = (1 << 64) - 1
+_EMPTY_BIN = _MASK64
+
+
+class _RecentQuotes:
+    """Ring buffer of signatures for one key with LSH buckets over their bands."""
+
+    __slots__ = ("buckets", "order", "signatures")
+
+    def __init__(self):
+        self.order: deque[int] = deque()
+        self.signatures: dict[int, tuple[int, ...]] = {}
+        self.buckets: dict[tuple, set[int]] = {}
+
+
+class NoveltyFilter:
+    """
+    Tells whether a quote is too similar to one served recently.
+
+    Each quote is reduced to a ``num_bins``-value MinHash signature of its
+    character shingles (one-permutation hashing with densification: one hash
+    per shingle), so English and Arabic are handled the same way. Signatures
+    are split into ``bands`` bands for LSH; quotes sharing a band are compared
+    by estimated Jaccard similarity. Only the last ``window`` quotes per key are
+    kept, so memory is bounded by ``keys * window * num_bins``.
+    """
+
+    def __init__(
+        self,
+        threshold: float | None = None,
+        window: int | None = None,
+        shingle_size: int | None = None,
+        num_bins: int = 32,
+        bands: int = 16,
+    ):
+        if num_bins % bands:
+            raise ValueError("num_bins must be a multiple of bands")
+        self.threshold = threshold or settings.novelty_threshold
+        self.window = window or settings.novelty_window
+        self.shingle_size = shingle_size or settings.novelty_shingle_size
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self._recent: dict[Hashable, _RecentQuotes] = {}
+
+        self.checked = 0
+        self.rejected = 0
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        """MinHash signature of the text's character shingles."""
+        normalized = _NON_WORD_RE.sub(" ", normalize(text)).strip()
+        size = self.shingle_size
+        shingles = {normalized[i : i + size] for i in range(max(1, len(normalized) - size + 1))}
+
+        bins = [_EMPTY_BIN] * self.num_bins
+        for shingle in shingles:
+            h = hash(shingle) & _MASK64
+            index, value = h % self.num_bins, h // self.num_bins
+            if value < bins[index]:
+                bins[index] = value
+
+        # Densify: an empty bin borrows the next filled bin's value, offset by the distance
+        filled = [i for i, value in enumerate(bins) if value != _EMPTY_BIN]
+        if filled and len(filled) < self.num_bins:
+            for i in range(self.num_bins):
+                if bins[i] == _EMPTY_BIN:
+                    j = next((f for f in filled if f > i), filled[0])
+                    distance = (j - i) % self.num_bins
+                    bins[i] = (bins[j] + distance * 0x9E3779B97F4A7C15) & _MASK64
+        return tuple(bins)
+
+    def similarity(self, a: tuple[int, ...], b: tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(1 for x, y in zip(a, b, strict=True) if x == y) / self.num_bins
+
+    def is_novel(self, key: Hashable, text: str) -> bool:
+        """
+        Check a candidate quote against the recent quotes for ``key`` without storing it.
+
+        Args:
+            key (Hashable): Usually (category, language).
+            text (str): Candidate quote.
+
+        Returns:
+            bool: False if a recent quote is at least ``threshold`` similar.
+        """
+        self.checked += 1
+        recent = self._recent.get(key)
+        if recent is None:
+            return True
+
+        signature = self.signature(text)
+        candidates: set[int] = set()
+        for band in self._bands(signature):
+            candidates |= recent.buckets.get(band, set())
+        if not candidates:
+            return True
+
+        for entry_id in candidates:
+            if self.similarity(signature, recent.signatures[entry_id]) >= self.threshold:
+                self.rejected += 1
+                return False
+        return True
+
+    def remember(self, key: Hashable, text: str) -> None:
+        """Record a served quote, evicting the oldest one beyond ``window``."""
+        recent = self._recent.get(key)
+        if recent is None:
+            recent = self._recent[key] = _RecentQuotes()
+
+        signature = self.signature(text)
+        entry_id = recent.order[-1] + 1 if recent.order else 0
+        recent.order.append(entry_id)
+        recent.signatures[entry_id] = signature
+        for band in self._bands(signature):
+            recent.buckets.setdefault(band, set()).add(entry_id)
+
+        if len(recent.order) > self.window:
+            old_id = recent.order.popleft()
+            for band in self._bands(recent.signatures.pop(old_id)):
+                bucket = recent.buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del recent.buckets[band]
+
+    def _bands(self, signature: tuple[int, ...]) -> list[tuple]:
+        rows = self.rows
+        return [(b, *signature[b * rows : (b + 1) * rows]) for b in range(self.bands)]
+
+    def stats(self) -> dict[str, float]:
+        """Return remembered quote counts and the rejection rate."""
+        return {
+            "keys": len(self._recent),
+            "remembered": sum(len(r.order) for r in self._recent.values()),
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "rejection_ratio": self.rejected / self.checked if self.checked else 0.0,
+        }
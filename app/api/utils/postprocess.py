@@ -0,0 +1,263 @@
+"""
+Post-processing of raw model output into a clean quote.
+A pipeline of small text steps over precompiled patterns, applied to whole
+answers, to streamed chunks and to batches of answers.
+"""
+
+import logging
+import re
+from collections.abc import Callable, Iterable
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Meta-commentary and section headers the model sometimes puts before the quote
+UNWANTED_PREFIXES = (
+    "As a large language model,",
+    "As an AI,",
+    "Here is your quote:",
+    "Here's your quote:",
+    "Here is a quote:",
+    "Here's a quote:",
+    "Quote:",
+    "**Arabic:**",
+    "**English:**",
+    "**English Translation:**",
+    "Arabic:",
+    "الاقتباس:",  # "The quote:" in Arabic
+)
+_PREFIXES_CASEFOLDED = tuple(p.casefold() for p in UNWANTED_PREFIXES)
+_MAX_PREFIX_LENGTH = max(len(p) for p in UNWANTED_PREFIXES)
+
+# Quotes, markdown and whitespace trimmed from both ends of the quote
+EDGE_CHARS = " \t\r\n\"'\u201c\u201d\u2018\u2019«»*_#>`"
+
+# Leading run of edge characters and prefixes, in any order, matched in one pass
+_PREAMBLE_RE = re.compile(
+    rf"^(?:[{re.escape(EDGE_CHARS)}]|{'|'.join(map(re.escape, UNWANTED_PREFIXES))})+",
+    re.IGNORECASE,
+)
+
+# Start of an appended translation; everything from here on is dropped
+_TRANSLATION_RE = re.compile(
+    r"(?:\n|\(|\[|[*_]{2}|(?<=[.!?؟\"”»]))[ \t]*(?:[*_]{2})?[ \t]*"
+    r"(?:English[ \t]+)?Translation[ \t]*:"
+    r"|\n[ \t]*(?:[*_]{2})?[ \t]*English[ \t]*:",
+    re.IGNORECASE,
+)
+
+# Bold section headers removed wherever they appear
+_HEADER_RE = re.compile(r"[*_]{2}[ \t]*(?:Arabic|English)[ \t]*:[ \t]*[*_]{2}", re.IGNORECASE)
+
+# Single characters removed anywhere: markdown emphasis and code marks,
+# bidi/zero-width controls and the Arabic tatweel
+_DELETE_RE = re.compile("[*`\u200b\u200e\u200f\u202a-\u202e\u2066-\u2069\u061c\ufeff\u0640]+")
+
+# Characters that can start an attribution
+_DASHES = ("-", "~", "\u2013", "\u2014")
+
+# A capitalised (or Arabic) name word, possibly 'al-'-prefixed, and the particles
+# allowed between name words
+_NAME_WORD = "(?:(?:[a-z]{1,3}-)?[A-Z\u00c0-\u00d6\u00d8-\u00de][\\w'\u2019.-]*|[\u0621-\u064a]+)"
+_NAME_PARTICLE = r"(?:de|da|di|du|van|von|der|den|del|la|le|ibn|bin|al|el|of|the)"
+
+# A trailing attribution such as '— Rumi' or '- Marcus Aurelius, Meditations'
+# after the end of the last sentence; only name-like phrases, so a dash that
+# continues the sentence ('- it does not envy') is kept
+_ATTRIBUTION_RE = re.compile(
+    "(?<=[.!?؟\"'\u201d»])[ \t]*(?:[\u2014\u2013~]|--?)[ \t]*"
+    rf"{_NAME_WORD}(?:[ \t]+(?:{_NAME_PARTICLE}[ \t]+)*{_NAME_WORD}){{0,4}}"
+    r"(?:,[ \t]*[^\W_][^\n.!?؟]{0,40}|[ \t]*\([^\n)]{0,20}\))?[ \t]*$",
+    re.MULTILINE,
+)
+
+# Arabic harakat and the superscript alef
+_ARABIC_DIACRITICS_RE = re.compile("[\u064b-\u065f\u0670]")
+
+_SPACES_RE = re.compile(r"[ \t]+")
+
+# Streaming holds back text after these, since a translation marker or an
+# attribution may still follow and cut the quote there
+_HOLD_CHARS = frozenset(".!?؟\"'”»\n([_*")
+_HOLD_WINDOW = 64
+
+Step = Callable[[str], str]
+
+
+def strip_preamble(text: str) -> str:
+    """Drop leading meta-commentary prefixes, quotes and markdown."""
+    return _PREAMBLE_RE.sub("", text, count=1)
+
+
+def cut_translation(text: str) -> str:
+    """Keep only the text before an appended translation."""
+    folded = text.lower()
+    if "translation" not in folded and "english" not in folded:
+        return text
+    match = _TRANSLATION_RE.search(text)
+    return text[: match.start()] if match else text
+
+
+def remove_markup(text: str) -> str:
+    """Remove section headers, markdown marks, bidi controls and tatweel."""
+    if "**" in text or "__" in text:
+        text = _HEADER_RE.sub("", text)
+    return _DELETE_RE.sub("", text)
+
+
+def strip_attribution(text: str) -> str:
+    """Drop a trailing '— Author' style attribution."""
+    if not any(dash in text for dash in _DASHES):
+        return text
+    return _ATTRIBUTION_RE.sub("", text)
+
+
+def strip_diacritics(text: str) -> str:
+    """Remove Arabic diacritics (harakat)."""
+    return _ARABIC_DIACRITICS_RE.sub("", text)
+
+
+def tidy(text: str) -> str:
+    """Collapse runs of spaces and trim quotes, markdown and whitespace at both ends."""
+    if "  " in text or "\t" in text:
+        text = _SPACES_RE.sub(" ", text)
+    return text.strip(EDGE_CHARS)
+
+
+def default_steps(
+    strip_attributions: bool | None = None, strip_arabic_diacritics: bool | None = None
+) -> list[Step]:
+    """
+    Build the standard pipeline.
+
+    Args:
+        strip_attributions (Optional[bool]): Drop trailing attributions
+            (default from settings).
+        strip_arabic_diacritics (Optional[bool]): Remove harakat
+            (default from settings).
+
+    Returns:
+        list[Step]: Steps in the order they are applied.
+    """
+    if strip_attributions is None:
+        strip_attributions = settings.postprocess_strip_attribution
+    if strip_arabic_diacritics is None:
+        strip_arabic_diacritics = settings.postprocess_strip_diacritics
+
+    steps: list[Step] = [strip_preamble, cut_translation, remove_markup]
+    if strip_attributions:
+        steps.append(strip_attribution)
+    if strip_arabic_diacritics:
+        steps.append(strip_diacritics)
+    steps.append(tidy)
+    return steps
+
+
+class QuotePostProcessor:
+    """
+    Turns raw model output into the quote text that is served.
+
+    The pipeline is a list of ``str -> str`` steps and can be extended with
+    :meth:`add_step`. Steps should only change text locally or near the ends
+    of the quote, which is what lets :meth:`stream` release text early.
+    """
+
+    def __init__(self, steps: list[Step] | None = None):
+        self.steps = list(steps) if steps is not None else default_steps()
+
+    def add_step(self, step: Step, before: Step | None = None) -> None:
+        """Add a step at the end of the pipeline, or before an existing step."""
+        index = self.steps.index(before) if before is not None else len(self.steps)
+        self.steps.insert(index, step)
+
+    def process(self, text: str) -> str:
+        """
+        Clean one model answer.
+
+        Args:
+            text (str): Raw model output.
+
+        Returns:
+            str: The quote text (empty if nothing usable is left).
+        """
+        for step in self.steps:
+            text = step(text)
+        return text
+
+    def process_many(self, texts: Iterable[str]) -> list[str]:
+        """Clean several model answers, e.g. the items of a numbered-list answer."""
+        steps = self.steps
+        results = []
+        for text in texts:
+            for step in steps:
+                text = step(text)
+            results.append(text)
+        return results
+
+    def stream(self) -> "StreamingPostProcessor":
+        """Start incremental processing of one streamed answer."""
+        return StreamingPostProcessor(self)
+
+
+class StreamingPostProcessor:
+    """
+    Incremental post-processing for streamed output.
+
+    Each chunk re-runs the pipeline over the answer so far (quotes are short)
+    and releases the part that can no longer change: nothing while the start
+    could still become a prefix, and never the text after a sentence end or
+    a marker character near the end, where a translation or attribution may
+    still cut the quote. The released deltas concatenate to ``process`` of
+    the whole answer.
+    """
+
+    def __init__(self, processor: QuotePostProcessor):
+        self._processor = processor
+        self._raw: list[str] = []
+        self._emitted = 0
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a raw chunk and return the text that is now safe to emit."""
+        if self._done or not chunk:
+            return ""
+        self._raw.append(chunk)
+        text = self._processor.process("".join(self._raw))
+
+        if not self._started:
+            folded = text.casefold()
+            if not text or (
+                len(folded) < _MAX_PREFIX_LENGTH
+                and any(p.startswith(folded) for p in _PREFIXES_CASEFOLDED)
+            ):
+                return ""  # Could still become a prefix; wait for more text
+            self._started = True
+
+        safe = len(text)
+        for i in range(len(text) - 1, max(self._emitted, len(text) - _HOLD_WINDOW) - 1, -1):
+            if text[i] in _HOLD_CHARS:
+                safe = i
+                break
+        # Whitespace before held text is dropped if the quote gets cut there
+        while safe > self._emitted and text[safe - 1].isspace():
+            safe -= 1
+        return self._release(text, safe)
+
+    def finish(self) -> str:
+        """Flush whatever is left once the stream has ended."""
+        if self._done:
+            return ""
+        self._done = True
+        return self._release(self._processor.process("".join(self._raw)), None)
+
+    def _release(self, text: str, end: int | None) -> str:
+        delta = text[self._emitted : end]
+        self._emitted += len(delta)
+        return delta
+
+
+# Shared pipeline built from settings
+quote_postprocessor = QuotePostProcessor()
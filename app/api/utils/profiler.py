@@ -0,0 +1,148 @@
+"""
+Sampling stack profiler for the event loop thread.
+Runs only while at least one sampled request is in flight; does nothing (and
+starts no thread) until the first sampled request arrives.
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Bucket for new stacks once ``max_stacks`` distinct stacks have been recorded
+OTHER_STACK = "[other]"
+
+
+class StackSampler:
+    """
+    Periodically records the call stack of the event loop thread.
+
+    Stacks are aggregated in the "folded" format used by flame graph tools
+    (``module:function;module:function``, root first) with a sample count each.
+    Because the loop interleaves requests, a sample belongs to whatever the loop
+    was running while a profiled request was active, not strictly to that
+    request; with a low sample rate that is still where the time goes.
+    """
+
+    def __init__(
+        self,
+        interval: float | None = None,
+        max_depth: int = 48,
+        max_stacks: int = 5000,
+    ):
+        self.interval = interval or settings.profile_interval_ms / 1000
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+
+        self._stacks: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._target_thread_id: int | None = None
+
+        self.samples = 0
+        self.profiled_requests: Counter[str] = Counter()
+
+    def begin(self) -> None:
+        """Start sampling for one request; call from the event loop thread."""
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._target_thread_id = threading.get_ident()
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def end(self, label: str = "") -> None:
+        """Stop sampling for one request, counting it under ``label`` (its route template)."""
+        with self._lock:
+            self._active = max(0, self._active - 1)
+            self.profiled_requests[label] += 1
+            if not self._active:
+                self._wakeup.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is not None and self._active:
+                self._record(self._fold(frame))
+
+    def _fold(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _record(self, stack: str) -> None:
+        with self._lock:
+            if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                stack = OTHER_STACK
+            self._stacks[stack] += 1
+            self.samples += 1
+
+    def report(self, limit: int = 50) -> dict:
+        """
+        Summarize the samples collected so far.
+
+        Args:
+            limit (int): Number of hottest stacks and functions to return.
+
+        Returns:
+            dict: Sample and request counts, the hottest stacks, and the functions
+            most often on top of the stack (self time).
+        """
+        with self._lock:
+            stacks = self._stacks.most_common()
+            samples = self.samples
+            requests = dict(self.profiled_requests)
+
+        leaves: Counter[str] = Counter()
+        for stack, count in stacks:
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "samples": samples,
+            "interval_ms": self.interval * 1000,
+            "profiled_requests": requests,
+            "top_functions": [
+                {"function": name, "samples": count, "share": count / samples}
+                for name, count in leaves.most_common(limit)
+            ],
+            "top_stacks": [{"stack": stack, "samples": count} for stack, count in stacks[:limit]],
+        }
+
+    def folded(self) -> str:
+        """All stacks in folded format, one ``stack count`` per line."""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def reset(self) -> None:
+        """Drop the collected samples."""
+        with self._lock:
+            self._stacks.clear()
+            self.profiled_requests.clear()
+            self.samples = 0
+
+
+def create_profiler() -> StackSampler | None:
+    """The request profiler, only available in debug mode with a sample rate set."""
+    if settings.debug and settings.profile_sample_rate > 0:
+        logger.warning(
+            f"Request profiling enabled for {settings.profile_sample_rate:.1%} of requests"
+        )
+        return StackSampler()
+    return None
+
+
+# Shared by the timing middleware and the admin API; None when profiling is off
+profiler = create_profiler()
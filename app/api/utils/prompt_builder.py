@@ -2,15 +2,72 @@
 Utility for building AI prompts for quote generation.
 """
 
+import hashlib
 import logging
-from typing import ClassVar
+import re
+from typing import ClassVar, NamedTuple
 
 from app.api.models import QuoteCategory
 from app.config import settings
 
+from .postprocess import quote_postprocessor
+
 
 logger = logging.getLogger(__name__)
 
+# Matches one item of a numbered list such as "1. text" or "2) text"
+_NUMBERED_ITEM_RE = re.compile(r"^\s*(\d+)\s*[.)\-:]\s*(.+?)\s*$", re.MULTILINE)
+
+# Bump whenever prompt wording changes in a way the fingerprint cannot see
+PROMPT_VERSION = 2
+
+# Sent once per model as the system instruction rather than with every prompt
+SYSTEM_PROMPT = (
+    "You are Swan, a quote generator. Generate one original quote only. Do not include "
+    "meta-commentary, explanations, translations, or any additional text. Output only the "
+    "requested quote text in the specified language."
+)
+
+CATEGORIES = frozenset(c.value for c in QuoteCategory)
+LANGUAGES = ("en", "ar")
+
+LANGUAGE_INSTRUCTIONS = {
+    "en": ". Write ONLY in English.",
+    "ar": ". Write ONLY in Arabic. Do not include English translation or explanations.",
+}
+
+# What the answer may contain, for single-quote and numbered-list (batch) prompts
+QUOTE_OUTPUT_INSTRUCTIONS = {
+    "en": " Output only the quote text.",
+    "ar": " Output only the Arabic quote text.",
+}
+BATCH_OUTPUT_INSTRUCTIONS = {
+    "en": " Output only the quotes as a numbered list, one per line (1. ..., 2. ...).",
+    "ar": " Output only the Arabic quotes as a numbered list, one per line (1. ..., 2. ...).",
+}
+
+
+class CompiledPrompt(NamedTuple):
+    """A prompt with everything but the topic filled in, plus its fingerprint."""
+
+    head: str
+    tail: str
+    fingerprint: str
+
+    def render(self, topic: str | None = None) -> str:
+        """Fill the topic slot (omitted when there is no topic)."""
+        if topic:
+            return f"{self.head} about {topic}{self.tail}"
+        return self.head + self.tail
+
+
+def prompt_fingerprint(*parts: str) -> str:
+    """Short stable hash of the prompt version, system prompt and template parts."""
+    digest = hashlib.sha256(f"v{PROMPT_VERSION}".encode())
+    for part in (SYSTEM_PROMPT, *parts):
+        digest.update(b"\0" + part.encode())
+    return digest.hexdigest()[:12]
+
 
 class PromptBuilder:
     """Builds optimized prompts for AI quote generation"""
@@ -38,6 +95,14 @@ class PromptBuilder:
         QuoteCategory.RANDOM.value: "Generate a creative quote on any theme, ensuring originality.",
     }
 
+    # Target word count for each supported length
+    WORD_COUNTS: ClassVar[dict[str, str]] = {"short": "15", "medium": "25", "long": "45"}
+
+    # (category, length, language) -> compiled prompt, filled in below the class
+    PROMPT_TABLE: ClassVar[dict[tuple[str, str, str], CompiledPrompt]] = {}
+    # Same keys, numbered-list prompts; the head follows "Create {count}"
+    BATCH_PROMPT_TABLE: ClassVar[dict[tuple[str, str, str], CompiledPrompt]] = {}
+
     # Example quotes for each category
     EXAMPLE_QUOTES: ClassVar[dict[str, str]] = {
         QuoteCategory.MOTIVATION.value: "Perseverance turns dreams into reality with every bold step.",
@@ -75,6 +140,54 @@ class PromptBuilder:
             return "modern"
         return style
 
+    @staticmethod
+    def _prompt_key(category: str, length: str, language: str) -> tuple[str, str, str]:
+        """Normalize the parameters into a key of the prompt tables."""
+        if category not in CATEGORIES:
+            logger.warning(f"Invalid category: {category}. Defaulting to 'random'.")
+            category = QuoteCategory.RANDOM.value
+        if length not in PromptBuilder.WORD_COUNTS:
+            logger.error(f"Invalid length: {length}")
+            raise ValueError("Length must be 'short', 'medium', or 'long'")
+        return category, length, "ar" if language == "ar" else "en"
+
+    @staticmethod
+    def compile_prompt(category: str, length: str, language: str) -> CompiledPrompt:
+        """
+        Resolve the compiled prompt for a category, length and language.
+
+        Args:
+            category (str): The category of quote; unknown categories become 'random'.
+            length (str): Desired length ('short', 'medium', 'long').
+            language (str): Language code; anything but 'ar' is treated as English.
+
+        Returns:
+            CompiledPrompt: Prompt template with its fingerprint.
+
+        Raises:
+            ValueError: If length is invalid.
+        """
+        return PromptBuilder.PROMPT_TABLE[PromptBuilder._prompt_key(category, length, language)]
+
+    @staticmethod
+    def compile_batch_prompt(category: str, length: str, language: str) -> CompiledPrompt:
+        """
+        Resolve the compiled numbered-list prompt, as :meth:`compile_prompt` does.
+
+        Returns:
+            CompiledPrompt: Prompt template with the same fingerprint as :meth:`compile_prompt`.
+
+        Raises:
+            ValueError: If length is invalid.
+        """
+        key = PromptBuilder._prompt_key(category, length, language)
+        return PromptBuilder.BATCH_PROMPT_TABLE[key]
+
+    @staticmethod
+    def fingerprint(category: str, length: str = "medium", language: str = "en") -> str:
+        """Fingerprint of the prompts used for these parameters, for cache and pool keys."""
+        return PromptBuilder.compile_prompt(category, length, language).fingerprint
+
     @staticmethod
     def build_quote_prompt(
         category: str,
@@ -84,7 +197,7 @@ class PromptBuilder:
         language: str = "en",
     ) -> str:
         """
-        Build a prompt for quote generation optimized.
+        Build a prompt for quote generation from the compiled prompt table.
 
         Args:
             category (str): The category of quote (e.g., 'motivation', 'inspiration').
@@ -100,56 +213,109 @@ class PromptBuilder:
             ValueError: If length is invalid.
 
         Example:
-            >>> builder = PromptBuilder()
-            >>> builder.build_quote_prompt(
-            ...     category="motivation",
-            ...     topic="perseverance",
-            ...     style="modern",
-            ...     length="medium"
+            >>> PromptBuilder.build_quote_prompt(
+            ...     category="motivation", topic="perseverance", length="short"
             ... )
-            'Generate a concise, original quote. Create an uplifting quote to inspire action and determination. Specifically focus on perseverance. Write in a clear, contemporary language suitable for today's audience. Make it thoughtful (20-40 words, 1-2 sentences). Provide ONLY the quote itself, without attribution or quotation marks.\n\nExample: Perseverance turns dreams into reality with every bold step.'
+            'Create a motivation quote about perseverance in about 15 words. Write ONLY in English. Output only the quote text.'
         """
-        # Validate inputs
-        if category not in [c.value for c in QuoteCategory]:
-            logger.warning(f"Invalid category: {category}. Defaulting to 'random'.")
-            category = QuoteCategory.RANDOM.value
-        if length not in ["short", "medium", "long"]:
-            logger.error(f"Invalid length: {length}")
-            raise ValueError("Length must be 'short', 'medium', or 'long'")
-
-        # Log input parameters if debug mode is enabled
+        prompt = PromptBuilder.compile_prompt(category, length, language).render(topic)
         if settings.debug:
             logger.debug(
-                f"Building prompt with category={category}, topic={topic}, style={style}, length={length}, language={language}"
+                f"Built prompt with category={category}, topic={topic}, style={style}, length={length}, language={language}: {prompt}"
             )
+        return prompt
 
-        # ULTRA-SIMPLE prompt to avoid Gemini blocking issues
-        # Complex prompts with examples can trigger false MAX_TOKENS
-        prompt = f"Create a {category} quote"
+    @staticmethod
+    def build_system_prompt() -> str:
+        """
+        Build a minimal system prompt for fastest generation.
 
-        if topic:
-            prompt += f" about {topic}"
+        Returns:
+            str: Concise system prompt, set once as the model's system instruction.
+        """
+        return SYSTEM_PROMPT
 
-        # Word count only
-        word_count = "15" if length == "short" else "25" if length == "medium" else "45"
-        prompt += f" in about {word_count} words"
+    @staticmethod
+    def build_batch_prompt(
+        category: str,
+        count: int,
+        topic: str | None = None,
+        style: str | None = None,
+        length: str = "medium",
+        language: str = "en",
+    ) -> str:
+        """
+        Build a prompt asking for several distinct quotes as a numbered list.
 
-        # Add language specification with clear instructions
-        if language == "ar":
-            prompt += ". Write ONLY in Arabic. Do not include English translation or explanations. Output only the Arabic quote text."
-        else:
-            prompt += ". Write ONLY in English. Output only the quote text."
+        Args:
+            category (str): The category of quote (e.g., 'motivation', 'inspiration').
+            count (int): Number of quotes to request.
+            topic (Optional[str]): Specific topic for the quotes.
+            style (Optional[str]): Writing style (e.g., 'shakespearean', 'modern').
+            length (str): Desired length of each quote ('short', 'medium', 'long').
+            language (str): Language for the quotes ('en' for English, 'ar' for Arabic).
 
-        if settings.debug:
-            logger.debug(f"Generated prompt: {prompt}")
-        return prompt
+        Returns:
+            str: A prompt whose answer can be split with :meth:`parse_batch_response`.
+
+        Raises:
+            ValueError: If length is invalid.
+
+        Example:
+            >>> PromptBuilder.build_batch_prompt("love", 3, length="short")
+            'Create 3 different love quotes in about 15 words each. Write ONLY in English. Output only the quotes as a numbered list, one per line (1. ..., 2. ...).'
+        """
+        compiled = PromptBuilder.compile_batch_prompt(category, length, language)
+        return f"Create {count}{compiled.render(topic)}"
 
     @staticmethod
-    def build_system_prompt() -> str:
+    def parse_batch_response(text: str, expected: int) -> list[str]:
         """
-        Build a minimal system prompt for fastest generation.
+        Split a numbered-list answer into individual quotes.
+
+        Args:
+            text (str): Raw model output for a prompt from :meth:`build_batch_prompt`.
+            expected (int): Number of quotes requested; extra items are dropped.
 
         Returns:
-            str: Concise system prompt.
+            list[str]: Non-empty, de-duplicated quotes in list order (may be fewer than expected).
         """
-        return "You are Swan, a quote generator. Generate one original quote only. Do not include meta-commentary, explanations, or translations. Output only the requested quote text."
+        quotes: list[str] = []
+        items = (match.group(2) for match in _NUMBERED_ITEM_RE.finditer(text))
+        for quote in quote_postprocessor.process_many(items):
+            if quote and quote not in quotes:
+                quotes.append(quote)
+            if len(quotes) == expected:
+                break
+        return quotes
+
+
+def _compile_prompt_tables() -> None:
+    """
+    Build every (category, length, language) prompt, single and batch, once at import.
+
+    ULTRA-SIMPLE prompts avoid Gemini blocking issues; complex prompts with
+    examples can trigger false MAX_TOKENS. Only the topic slot (and, for batch
+    prompts, the count) is left open. Quotes from both prompts share cache and
+    pool keys, so both templates share one fingerprint covering them both.
+    """
+    for category in CATEGORIES:
+        for length, words in PromptBuilder.WORD_COUNTS.items():
+            for language in LANGUAGES:
+                head = f"Create a {category} quote"
+                tail = f" in about {words} words{LANGUAGE_INSTRUCTIONS[language]}"
+                tail += QUOTE_OUTPUT_INSTRUCTIONS[language]
+                batch_head = f" different {category} quotes"
+                batch_tail = f" in about {words} words each{LANGUAGE_INSTRUCTIONS[language]}"
+                batch_tail += BATCH_OUTPUT_INSTRUCTIONS[language]
+                fingerprint = prompt_fingerprint(
+                    head, "{topic}", tail, "Create {count}", batch_head, "{topic}", batch_tail
+                )
+                key = (category, length, language)
+                PromptBuilder.PROMPT_TABLE[key] = CompiledPrompt(head, tail, fingerprint)
+                PromptBuilder.BATCH_PROMPT_TABLE[key] = CompiledPrompt(
+                    batch_head, batch_tail, fingerprint
+                )
+
+
+_compile_prompt_tables()
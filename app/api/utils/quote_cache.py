@@ -0,0 +1,183 @@
+"""
+In-process response cache for generated quotes.
+Bounded by entry count (LRU) and age (TTL), with several variants stored per key.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import NamedTuple
+
+from app.api.models import QuoteRequest
+from app.config import settings
+
+from .prompt_builder import PromptBuilder
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheKey(NamedTuple):
+    """Normalized view of a QuoteRequest; requests with equal keys share cached quotes."""
+
+    category: str
+    topic: str | None
+    style: str
+    length: str
+    language: str
+    temperature_bucket: int
+    max_tokens: int
+    prompt: str  # Prompt fingerprint, so prompt changes never serve stale quotes
+
+
+class _CacheEntry:
+    """Quote variants for one key, served round-robin until the entry expires."""
+
+    __slots__ = ("cursor", "expires_at", "variants")
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.variants: list[str] = []
+        self.cursor = 0
+
+    def next_variant(self) -> str:
+        text = self.variants[self.cursor % len(self.variants)]
+        self.cursor += 1
+        return text
+
+    def drop_variant(self, text: str) -> None:
+        index = self.variants.index(text)
+        del self.variants[index]
+        # The variant that followed the dropped one is served next
+        self.cursor = index
+
+
+class QuoteCache:
+    """
+    Bounded LRU/TTL cache of quote texts keyed on the normalized request.
+
+    A key only starts producing hits once ``variants_per_key`` distinct quotes
+    have been stored for it, so the first callers still fill it from the model
+    and repeat callers rotate through several quotes instead of one.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        variants_per_key: int | None = None,
+    ):
+        self.max_entries = max_entries or settings.cache_max_entries
+        self.ttl_seconds = ttl_seconds or settings.cache_ttl_seconds
+        self.variants_per_key = max(1, variants_per_key or settings.cache_variants_per_key)
+        self._entries: OrderedDict[CacheKey, _CacheEntry] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @staticmethod
+    def make_key(request: QuoteRequest) -> CacheKey:
+        """
+        Build the cache key for a request.
+
+        Args:
+            request (QuoteRequest): The incoming quote request.
+
+        Returns:
+            CacheKey: Lower-cased style, trimmed topic, bucketed temperature and prompt fingerprint.
+        """
+        topic = request.topic.strip().casefold() if request.topic else None
+        temperature = (
+            request.temperature if request.temperature is not None else settings.temperature
+        )
+        length = request.length or "medium"
+        language = request.language or "en"
+        return CacheKey(
+            category=request.category.value,
+            topic=topic or None,
+            style=PromptBuilder.validate_style(request.style),
+            length=length,
+            language=language,
+            temperature_bucket=round(temperature / settings.cache_temperature_bucket),
+            max_tokens=request.max_tokens or settings.max_tokens,
+            prompt=PromptBuilder.fingerprint(request.category.value, length, language),
+        )
+
+    def get(self, key: CacheKey, accept: Callable[[str], bool] | None = None) -> str | None:
+        """
+        Return a cached variant for the key, or None on a miss.
+
+        Keys whose variant set is not yet full count as misses so the caller
+        generates another variant and stores it with :meth:`put`.
+
+        Args:
+            key (CacheKey): Key built by :meth:`make_key`.
+            accept (Optional[Callable]): Decides whether a variant may be served
+                (e.g. the novelty filter). Rejected variants are dropped, so the
+                key refills with fresh quotes instead of failing the check again;
+                when none is accepted the lookup is a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        if len(entry.variants) < self.variants_per_key:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        for _ in range(len(entry.variants)):
+            text = entry.next_variant()
+            if accept is None or accept(text):
+                self.hits += 1
+                return text
+            entry.drop_variant(text)
+            self.rejected += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, text: str) -> None:
+        """Store a generated quote as one of the key's variants."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            entry = _CacheEntry(expires_at=time.monotonic() + self.ttl_seconds)
+            self._entries[key] = entry
+
+        if len(entry.variants) < self.variants_per_key and text not in entry.variants:
+            entry.variants.append(text)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached entries (counters are kept)."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, float]:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,593 @@
+"""
+Indexed offline quote library answering topic requests without a model call.
+
+Quotes live in a memory-mapped snapshot (one text blob, compact facet and offset
+arrays and an inverted index of postings) plus an append-only ``pending.jsonl``
+journal of quotes added since the last snapshot. Starting up only parses the
+snapshot header; quote texts and postings are read from the mapping on demand.
+"""
+
+import contextlib
+import json
+import logging
+import math
+import mmap
+import os
+import random
+import re
+import struct
+import threading
+import time
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from app.config import settings
+
+from .prompt_builder import PromptBuilder
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"SWQL0001"
+FACETS = ("category", "language", "length", "style")
+
+_TOKEN_RE = re.compile(r"\w+")
+_ARABIC_DIACRITICS_RE = re.compile("[\u064b-\u0652\u0640]")  # Tashkeel and tatweel
+_ARABIC_ALEF_RE = re.compile("[\u0622\u0623\u0625]")  # Alef with madda/hamza
+ARABIC_ALEF = "\u0627"
+ARABIC_ARTICLE = "\u0627\u0644"  # "al-"
+STEM_LENGTH = 6  # Truncation stemming: "persevere" and "perseverance" share "persev"
+STOPWORDS = frozenset(
+    {
+        *("a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "i", "in"),
+        *("into", "is", "it", "its", "me", "my", "of", "on", "or", "our", "so", "that"),
+        *("the", "this", "to", "was", "we", "were", "will", "with", "you", "your"),
+        *("في", "من", "على", "إلى", "عن", "مع", "هو", "هي", "أن", "ان", "كل"),
+    }
+)
+
+
+def normalize(text: str) -> str:
+    """Lower-case text, strip Arabic diacritics and unify alef forms."""
+    return _ARABIC_ALEF_RE.sub(ARABIC_ALEF, _ARABIC_DIACRITICS_RE.sub("", text.casefold()))
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into index terms.
+
+    Normalizes the text, strips the Arabic definite article, drops stopwords
+    and truncates terms to ``STEM_LENGTH`` characters.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(normalize(text)):
+        if token in STOPWORDS or token.isdigit():
+            continue
+        if token.startswith(ARABIC_ARTICLE) and len(token) > 4:
+            token = token[2:]
+        terms.append(token[:STEM_LENGTH])
+    return terms
+
+
+class LibraryRecord(NamedTuple):
+    """One stored quote and the facets it can be served for."""
+
+    text: str
+    category: str
+    language: str = "en"
+    length: str = "medium"
+    style: str = "modern"
+    topic: str | None = None
+
+    @classmethod
+    def from_json(cls, data: dict) -> "LibraryRecord":
+        """
+        Build a record from an import or journal line.
+
+        Raises:
+            ValueError: If the quote text or category is missing.
+        """
+        text = (data.get("quote") or data.get("text") or "").strip()
+        category = (data.get("category") or "").strip().lower()
+        if not text or not category:
+            raise ValueError("Library records need 'quote' and 'category'")
+        return cls(
+            text=text,
+            category=category,
+            language=data.get("language") or "en",
+            length=data.get("length") or "medium",
+            style=PromptBuilder.validate_style(data.get("style")),
+            topic=data.get("topic") or None,
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "quote": self.text,
+            "category": self.category,
+            "language": self.language,
+            "length": self.length,
+            "style": self.style,
+            "topic": self.topic,
+        }
+
+    def terms(self) -> set[str]:
+        """Index terms: the quote's own words plus the topic it was written for."""
+        return set(tokenize(self.text)) | set(tokenize(self.topic or ""))
+
+
+class _Snapshot:
+    """
+    Read-only view of a snapshot file.
+
+    Layout: magic, u64 header length, JSON header (counts, section offsets, facet
+    vocabularies and ``term -> [start, count]``), then 4-byte aligned sections:
+    UTF-8 quote texts and topics with ``n + 1`` u32 offsets each, one u8 column
+    per facet and the u32 postings of all terms.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = path.open("rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a quote library snapshot")
+        (header_len,) = struct.unpack_from("<Q", self._mm, 8)
+        header = json.loads(self._mm[16 : 16 + header_len])
+
+        self.count: int = header["count"]
+        self.vocab: dict[str, list[str]] = header["vocab"]
+        self.terms: dict[str, list[int]] = header["terms"]
+        view = memoryview(self._mm)
+        sections = header["sections"]
+        self._views = {name: view[start:end] for name, (start, end) in sections.items()}
+        self._texts = self._views["texts"]
+        self._offsets = self._views["offsets"].cast("I")
+        self._topics = self._views["topics"]
+        self._topic_offsets = self._views["topic_offsets"].cast("I")
+        self._columns = {facet: self._views[facet] for facet in FACETS}
+        self._postings = self._views["postings"].cast("I")
+        view.release()
+
+    def text(self, quote_id: int) -> str:
+        start, end = self._offsets[quote_id], self._offsets[quote_id + 1]
+        return bytes(self._texts[start:end]).decode("utf-8")
+
+    def topic(self, quote_id: int) -> str | None:
+        start, end = self._topic_offsets[quote_id], self._topic_offsets[quote_id + 1]
+        return bytes(self._topics[start:end]).decode("utf-8") or None
+
+    def facet(self, facet: str, quote_id: int) -> str:
+        return self.vocab[facet][self._columns[facet][quote_id]]
+
+    def column(self, facet: str) -> memoryview:
+        return self._columns[facet]
+
+    def postings(self, term: str) -> memoryview:
+        start, count = self.terms.get(term, (0, 0))
+        return self._postings[start : start + count]
+
+    def close(self) -> None:
+        # Release exported views before closing the mapping
+        for view in (self._offsets, self._topic_offsets, self._postings):
+            view.release()
+        for view in self._views.values():
+            view.release()
+        self._mm.close()
+        self._file.close()
+
+    @staticmethod
+    def write(path: Path, records: Iterable[LibraryRecord]) -> int:
+        """Write ``records`` as a new snapshot file; returns the number of quotes."""
+        texts, topics = bytearray(), bytearray()
+        offsets, topic_offsets = array("I", [0]), array("I", [0])
+        vocab: dict[str, list[str]] = {facet: [] for facet in FACETS}
+        codes: dict[str, dict[str, int]] = {facet: {} for facet in FACETS}
+        columns = {facet: array("B") for facet in FACETS}
+        index: dict[str, list[int]] = {}
+
+        for quote_id, record in enumerate(records):
+            texts += record.text.encode("utf-8")
+            offsets.append(len(texts))
+            topics += (record.topic or "").encode("utf-8")
+            topic_offsets.append(len(topics))
+            for facet in FACETS:
+                value = getattr(record, facet)
+                if value not in codes[facet]:
+                    if len(vocab[facet]) >= 255:
+                        raise ValueError(f"Too many distinct values for facet {facet}")
+                    codes[facet][value] = len(vocab[facet])
+                    vocab[facet].append(value)
+                columns[facet].append(codes[facet][value])
+            for term in record.terms():
+                index.setdefault(term, []).append(quote_id)
+
+        postings = array("I")
+        terms: dict[str, list[int]] = {}
+        for term, ids in index.items():
+            terms[term] = [len(postings), len(ids)]
+            postings.extend(ids)
+
+        names = ["texts", "offsets", "topics", "topic_offsets", *FACETS, "postings"]
+        blobs = [bytes(texts), offsets.tobytes(), bytes(topics), topic_offsets.tobytes()]
+        blobs += [columns[facet].tobytes() for facet in FACETS]
+        blobs.append(postings.tobytes())
+
+        def build_header(base: int) -> tuple[bytes, dict[str, list[int]]]:
+            sections, position = {}, base
+            for name, blob in zip(names, blobs, strict=True):
+                position += -position % 4
+                sections[name] = [position, position + len(blob)]
+                position += len(blob)
+            header = {"count": len(offsets) - 1, "vocab": vocab, "terms": terms}
+            header["sections"] = sections
+            return json.dumps(header, ensure_ascii=False).encode("utf-8"), sections
+
+        # Section offsets depend on the header length, which depends on the offsets
+        header, sections = build_header(16)
+        while True:
+            new_header, sections = build_header(16 + len(header))
+            if len(new_header) == len(header):
+                header = new_header
+                break
+            header = new_header
+
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, blob in zip(names, blobs, strict=True):
+                f.write(b"\0" * (sections[name][0] - f.tell()))
+                f.write(blob)
+        os.replace(tmp_path, path)
+        return len(offsets) - 1
+
+
+class QuoteLibrary:
+    """
+    Searchable store of quotes faceted by category, language, length and style.
+
+    :meth:`search` scores stored quotes against the request topic by the
+    IDF-weighted share of topic terms they contain, and serves a random quote
+    scoring at least ``min_score`` once ``min_matches`` quotes qualify, so a
+    topic is not answered with the same quote every time.
+
+    New quotes (bulk imports and, optionally, freshly generated ones) are
+    appended to the journal, indexed in memory, and folded into a new snapshot
+    once the journal reaches ``compact_threshold`` lines. Workers sharing the
+    directory pick up each other's additions.
+
+    Every method reads or writes files, so async callers run them in a worker
+    thread; an internal lock makes concurrent calls from several threads safe.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        min_score: float | None = None,
+        min_matches: int | None = None,
+        compact_threshold: int | None = None,
+        refresh_interval: float | None = None,
+    ):
+        self.directory = Path(directory or settings.library_dir)
+        self.min_score = settings.library_min_score if min_score is None else min_score
+        self.min_matches = max(1, min_matches or settings.library_min_matches)
+        self.compact_threshold = compact_threshold or settings.library_compact_threshold
+        self.refresh_interval = (
+            settings.library_refresh_seconds if refresh_interval is None else refresh_interval
+        )
+        self.snapshot_path = self.directory / "snapshot.bin"
+        self.journal_path = self.directory / "pending.jsonl"
+        self.lock_path = self.directory / ".lock"
+
+        self._snapshot: _Snapshot | None = None
+        self._snapshot_stamp: tuple[int, int] | None = None
+        self._journal_offset = 0
+        self._records: list[LibraryRecord] = []  # Journal entries since the snapshot
+        self._index: dict[str, list[int]] = {}  # Term postings for the journal entries
+        self._hashes: set[int] | None = None  # Built on first add, for de-duplication
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._rng = random.Random()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._snapshot_count + len(self._records)
+
+    @property
+    def _snapshot_count(self) -> int:
+        return self._snapshot.count if self._snapshot is not None else 0
+
+    def search(
+        self,
+        topic: str,
+        category: str,
+        language: str = "en",
+        length: str = "medium",
+        style: str = "modern",
+    ) -> str | None:
+        """
+        Find a stored quote for the topic and facets.
+
+        Args:
+            topic (str): Free-text topic from the request.
+            category (str): Category value; 'random' matches every category.
+            language (str): Language code.
+            length (str): Requested length.
+            style (str): Normalized style.
+
+        Returns:
+            Optional[str]: A random quote among those scoring at least ``min_score``,
+            or None if fewer than ``min_matches`` qualify.
+        """
+        query = set(tokenize(topic))
+        if not query:
+            return None
+        with self._lock:
+            self._refresh()
+            return self._search(query, category, language, length, style)
+
+    def _search(
+        self, query: set[str], category: str, language: str, length: str, style: str
+    ) -> str | None:
+        total = self._snapshot_count + len(self._records)
+        scores: dict[int, float] = {}
+        query_weight = 0.0
+        for term in query:
+            snapshot_ids = self._snapshot.postings(term) if self._snapshot else ()
+            journal_ids = self._index.get(term, ())
+            idf = math.log(1 + total / (1 + len(snapshot_ids) + len(journal_ids)))
+            query_weight += idf
+            for quote_id in snapshot_ids:
+                scores[quote_id] = scores.get(quote_id, 0.0) + idf
+            for journal_id in journal_ids:
+                quote_id = self._snapshot_count + journal_id
+                scores[quote_id] = scores.get(quote_id, 0.0) + idf
+
+        threshold = self.min_score * query_weight
+        wanted = {"category": category, "language": language, "length": length, "style": style}
+        if category == "random":
+            del wanted["category"]
+        matches_facets = self._facet_filter(wanted)
+        matches = [
+            quote_id
+            for quote_id, score in scores.items()
+            if score >= threshold and matches_facets(quote_id)
+        ]
+        if len(matches) < self.min_matches:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._text(self._rng.choice(matches))
+
+    def add(self, record: LibraryRecord) -> bool:
+        """
+        Append a quote to the journal and index it.
+
+        Returns:
+            bool: False if the exact quote text is already stored.
+        """
+        return self.add_many([record]) == 1
+
+    def add_many(self, records: Iterable[LibraryRecord]) -> int:
+        """
+        Append quotes to the journal in one write and index them.
+
+        Returns:
+            int: Number of quotes added; exact duplicates of stored quotes are skipped.
+        """
+        with self._lock:
+            self._refresh()
+            return self._add_many(records)
+
+    def _add_many(self, records: Iterable[LibraryRecord]) -> int:
+        if self._hashes is None:
+            self._hashes = {hash(self._text(i)) for i in range(len(self))}
+
+        lines, seen = [], set()
+        for record in records:
+            digest = hash(record.text)
+            if digest in self._hashes or digest in seen:
+                continue
+            seen.add(digest)
+            lines.append(json.dumps(record.to_json(), ensure_ascii=False) + "\n")
+        if not lines:
+            return 0
+
+        try:
+            with self._locked(), self.journal_path.open("a", encoding="utf-8") as f:
+                f.write("".join(lines))
+        except OSError as e:
+            logger.warning(f"Could not write to quote library journal: {e!s}")
+            return 0
+        self._replay_journal()
+        return len(lines)
+
+    def import_jsonl(self, lines: Iterable[str | bytes]) -> tuple[int, int]:
+        """
+        Bulk-import quotes from JSON lines (``quote``, ``category`` and optional
+        ``language``, ``length``, ``style``, ``topic``), then compact if needed.
+
+        Returns:
+            tuple: Numbers of imported and skipped (invalid or duplicate) lines.
+        """
+        records, total = [], 0
+        for line in lines:
+            if not line.strip():
+                continue
+            total += 1
+            with contextlib.suppress(ValueError, AttributeError, TypeError):
+                records.append(LibraryRecord.from_json(json.loads(line)))
+
+        imported = self.add_many(records)
+        self.compact_if_needed()
+        return imported, total - imported
+
+    def compact_if_needed(self) -> bool:
+        """
+        Compact once the journal holds ``compact_threshold`` quotes.
+
+        Returns:
+            bool: Whether a new snapshot was written.
+        """
+        with self._lock:
+            if len(self._records) < self.compact_threshold:
+                return False
+            self.compact()
+            return True
+
+    def compact(self) -> int:
+        """
+        Fold the journal into a new snapshot.
+
+        Returns:
+            int: Number of quotes in the new snapshot.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            with self._locked():
+                self._replay_journal()
+                records = [self._record(i) for i in range(len(self))]
+                count = _Snapshot.write(self.snapshot_path, records)
+                self.journal_path.unlink(missing_ok=True)
+            logger.info(f"Quote library compacted into a snapshot of {count} quotes")
+            self._reload()
+            return count
+
+    def close(self) -> None:
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._reload()
+
+    def _reload(self) -> None:
+        """(Re)open the snapshot and replay the journal from the start."""
+        self.close()
+        self._records, self._index, self._journal_offset = [], {}, 0
+        self._hashes = None
+        self._snapshot_stamp = self._stamp(self.snapshot_path)
+        if self._snapshot_stamp is not None:
+            self._snapshot = _Snapshot(self.snapshot_path)
+        self._replay_journal()
+        self._loaded = True
+        logger.info(f"Quote library loaded {len(self)} quotes from {self.directory}")
+
+    def _refresh(self) -> None:
+        """Pick up snapshots and journal lines written by other workers."""
+        now = time.monotonic()
+        if self._loaded and now < self._next_refresh:
+            return
+        self._next_refresh = now + self.refresh_interval
+        journal_size = self._stamp(self.journal_path)
+        if (
+            not self._loaded
+            or self._stamp(self.snapshot_path) != self._snapshot_stamp
+            or (journal_size is not None and journal_size[1] < self._journal_offset)
+        ):
+            self._reload()
+        else:
+            self._replay_journal()
+
+    def _replay_journal(self) -> None:
+        try:
+            with self.journal_path.open("rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Only consume complete lines; a concurrent writer may be mid-line
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = LibraryRecord.from_json(json.loads(line))
+            except (ValueError, AttributeError, TypeError):
+                continue
+            journal_id = len(self._records)
+            self._records.append(record)
+            for term in record.terms():
+                self._index.setdefault(term, []).append(journal_id)
+            if self._hashes is not None:
+                self._hashes.add(hash(record.text))
+        self._journal_offset += end
+
+    def _text(self, quote_id: int) -> str:
+        if quote_id < self._snapshot_count:
+            return self._snapshot.text(quote_id)
+        return self._records[quote_id - self._snapshot_count].text
+
+    def _record(self, quote_id: int) -> LibraryRecord:
+        if quote_id < self._snapshot_count:
+            return LibraryRecord(
+                self._snapshot.text(quote_id),
+                *(self._snapshot.facet(facet, quote_id) for facet in FACETS),
+                topic=self._snapshot.topic(quote_id),
+            )
+        return self._records[quote_id - self._snapshot_count]
+
+    def _facet_filter(self, wanted: dict[str, str]) -> Callable[[int], bool]:
+        """Build a predicate testing a quote id against the wanted facet values."""
+        snapshot, offset = self._snapshot, self._snapshot_count
+        # Compare snapshot columns by their u8 codes instead of decoding values
+        codes = []
+        if snapshot is not None:
+            for facet, value in wanted.items():
+                vocab = snapshot.vocab[facet]
+                codes.append((snapshot.column(facet), vocab.index(value) if value in vocab else -1))
+
+        def matches(quote_id: int) -> bool:
+            if quote_id < offset:
+                return all(column[quote_id] == code for column, code in codes)
+            record = self._records[quote_id - offset]
+            return all(getattr(record, f) == v for f, v in wanted.items())
+
+        return matches
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple[int, int] | None:
+        """Identity and size of a file, to notice replacement or truncation."""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serialize journal writes and compaction across worker processes."""
+        if fcntl is None:
+            yield
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self.lock_path.open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def stats(self) -> dict[str, float]:
+        """Return library size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            # What is loaded so far; stats never read the files themselves
+            "quotes": self._snapshot_count + len(self._records),
+            "snapshot_quotes": self._snapshot_count,
+            "journal_quotes": len(self._records),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,420 @@
+"""
+Pre-generated quote pools kept topped up by a background refill task.
+Quotes live in a pluggable store; the SQLite store gives every worker process
+on the host one shared inventory, refilled by one worker at a time.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable
+from typing import NamedTuple
+
+from app.config import settings
+
+from .prompt_builder import PromptBuilder
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolKey(NamedTuple):
+    """Identifies one pool of interchangeable quotes."""
+
+    category: str
+    language: str
+    length: str
+    prompt: str  # Fingerprint of the prompt the quotes were generated with
+
+
+class PoolStore(ABC):
+    """Storage for pooled quotes; every operation is atomic with respect to other workers."""
+
+    @abstractmethod
+    def pop(self, key: PoolKey, now: float) -> tuple[str | None, int]:
+        """
+        Remove and return the oldest unexpired quote of a pool.
+
+        Returns:
+            (text, remaining): The quote (None if the pool is empty) and how
+            many unexpired quotes are left in the pool.
+        """
+
+    @abstractmethod
+    def push(self, key: PoolKey, text: str, now: float, expires_at: float, capacity: int) -> bool:
+        """Add a quote unless the pool already holds ``capacity`` unexpired quotes."""
+
+    @abstractmethod
+    def sizes(self, keys: Iterable[PoolKey], now: float) -> dict[PoolKey, int]:
+        """Count the unexpired quotes of each pool."""
+
+    @abstractmethod
+    def evict_expired(self, now: float) -> int:
+        """Delete expired quotes, including those of pools no longer configured."""
+
+    def acquire_refill_lease(self, owner: str, now: float, duration: float) -> bool:
+        """Take or renew the right to refill; per-process stores always grant it."""
+        return True
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release resources held by the store."""
+
+
+class MemoryPoolStore(PoolStore):
+    """Per-process store; each worker keeps (and refills) its own pools."""
+
+    def __init__(self):
+        self._pools: dict[PoolKey, deque[tuple[float, str]]] = {}
+
+    def _live(self, key: PoolKey, now: float) -> deque[tuple[float, str]]:
+        pool = self._pools.setdefault(key, deque())
+        # Quotes share one TTL, so they expire in insertion order
+        while pool and pool[0][0] <= now:
+            pool.popleft()
+        return pool
+
+    def pop(self, key: PoolKey, now: float) -> tuple[str | None, int]:
+        pool = self._live(key, now)
+        text = pool.popleft()[1] if pool else None
+        return text, len(pool)
+
+    def push(self, key: PoolKey, text: str, now: float, expires_at: float, capacity: int) -> bool:
+        pool = self._live(key, now)
+        if len(pool) >= capacity:
+            return False
+        pool.append((expires_at, text))
+        return True
+
+    def sizes(self, keys: Iterable[PoolKey], now: float) -> dict[PoolKey, int]:
+        return {key: len(self._live(key, now)) for key in keys}
+
+    def evict_expired(self, now: float) -> int:
+        evicted = 0
+        for key, pool in self._pools.items():
+            before = len(pool)
+            evicted += before - len(self._live(key, now))
+        return evicted
+
+    def close(self) -> None:
+        self._pools.clear()
+
+
+class SQLitePoolStore(PoolStore):
+    """
+    Store shared by every worker process on the host through one SQLite file.
+
+    Pops are a single ``DELETE ... RETURNING`` of the oldest row, and pushes a
+    single ``INSERT ... SELECT`` guarded by the pool's count, so concurrent
+    workers never hand out the same quote or overfill a pool. A lease row
+    elects the worker that runs refills. The busy timeout is kept short since
+    pops run on the event loop; a pop that cannot get the lock is a miss.
+    """
+
+    def __init__(self, path: str | None = None, busy_timeout: float | None = None):
+        self.path = path or settings.pool_db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=busy_timeout if busy_timeout is not None else settings.pool_db_busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Pooled quotes are disposable; skip fsyncs on the request path
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pool_quotes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, pool TEXT NOT NULL, "
+            "text TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS pool_quotes_by_pool ON pool_quotes (pool, id)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pool_leases "
+            "(name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def _name(key: PoolKey) -> str:
+        return "/".join(key)
+
+    def _count(self, name: str, now: float) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM pool_quotes WHERE pool = ? AND expires_at > ?", (name, now)
+        ).fetchone()[0]
+
+    def pop(self, key: PoolKey, now: float) -> tuple[str | None, int]:
+        name = self._name(key)
+        with self._lock:
+            row = self._conn.execute(
+                "DELETE FROM pool_quotes WHERE id = ("
+                "SELECT id FROM pool_quotes WHERE pool = ? AND expires_at > ? "
+                "ORDER BY id LIMIT 1) RETURNING text",
+                (name, now),
+            ).fetchone()
+            return (row[0] if row else None), self._count(name, now)
+
+    def push(self, key: PoolKey, text: str, now: float, expires_at: float, capacity: int) -> bool:
+        name = self._name(key)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pool_quotes (pool, text, expires_at) SELECT ?, ?, ? "
+                "WHERE (SELECT COUNT(*) FROM pool_quotes WHERE pool = ? AND expires_at > ?) < ?",
+                (name, text, expires_at, name, now, capacity),
+            )
+            return cursor.rowcount == 1
+
+    def sizes(self, keys: Iterable[PoolKey], now: float) -> dict[PoolKey, int]:
+        with self._lock:
+            counts = dict(
+                self._conn.execute(
+                    "SELECT pool, COUNT(*) FROM pool_quotes WHERE expires_at > ? GROUP BY pool",
+                    (now,),
+                ).fetchall()
+            )
+        return {key: counts.get(self._name(key), 0) for key in keys}
+
+    def evict_expired(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM pool_quotes WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+    def acquire_refill_lease(self, owner: str, now: float, duration: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pool_leases (name, owner, expires_at) VALUES ('refill', ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, "
+                "expires_at = excluded.expires_at "
+                "WHERE pool_leases.owner = excluded.owner OR pool_leases.expires_at <= ?",
+                (owner, now + duration, now),
+            )
+            return cursor.rowcount == 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_pool_store(backend: str | None = None) -> PoolStore:
+    """
+    Create the pool store selected in settings.
+
+    Args:
+        backend (Optional[str]): 'memory' or 'sqlite', defaults to ``settings.pool_backend``.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    backend = (backend or settings.pool_backend).lower()
+    if backend == "memory":
+        return MemoryPoolStore()
+    if backend == "sqlite":
+        return SQLitePoolStore()
+    raise ValueError(f"Unknown pool backend: {backend}. Use 'memory' or 'sqlite'.")
+
+
+class QuotePool:
+    """
+    Pools of ready-to-serve quotes per (category, language, length).
+
+    A background task refills every pool that drops below ``low_watermark``
+    back up to ``target_size``, running at most ``refill_concurrency``
+    generations at a time. Pops never wait on the model: an empty pool is a
+    miss and the caller falls back to live generation. Quotes older than
+    ``ttl_seconds`` are dropped. With a shared store, only the worker holding
+    the refill lease generates, so workers do not refill the same shortfall.
+    """
+
+    def __init__(
+        self,
+        generator: Callable[[PoolKey], Awaitable[str]],
+        keys: list[PoolKey] | None = None,
+        target_size: int | None = None,
+        low_watermark: int | None = None,
+        refill_concurrency: int | None = None,
+        refill_interval: float | None = None,
+        ttl_seconds: float | None = None,
+        store: PoolStore | None = None,
+    ):
+        self.generator = generator
+        self.target_size = target_size or settings.pool_size
+        self.low_watermark = min(low_watermark or settings.pool_low_watermark, self.target_size)
+        self.refill_concurrency = max(1, refill_concurrency or settings.pool_refill_concurrency)
+        self.refill_interval = refill_interval or settings.pool_refill_interval_seconds
+        self.ttl_seconds = ttl_seconds or settings.pool_ttl_seconds
+        self.keys = list(keys if keys is not None else self.configured_keys())
+        self._key_set = frozenset(self.keys)
+        self._store = store
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Outlives a few refill rounds, and is renewed after every generation
+        self.lease_seconds = max(30.0, self.refill_interval * 3)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.refill_errors = 0
+        self.store_errors = 0
+
+    @property
+    def store(self) -> PoolStore:
+        """Lazy initialization so creating the controller never opens a database."""
+        if self._store is None:
+            self._store = create_pool_store()
+        return self._store
+
+    @staticmethod
+    def configured_keys() -> list[PoolKey]:
+        """Expand the pool settings into the list of pool keys to keep warm."""
+        return [
+            PoolKey(
+                category=category,
+                language=language,
+                length=length,
+                prompt=PromptBuilder.fingerprint(category, length, language),
+            )
+            for category in settings.pool_categories
+            for language in settings.pool_languages
+            for length in settings.pool_lengths
+        ]
+
+    def __contains__(self, key: PoolKey) -> bool:
+        return key in self._key_set
+
+    def pop(self, key: PoolKey) -> str | None:
+        """
+        Take a quote from the pool without waiting.
+
+        Args:
+            key (PoolKey): The pool to draw from.
+
+        Returns:
+            Optional[str]: A pre-generated quote, or None if the pool is empty or unknown.
+        """
+        if key not in self._key_set:
+            return None
+
+        try:
+            text, remaining = self.store.pop(key, time.time())
+        except sqlite3.Error as e:
+            self.store_errors += 1
+            logger.warning(f"Quote pool store unavailable: {e!s}")
+            text, remaining = None, 0
+
+        if text is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if remaining < self.low_watermark:
+            self._wakeup.set()
+        return text
+
+    def push(self, key: PoolKey, text: str) -> bool:
+        """Add a quote to a pool unless it is already full."""
+        if key not in self._key_set:
+            return False
+        now = time.time()
+        return self.store.push(key, text, now, now + self.ttl_seconds, self.target_size)
+
+    async def start(self) -> None:
+        """Start the background refill task."""
+        if self._task is None and self.keys:
+            self._task = asyncio.create_task(self._refill_loop(), name="quote-pool-refill")
+            logger.info(
+                f"Quote pool refill started for {len(self.keys)} pools "
+                f"(target={self.target_size}, low={self.low_watermark}, "
+                f"concurrency={self.refill_concurrency}, store={type(self.store).__name__})"
+            )
+
+    async def stop(self) -> None:
+        """Cancel the background refill task and close the store."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    async def refill(self) -> int:
+        """
+        Top up every pool below the low watermark to the target size.
+
+        Returns:
+            int: Number of refill generations that failed.
+        """
+        now = time.time()
+        if not self.store.acquire_refill_lease(self.owner, now, self.lease_seconds):
+            return 0  # Another worker is refilling the shared pools
+        self.store.evict_expired(now)
+        sizes = self.store.sizes(self.keys, now)
+        jobs = [
+            key
+            for key, size in sizes.items()
+            if size < self.low_watermark
+            for _ in range(self.target_size - size)
+        ]
+        if not jobs:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.refill_concurrency)
+
+        async def fill(key: PoolKey) -> None:
+            async with semaphore:
+                self.push(key, await self.generator(key))
+                self.refilled += 1
+                self.store.acquire_refill_lease(self.owner, time.time(), self.lease_seconds)
+
+        results = await asyncio.gather(*(fill(key) for key in jobs), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            self.refill_errors += len(errors)
+            logger.warning(f"Quote pool refill: {len(errors)}/{len(jobs)} failed: {errors[0]!s}")
+        return len(errors)
+
+    async def _refill_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                failures = await self.refill()
+            except sqlite3.Error as e:
+                self.store_errors += 1
+                logger.warning(f"Quote pool store unavailable: {e!s}")
+                failures = 1
+            if failures:
+                # Back off instead of hammering a failing upstream on every pop
+                await asyncio.sleep(self.refill_interval)
+                continue
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+
+    def stats(self) -> dict[str, float]:
+        """Return pool sizes and hit/miss counters."""
+        lookups = self.hits + self.misses
+        try:
+            available = sum(self.store.sizes(self.keys, time.time()).values())
+        except sqlite3.Error:
+            available = -1
+        return {
+            "pools": len(self.keys),
+            "available": available,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refilled": self.refilled,
+            "refill_errors": self.refill_errors,
+            "store_errors": self.store_errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
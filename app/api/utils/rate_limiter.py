@@ -0,0 +1,278 @@
+"""
+Inbound per-client rate limiting using GCRA (generic cell rate algorithm).
+State is one timestamp per active client, kept in a pluggable store so several
+workers can enforce one combined limit.
+"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(api_key: str) -> str:
+    # Never keep raw keys in the limiter state
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=4)
+def _known_key_digests(api_keys: tuple[str, ...]) -> frozenset[str]:
+    return frozenset(_digest(key) for key in api_keys if key)
+
+
+class RateLimitStore(ABC):
+    """Storage for GCRA theoretical arrival times (TATs), one per client key."""
+
+    @abstractmethod
+    async def hit(
+        self, key: str, now: float, increment: float, tolerance: float
+    ) -> tuple[bool, float]:
+        """
+        Atomically apply one GCRA update.
+
+        Args:
+            key: Client key
+            now: Current wall-clock time in seconds
+            increment: Emission interval times the request cost
+            tolerance: How far the TAT may run ahead of ``now`` (the burst allowance)
+
+        Returns:
+            (allowed, retry_after): Whether the request conforms, and otherwise
+            how many seconds until it would.
+        """
+
+    @abstractmethod
+    async def evict_idle(self, now: float) -> int:
+        """Remove clients whose TAT has passed; their state equals a fresh client's."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release resources held by the store."""
+
+
+def _gcra(tat: float | None, now: float, increment: float, tolerance: float):
+    """Return (allowed, new_tat, retry_after) for one request."""
+    new_tat = max(tat or now, now) + increment
+    allow_at = new_tat - tolerance
+    if now < allow_at:
+        return False, tat, allow_at - now
+    return True, new_tat, 0.0
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process store; the local stand-in for tests and single-worker deployments."""
+
+    def __init__(self):
+        self._tats: dict[str, float] = {}
+
+    async def hit(
+        self, key: str, now: float, increment: float, tolerance: float
+    ) -> tuple[bool, float]:
+        allowed, new_tat, retry_after = _gcra(self._tats.get(key), now, increment, tolerance)
+        if allowed:
+            self._tats[key] = new_tat
+        return allowed, retry_after
+
+    async def evict_idle(self, now: float) -> int:
+        idle = [key for key, tat in self._tats.items() if tat <= now]
+        for key in idle:
+            del self._tats[key]
+        return len(idle)
+
+    async def close(self) -> None:
+        self._tats.clear()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Store shared by every worker process on the host through one SQLite file.
+
+    Each update is a short ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers serialize on the database lock and see each other's TATs.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or settings.rate_limit_db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Limiter state is disposable; skip fsyncs on the request path
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+
+    def _hit(self, key: str, now: float, increment: float, tolerance: float):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tat FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                allowed, new_tat, retry_after = _gcra(
+                    row[0] if row else None, now, increment, tolerance
+                )
+                if allowed:
+                    self._conn.execute(
+                        "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                        (key, new_tat),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed, retry_after
+
+    def _evict_idle(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,)).rowcount
+
+    async def hit(
+        self, key: str, now: float, increment: float, tolerance: float
+    ) -> tuple[bool, float]:
+        return await asyncio.to_thread(self._hit, key, now, increment, tolerance)
+
+    async def evict_idle(self, now: float) -> int:
+        return await asyncio.to_thread(self._evict_idle, now)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_rate_limit_store(backend: str | None = None) -> RateLimitStore:
+    """
+    Create the rate limit store selected in settings.
+
+    Args:
+        backend (Optional[str]): 'memory' or 'sqlite', defaults to ``settings.rate_limit_backend``.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    backend = (backend or settings.rate_limit_backend).lower()
+    if backend == "memory":
+        return MemoryRateLimitStore()
+    if backend == "sqlite":
+        return SQLiteRateLimitStore()
+    raise ValueError(f"Unknown rate limit backend: {backend}. Use 'memory' or 'sqlite'.")
+
+
+class RateLimiter:
+    """
+    FastAPI dependency allowing ``times`` requests per ``seconds`` per client.
+
+    Clients are identified by their ``X-API-Key`` header when it is one of
+    ``rate_limit_api_keys``, otherwise by IP address. Idle clients are evicted
+    every ``evict_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        times: int | None = None,
+        seconds: float | None = None,
+        store: RateLimitStore | None = None,
+        scope: str = "quotes",
+        evict_interval: float | None = None,
+    ):
+        self.times = times or settings.rate_limit_times
+        self.seconds = seconds or settings.rate_limit_seconds
+        self.emission_interval = self.seconds / self.times
+        self.scope = scope
+        self.evict_interval = evict_interval or settings.rate_limit_evict_interval_seconds
+        self._store = store
+        self._next_eviction = 0.0
+
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def store(self) -> RateLimitStore:
+        """Lazy initialization so importing the routes never opens a database."""
+        if self._store is None:
+            self._store = create_rate_limit_store()
+        return self._store
+
+    async def __call__(self, request: Request) -> None:
+        await self.check(request)
+
+    async def check(self, request: Request, cost: int = 1) -> None:
+        """
+        Count ``cost`` requests against the caller's limit.
+
+        Costs above the burst size are capped so a large batch drains the
+        caller's allowance instead of being rejected forever.
+
+        Raises:
+            HTTPException: 429 with a Retry-After header when the limit is exceeded.
+        """
+        if not settings.rate_limit_enabled:
+            return
+
+        now = time.time()
+        key = f"{self.scope}:{self.client_key(request)}"
+        allowed, retry_after = await self.store.hit(
+            key,
+            now,
+            increment=self.emission_interval * min(cost, self.times),
+            tolerance=self.emission_interval * self.times,
+        )
+
+        if now >= self._next_eviction:
+            self._next_eviction = now + self.evict_interval
+            evicted = await self.store.evict_idle(now)
+            if evicted:
+                logger.debug(f"Rate limiter evicted {evicted} idle clients")
+
+        if not allowed:
+            self.limited += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded. Please slow down.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+        self.allowed += 1
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        """
+        Identify the caller by a configured API key, else by IP address.
+
+        Unknown ``X-API-Key`` values are ignored, so a client cannot get a fresh
+        limit by sending a new key with every request. Behind a trusted proxy
+        the IP is the last ``X-Forwarded-For`` entry, the one the proxy itself
+        appended; earlier entries come from the client and can be forged.
+        """
+        api_key = request.headers.get("x-api-key")
+        if api_key:
+            digest = _digest(api_key)
+            if digest in _known_key_digests(tuple(settings.rate_limit_api_keys)):
+                return "key:" + digest
+
+        if settings.rate_limit_trust_proxy:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded and forwarded.rsplit(",", 1)[-1].strip():
+                return "ip:" + forwarded.rsplit(",", 1)[-1].strip()
+        return "ip:" + (request.client.host if request.client else "unknown")
+
+    async def close(self) -> None:
+        if self._store is not None:
+            await self._store.close()
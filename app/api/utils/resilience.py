@@ -0,0 +1,236 @@
+"""
+Tail-latency and transient-error handling for model calls.
+Hedges slow calls past the observed latency percentile and retries retryable
+errors with jittered backoff, both paid for from a shared retry budget.
+"""
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
+from typing import TypeVar
+
+from fastapi import HTTPException
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
+
+from app.config import settings
+
+from .admission import AdmissionRejected
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an error from the model is worth another attempt."""
+    if isinstance(exc, AdmissionRejected):
+        # Refused locally because we are overloaded; retrying makes it worse
+        return False
+    if isinstance(exc, HTTPException):
+        return exc.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, TimeoutError | ConnectionError)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int | None = None, min_samples: int | None = None):
+        self.min_samples = min_samples or settings.hedge_min_samples
+        self._samples: deque[float] = deque(maxlen=window or settings.latency_window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """
+        Return the ``q``-th percentile (0-100) of the window.
+
+        Returns:
+            Optional[float]: Latency in seconds, or None until ``min_samples`` calls were seen.
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class RetryBudget:
+    """
+    Caps extra attempts (retries and hedges) to a fraction of original calls.
+
+    Every original call deposits ``ratio`` tokens, every extra attempt withdraws
+    one, and the balance never exceeds ``burst``. During an outage the budget
+    drains and calls fail fast instead of multiplying load on the provider.
+    """
+
+    def __init__(self, ratio: float | None = None, burst: float | None = None):
+        self.ratio = settings.retry_budget_ratio if ratio is None else ratio
+        self.burst = settings.retry_budget_burst if burst is None else burst
+        self.tokens = self.burst
+
+    def deposit(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ResilientCaller:
+    """
+    Runs model calls with hedging and budgeted retries.
+
+    A hedged call that has not finished after the observed ``hedge_percentile``
+    latency starts a second identical attempt; whichever succeeds first wins and
+    the other is cancelled. Failed attempts with a retryable error are retried
+    with full-jitter exponential backoff while the budget allows.
+
+    Attempts time their backend call with :meth:`measure`, so that waiting in a
+    local queue before it does not raise the hedge percentile: hedging on local
+    congestion would only queue more calls.
+    """
+
+    def __init__(
+        self,
+        tracker: LatencyTracker | None = None,
+        budget: RetryBudget | None = None,
+        max_attempts: int | None = None,
+    ):
+        self.tracker = tracker if tracker is not None else LatencyTracker()  # Empty is falsy
+        self.budget = budget or RetryBudget()
+        self.max_attempts = max(1, max_attempts or settings.retry_max_attempts)
+
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    async def call(self, attempt: Callable[[], Awaitable[T]], hedge: bool = False) -> T:
+        """
+        Run ``attempt`` until it succeeds, fails permanently or runs out of retries.
+
+        Args:
+            attempt (Callable): Starts one model call, timed with :meth:`measure`;
+                called again for retries and hedges.
+            hedge (bool): Whether slow attempts may be hedged. Only calls of comparable
+                latency should be hedged, since they share one latency window.
+
+        Raises:
+            Exception: The last attempt's error once retrying stops.
+        """
+        self.calls += 1
+        self.budget.deposit()
+
+        retrying = AsyncRetrying(
+            stop=(
+                stop_after_attempt(self.max_attempts)
+                | stop_after_delay(settings.retry_max_elapsed_seconds)
+                # Checked last, so tokens are only spent on retries that will happen
+                | self._budget_exhausted
+            ),
+            wait=wait_random_exponential(
+                multiplier=settings.retry_backoff_base_ms / 1000,
+                max=settings.retry_backoff_max_ms / 1000,
+            ),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=self._count_retry,
+            reraise=True,
+        )
+        async for attempt_state in retrying:
+            with attempt_state:
+                if hedge:
+                    return await self._hedged(attempt)
+                return await attempt()
+
+    def _budget_exhausted(self, retry_state: RetryCallState) -> bool:
+        if self.budget.try_withdraw():
+            return False
+        self.budget_exhausted += 1
+        logger.warning(f"Retry budget exhausted, not retrying: {retry_state.outcome.exception()!s}")
+        return True
+
+    def _count_retry(self, retry_state: RetryCallState) -> None:
+        self.retries += 1
+        logger.info(
+            f"Retrying model call (attempt {retry_state.attempt_number + 1}) "
+            f"after: {retry_state.outcome.exception()!s}"
+        )
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, or None while there is too little history."""
+        if not settings.hedge_enabled:
+            return None
+        delay = self.tracker.percentile(settings.hedge_percentile)
+        if delay is None:
+            return None
+        return max(delay, settings.hedge_min_delay_ms / 1000)
+
+    @contextlib.contextmanager
+    def measure(self) -> Iterator[None]:
+        """Record the latency of a successful backend call for the hedge percentile."""
+        started = time.monotonic()
+        yield
+        self.tracker.record(time.monotonic() - started)
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await attempt()
+
+        primary = asyncio.create_task(attempt())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if not self.budget.try_withdraw():
+                    self.budget_exhausted += 1
+                    return await primary
+                self.hedges += 1
+                tasks.append(asyncio.create_task(attempt()))
+
+            # First success wins; a failure only counts once every attempt failed
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict[str, float]:
+        """Return retry, hedge and budget counters."""
+        p95 = self.tracker.percentile(95)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_exhausted": self.budget_exhausted,
+            "budget_tokens": round(self.budget.tokens, 2),
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+        }
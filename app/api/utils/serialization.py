@@ -0,0 +1,49 @@
+"""
+Fast JSON responses for the quote endpoints.
+Controller output is already a validated model, so it is encoded directly by
+pydantic's serializer instead of being validated again against the route's
+``response_model``; other content uses orjson when it is installed.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, see requirements.txt
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode plain JSON data (dicts, lists, strings, numbers) compactly as UTF-8.
+
+    Produces the same bytes as Starlette's ``JSONResponse`` for such data.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+class ModelJSONResponse(JSONResponse):
+    """
+    JSON response for trusted content: a pydantic model, plain data or pre-encoded bytes.
+
+    Returning a response from an endpoint makes FastAPI skip ``response_model``
+    validation and ``jsonable_encoder``; the route's ``response_model`` still
+    documents the schema. Bytes are sent as-is, so static payloads can be
+    encoded once at startup.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, BaseModel):
+            return type(content).__pydantic_serializer__.to_json(content)
+        return dumps(content)
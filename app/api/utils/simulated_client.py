@@ -0,0 +1,242 @@
+"""
+Offline simulated Gemini backend for load testing.
+Emulates provider latency, token throughput, errors and timeouts without any network calls.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import re
+from collections.abc import AsyncIterator
+from typing import ClassVar
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+from .base_client import BaseAIClient
+from .history import record_usage
+
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedAIClient(BaseAIClient):
+    """Local stand-in for Gemini with configurable latency and fault injection."""
+
+    name = "simulated"
+
+    LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+    # Small vocabularies used to assemble plausible quote text
+    WORDS: ClassVar[dict[str, list[str]]] = {
+        "en": [
+            "courage",
+            "light",
+            "every",
+            "step",
+            "dreams",
+            "grow",
+            "quiet",
+            "hearts",
+            "time",
+            "kindness",
+            "journey",
+            "begins",
+            "within",
+            "patience",
+            "turns",
+            "small",
+            "into",
+            "great",
+            "hope",
+            "carries",
+            "forward",
+            "wisdom",
+            "listens",
+            "before",
+            "speaking",
+        ],
+        "ar": [
+            "الأمل",
+            "نور",
+            "كل",
+            "خطوة",
+            "الأحلام",
+            "تكبر",
+            "القلوب",
+            "الصبر",
+            "طريق",
+            "يبدأ",
+            "من",
+            "الداخل",
+            "الحكمة",
+            "تصغي",
+            "قبل",
+            "الكلام",
+            "الشجاعة",
+            "حياة",
+        ],
+    }
+
+    # Words emitted per streamed chunk
+    STREAM_CHUNK_WORDS = 3
+
+    _WORD_COUNT_RE = re.compile(r"in about (\d+) words")
+    _BATCH_COUNT_RE = re.compile(r"Create (\d+) different")
+
+    def __init__(self):
+        """Initialize the simulated backend from settings."""
+        distribution = settings.sim_latency_distribution.lower()
+        if distribution not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {distribution}. "
+                f"Use one of {list(self.LATENCY_DISTRIBUTIONS)}."
+            )
+        self.distribution = distribution
+        self.random = random.Random(settings.sim_seed)
+        self.available = True
+        logger.info(
+            f"✓ Simulated backend initialized: {distribution} latency "
+            f"~{settings.sim_latency_ms:.0f}ms, error_rate={settings.sim_error_rate}, "
+            f"timeout_rate={settings.sim_timeout_rate}"
+        )
+
+    async def generate_quote(
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        tier: str | None = None,
+    ) -> str:
+        """
+        Produce a synthetic quote after a simulated provider delay.
+
+        Args:
+            prompt: The generation prompt
+            max_tokens: Maximum tokens (default from settings)
+            temperature: Ignored, accepted for interface compatibility
+            tier: Ignored, the simulated backend has a single model
+
+        Returns:
+            Synthetic quote text
+
+        Raises:
+            HTTPException: sim_error_status on injected errors, 504 on injected or real timeouts
+        """
+        try:
+            return await asyncio.wait_for(
+                self._simulate(prompt, max_tokens or settings.max_tokens),
+                timeout=settings.request_timeout,
+            )
+        except TimeoutError as e:
+            logger.error(f"Simulated request timeout after {settings.request_timeout}s")
+            raise HTTPException(504, "Quote generation timed out. Please try again.") from e
+
+    async def stream_quote(
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        tier: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a synthetic quote a few words at a time.
+
+        The first chunk arrives after the sampled time-to-first-token; later chunks
+        are paced by ``sim_tokens_per_second`` when token-rate emulation is on.
+        """
+        try:
+            text = await asyncio.wait_for(
+                self._first_token(prompt, max_tokens or settings.max_tokens),
+                timeout=settings.request_timeout,
+            )
+        except TimeoutError as e:
+            logger.error(f"Simulated stream timeout after {settings.request_timeout}s")
+            raise HTTPException(504, "Quote generation timed out. Please try again.") from e
+
+        words = text.split(" ")
+        for start in range(0, len(words), self.STREAM_CHUNK_WORDS):
+            chunk = " ".join(words[start : start + self.STREAM_CHUNK_WORDS])
+            if start + self.STREAM_CHUNK_WORDS < len(words):
+                chunk += " "
+            if start and settings.sim_tokens_per_second > 0:
+                await asyncio.sleep(self._estimate_tokens(chunk) / settings.sim_tokens_per_second)
+            yield chunk
+
+    async def _simulate(self, prompt: str, max_tokens: int) -> str:
+        """Return the full text after time-to-first-token plus token-rate delay."""
+        text = await self._first_token(prompt, max_tokens)
+        if settings.sim_tokens_per_second > 0:
+            await asyncio.sleep(self._estimate_tokens(text) / settings.sim_tokens_per_second)
+        return text
+
+    async def _first_token(self, prompt: str, max_tokens: int) -> str:
+        """Sleep for the sampled latency, then return text or raise an injected fault."""
+        roll = self.random.random()
+        if roll < settings.sim_timeout_rate:
+            # Hang like a stuck upstream call until the caller's timeout fires
+            await asyncio.Event().wait()
+
+        await asyncio.sleep(self._sample_latency())
+
+        if roll < settings.sim_timeout_rate + settings.sim_error_rate:
+            raise HTTPException(
+                settings.sim_error_status, "Quote generation failed: simulated backend error"
+            )
+
+        text = self._compose_text(prompt, max_tokens)
+        # Estimated usage, reported like the real backend's usage metadata
+        record_usage(self._estimate_tokens(prompt), self._estimate_tokens(text))
+        return text
+
+    def _sample_latency(self) -> float:
+        """Sample a time-to-first-token delay in seconds."""
+        mean = settings.sim_latency_ms
+        jitter = settings.sim_latency_jitter_ms
+
+        if self.distribution == "constant" or mean <= 0:
+            value = mean
+        elif self.distribution == "uniform":
+            value = self.random.uniform(mean - jitter, mean + jitter)
+        elif self.distribution == "normal":
+            value = self.random.gauss(mean, jitter)
+        elif self.distribution == "exponential":
+            value = self.random.expovariate(1.0 / mean)
+        else:
+            # Lognormal parameterised so the samples have the configured mean and stddev
+            variance = jitter**2
+            sigma2 = math.log1p(variance / mean**2)
+            mu = math.log(mean) - sigma2 / 2
+            value = self.random.lognormvariate(mu, sigma2**0.5)
+
+        return max(value, 0.0) / 1000
+
+    def _compose_text(self, prompt: str, max_tokens: int) -> str:
+        """Assemble a quote (or numbered list of quotes) of roughly the requested size."""
+        language = "ar" if "Arabic" in prompt else "en"
+        match = self._WORD_COUNT_RE.search(prompt)
+        word_count = int(match.group(1)) if match else 25
+
+        batch = self._BATCH_COUNT_RE.search(prompt)
+        if batch:
+            count = int(batch.group(1))
+            # Respect the token cap the same way a real model would truncate
+            count = max(1, min(count, int(max_tokens / 1.3 / word_count)))
+            return "\n".join(
+                f"{i}. {self._compose_sentence(language, word_count)}" for i in range(1, count + 1)
+            )
+
+        word_count = max(1, min(word_count, int(max_tokens / 1.3)))
+        return self._compose_sentence(language, word_count)
+
+    def _compose_sentence(self, language: str, word_count: int) -> str:
+        words = self.random.choices(self.WORDS[language], k=word_count)
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + "." if language == "en" else text + "."
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token estimate (about 1.3 tokens per word)."""
+        return max(1, int(len(text.split()) * 1.3))
@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing of identical in-flight generation requests.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One shared upstream call and the callers waiting on it."""
+
+    __slots__ = ("capacity", "slots", "task", "waiters")
+
+    def __init__(self):
+        self.slots = 0  # Callers that joined, each owning one result slot
+        self.waiters = 0  # Callers still waiting (not cancelled)
+        self.capacity: int | None = None  # Results requested; None while collecting
+        self.task: asyncio.Task | None = None
+
+    def accepting(self) -> bool:
+        if self.task is not None and self.task.done():
+            return False
+        return self.capacity is None or self.slots < self.capacity
+
+
+class SingleFlight:
+    """
+    Makes concurrent identical requests share one upstream call.
+
+    The first caller for a key opens a flight, which collects identical callers
+    for ``window`` seconds (by default none: only callers arriving before the
+    flight's task first runs) and then issues a single call for as many
+    distinct quotes as there are waiters, plus ``spare_slots`` for callers
+    arriving while the call is in progress. Each waiter receives its own quote.
+
+    The upstream call runs in its own task, so a disconnecting caller does not
+    cancel it for the others; it is only cancelled once every waiter is gone.
+    """
+
+    def __init__(
+        self,
+        window: float | None = None,
+        max_batch: int | None = None,
+        spare_slots: int | None = None,
+    ):
+        self.window = window if window is not None else settings.single_flight_window_ms / 1000
+        self.max_batch = max(1, max_batch or settings.single_flight_max_batch)
+        self.spare_slots = (
+            spare_slots if spare_slots is not None else settings.single_flight_spare_slots
+        )
+        self._flights: dict[Hashable, _Flight] = {}
+
+        self.requests = 0
+        self.upstream_calls = 0
+        self.saved_calls = 0
+        self.cancelled_calls = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[int], Awaitable[list[str]]]) -> str | None:
+        """
+        Get a quote for ``key``, sharing the upstream call with identical callers.
+
+        Args:
+            key (Hashable): Normalized request key; equal keys are coalesced.
+            fetch (Callable): ``fetch(count)`` performs the upstream call and returns
+                up to ``count`` distinct quotes.
+
+        Returns:
+            Optional[str]: This caller's quote, or None if the upstream call returned
+            fewer quotes than there were waiters (the caller should generate its own).
+
+        Raises:
+            Exception: Whatever ``fetch`` raised, re-raised in every waiter.
+        """
+        self.requests += 1
+        flight = self._flights.get(key)
+        joined = flight is not None and flight.accepting() and flight.slots < self.max_batch
+        if not joined:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, fetch))
+
+        slot = flight.slots
+        flight.slots += 1
+        flight.waiters += 1
+        try:
+            texts = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last interested caller went away; stop paying for the call
+                flight.capacity = 0
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.cancelled_calls += 1
+            raise
+        flight.waiters -= 1
+        if slot >= len(texts):
+            return None
+        if joined:
+            # Only a joiner that got its quote was spared an upstream call
+            self.saved_calls += 1
+        return texts[slot]
+
+    async def _run(
+        self, key: Hashable, flight: _Flight, fetch: Callable[[int], Awaitable[list[str]]]
+    ) -> list[str]:
+        try:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            flight.capacity = min(flight.slots + self.spare_slots, self.max_batch)
+            self.upstream_calls += 1
+            return await fetch(flight.capacity)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> dict[str, int]:
+        """Return request, upstream call and saved call counters."""
+        return {
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "saved_calls": self.saved_calls,
+            "cancelled_calls": self.cancelled_calls,
+            "in_flight": len(self._flights),
+        }
@@ -0,0 +1,189 @@
+"""
+Per-request timing breakdown, reported in the Server-Timing response header.
+Spans are collected through a context variable, so code deep in the controller
+and utils can record them without passing anything around.
+"""
+
+import asyncio
+import functools
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.logging_config import current_route
+
+from .metrics import stage_seconds
+from .profiler import StackSampler
+
+
+logger = logging.getLogger(__name__)
+
+# Span name -> accumulated seconds for the request being handled, None outside requests
+_spans: ContextVar[dict[str, float] | None] = ContextVar("server_timing_spans", default=None)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add time to a span of the current request (no-op outside a request)."""
+    spans = _spans.get()
+    if spans is not None:
+        spans[name] = spans.get(name, 0.0) + seconds
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a generation stage in both the metrics histogram and Server-Timing."""
+    stage_seconds.observe(seconds, name)
+    record_span(name, seconds)
+
+
+class _StageTimer:
+    __slots__ = ("_name", "_started")
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        record_stage(self._name, time.perf_counter() - self._started)
+
+
+def stage(name: str) -> _StageTimer:
+    """Context manager timing a block as generation stage ``name``."""
+    return _StageTimer(name)
+
+
+def format_server_timing(spans: dict[str, float]) -> str:
+    """Format spans as a Server-Timing header value, with durations in milliseconds."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in spans.items())
+
+
+class TimedRoute(APIRoute):
+    """
+    API route that splits handler time into ``validate``, ``endpoint`` and ``serialize``.
+
+    It also publishes the route template to logging, for per-route sampling.
+
+    FastAPI parses and validates the request, calls the endpoint, then validates
+    and serializes its return value inside one handler; wrapping the endpoint
+    call marks where the first part ends and the last begins.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+
+            @functools.wraps(call)
+            async def timed_call(**kwargs):
+                marks = _mark("endpoint_started")
+                try:
+                    return await call(**kwargs)
+                finally:
+                    if marks is not None:
+                        marks["endpoint_ended"] = time.perf_counter()
+
+            self.dependant.call = timed_call
+        handler = super().get_route_handler()
+
+        path = self.path
+
+        async def timed_handler(request):
+            # Left set: each request runs in its own task, and the access log
+            # written after the handler returns should carry the route too
+            current_route.set(path)
+            spans = _spans.get()
+            if spans is None:
+                return await handler(request)
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                ended = time.perf_counter()
+                endpoint_started = spans.pop("endpoint_started", None)
+                endpoint_ended = spans.pop("endpoint_ended", None)
+                if endpoint_started is not None and endpoint_ended is not None:
+                    spans["validate"] = endpoint_started - started
+                    spans["endpoint"] = endpoint_ended - endpoint_started
+                    spans["serialize"] = ended - endpoint_ended
+
+        return timed_handler
+
+
+def _mark(name: str) -> dict[str, float] | None:
+    spans = _spans.get()
+    if spans is not None:
+        spans[name] = time.perf_counter()
+    return spans
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting spans for each request into a Server-Timing header.
+
+    The header is added when the response starts (only when ``server_timing``
+    is on), so for streamed responses it only covers the work done before the
+    first byte. With a ``profiler``, a ``sample_rate`` fraction of requests
+    also runs under the stack sampler, counted per route template.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiler: StackSampler | None = None,
+        sample_rate: float | None = None,
+        server_timing: bool | None = None,
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate if sample_rate is not None else settings.profile_sample_rate
+        self.server_timing = (
+            settings.server_timing_enabled if server_timing is None else server_timing
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiled = self.profiler is not None and random.random() < self.sample_rate
+        if not self.server_timing:
+            if not profiled:
+                await self.app(scope, receive, send)
+                return
+            self.profiler.begin()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.profiler.end(_route_template(scope))
+            return
+
+        started = time.perf_counter()
+        spans: dict[str, float] = {}
+        token = _spans.set(spans)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                spans["total"] = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(spans).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        if profiled:
+            self.profiler.begin()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiled:
+                self.profiler.end(_route_template(scope))
+            _spans.reset(token)
+
+
+def _route_template(scope: Scope) -> str:
+    """Path template of the route that handled the request (set once routed), else 'other'."""
+    return getattr(scope.get("route"), "path", "other")
@@ -16,12 +16,186 @@ class Settings(BaseSettings):
     # Google Gemini API Configuration
     gemini_api_key: str = ""  # Required: Set in Vercel environment variables
 
+    # Admin API (/api/admin); disabled unless a key is set
+    admin_api_key: str | None = None
+
     # AI Model Settings
     default_model: str = "gemini-1.5-flash-8b"  # Fastest Gemini model
     max_tokens: int = 150  # Safe for complete quote generation
     temperature: float = 0.8  # Balanced creativity
     request_timeout: int = 30  # Request timeout in seconds
 
+    # Generation Backend ("gemini" or "simulated" for offline load testing)
+    ai_backend: str = "gemini"
+    ai_warmup: bool = False  # Import the backend SDK at startup instead of on first generation
+
+    # Simulated Backend Settings (only used when ai_backend="simulated")
+    sim_latency_distribution: str = "lognormal"  # constant, uniform, normal, lognormal, exponential
+    sim_latency_ms: float = 800.0  # Mean time to first token
+    sim_latency_jitter_ms: float = 300.0  # Stddev (normal/lognormal) or half-width (uniform)
+    sim_tokens_per_second: float = 0.0  # Output token rate, 0 disables token-rate emulation
+    sim_error_rate: float = 0.0  # Fraction of calls failing with sim_error_status
+    sim_error_status: int = 500  # Status of injected errors (429 emulates quota exhaustion)
+    sim_timeout_rate: float = 0.0  # Fraction of calls hanging until request_timeout
+    sim_seed: int | None = None  # Fixed seed for reproducible runs
+
+    # Response Cache (in-process LRU/TTL keyed on the normalized request)
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024  # Distinct request keys kept before LRU eviction
+    cache_ttl_seconds: int = 3600  # Lifetime of a key's variants
+    cache_variants_per_key: int = 5  # Quotes collected per key before serving hits
+    cache_temperature_bucket: float = 0.1  # Temperatures in the same bucket share a key
+
+    # Pre-generated Quote Pools (refilled in the background, served by /random)
+    pool_enabled: bool = False  # Spends quota at startup, so opt-in (on for Docker)
+    pool_categories: list[str] = ["random"]
+    pool_languages: list[str] = ["en", "ar"]
+    pool_lengths: list[str] = ["medium"]
+    pool_size: int = 20  # Quotes kept per pool when full
+    pool_low_watermark: int = 10  # Refill a pool once it drops below this
+    pool_refill_concurrency: int = 2  # Concurrent background generations
+    pool_refill_interval_seconds: float = 5.0  # Idle re-check (and error back-off) interval
+    pool_ttl_seconds: float = 86400.0  # Pooled quotes older than this are dropped
+    pool_backend: str = "memory"  # 'memory' (per process) or 'sqlite' (shared by workers)
+    pool_db_path: str = "/tmp/swan_quote_pool.sqlite3"  # Used by the sqlite backend
+    pool_db_busy_timeout: float = 0.05  # Max wait for the database lock; pops run on the loop
+
+    # Request Coalescing (identical concurrent requests share one upstream call)
+    single_flight_enabled: bool = True
+    single_flight_window_ms: float = 0.0  # Delay before a new call, to collect identical callers
+    single_flight_max_batch: int = 10  # Max distinct quotes requested by one shared call
+    single_flight_spare_slots: int = 0  # Extra quotes requested for callers arriving mid-call
+
+    # Outbound Admission Control (protects the Gemini quota)
+    admission_enabled: bool = True
+    admission_rate_per_minute: float = 15.0  # Model quota per minute and API key (0 = unlimited)
+    admission_burst: float = 5.0  # Calls allowed back-to-back before rate limiting kicks in
+    admission_min_concurrency: int = 1  # AIMD floor for concurrent model calls
+    admission_max_concurrency: int = 16  # AIMD ceiling for concurrent model calls
+    admission_max_queue: int = 100  # Waiting calls before new ones are rejected with 503
+    admission_max_wait_seconds: float = 10.0  # Longest a call may queue before a 503/429
+    admission_latency_target_ms: float = 5000.0  # Slower calls shrink the concurrency limit
+
+    # Hedging and Retries (tail latency and transient errors of model calls)
+    hedge_enabled: bool = True
+    hedge_percentile: float = 95.0  # Start a second attempt once a call exceeds this latency
+    hedge_min_delay_ms: float = 200.0  # Never hedge sooner than this
+    hedge_min_samples: int = 20  # Calls observed before hedging starts
+    latency_window: int = 200  # Recent call latencies used for the percentile
+    retry_max_attempts: int = 3  # Attempts per call, including the first
+    retry_backoff_base_ms: float = 200.0  # Base of the jittered exponential backoff
+    retry_backoff_max_ms: float = 2000.0  # Cap on a single backoff sleep
+    retry_max_elapsed_seconds: float = 20.0  # Stop retrying once a call has run this long
+    retry_budget_ratio: float = 0.1  # Extra attempts (retries + hedges) earned per call
+    retry_budget_burst: float = 10.0  # Most extra attempts that can be saved up
+
+    # Circuit Breaker and Fallback Corpus (served while the model backend is failing)
+    circuit_enabled: bool = True
+    circuit_window: int = 20  # Recent model calls used to compute error and slow-call rates
+    circuit_min_calls: int = 5  # Calls recorded before the circuit may open
+    circuit_failure_rate: float = 0.5  # Open at this fraction of failed calls
+    circuit_slow_call_rate: float = 0.8  # Open at this fraction of slow calls
+    circuit_slow_call_ms: float = 10000.0  # Calls slower than this count as slow
+    circuit_open_seconds: float = 30.0  # Time open before probing for recovery
+    circuit_half_open_probes: int = 2  # Successful probes needed to close again
+    fallback_enabled: bool = True
+    fallback_corpus_path: str | None = None  # Defaults to app/data/fallback_quotes.json
+
+    # Quote Library (indexed store answering topic requests without a model call)
+    library_enabled: bool = True
+    library_dir: str = "/tmp/swan_quote_library"  # Must be writable for the library to grow
+    library_min_score: float = 0.8  # IDF-weighted share of topic terms a stored quote must match
+    library_min_matches: int = 3  # Matching quotes needed before the library answers a topic
+    library_learn: bool = True  # Add freshly generated quotes to the library
+    library_compact_threshold: int = 1000  # Journal lines before folding into the snapshot
+    library_refresh_seconds: float = 5.0  # How often to pick up other workers' additions
+
+    # Metrics (/metrics in Prometheus text format)
+    metrics_enabled: bool = True
+    metrics_dir: str | None = None  # Shared directory to sum metrics over uvicorn workers
+    metrics_flush_seconds: float = 5.0  # How often each worker writes its snapshot there
+
+    # Model Routing (Gemini calls spread over several API keys and models)
+    gemini_api_keys: list[str] = []  # Extra keys used next to gemini_api_key (JSON list)
+    router_tiers: dict[str, list[str]] = {
+        "fast": ["gemini-1.5-flash-8b"],  # Short and medium quotes without a style
+        "large": ["gemini-1.5-flash"],  # Long or styled quotes
+    }
+    router_key_rate_per_minute: float = 15.0  # Quota of each key and model (0 = unlimited)
+    router_key_burst: float = 5.0  # Calls a key and model may take back-to-back
+    router_quota_cooldown_seconds: float = 60.0  # Rest a key and model after a 429
+    router_ewma_alpha: float = 0.2  # Weight of the latest call in latency/error averages
+    router_error_penalty: float = 4.0  # Latency multiplier per unit of error rate
+
+    # Quote History (every served quote, appended to SQLite by a background writer)
+    history_enabled: bool = True
+    history_db_path: str = "/tmp/swan_quote_history.sqlite3"
+    history_db_busy_timeout: float = 5.0  # Writes and reads run off the event loop
+    history_queue_size: int = 10000  # Entries waiting for the writer; more are dropped
+    history_batch_size: int = 500  # Entries written per transaction
+    history_flush_interval_seconds: float = 1.0  # Max time an entry waits for its batch
+    history_page_size: int = 50  # Default page size of /api/quotes/history
+    history_max_page_size: int = 200
+
+    # HTTP Caching (ETag/Cache-Control/304 for the quote API, keyed by route template)
+    http_cache_enabled: bool = True
+    http_cache_policies: dict[str, str] = {
+        "/api/quotes/categories": "public, max-age=3600, stale-while-revalidate=86400",
+        "/api/quotes/random": "no-cache",
+        "/api/quotes/history": "no-cache",
+        "/api/quotes/generate": "no-store",
+        "/api/quotes/batch": "no-store",
+    }
+
+    # Static Assets (React build)
+    static_precompress: bool = True  # Serve gzip/brotli variants, compressed once per asset
+    static_compress_min_bytes: int = 1024  # Smaller files are always sent uncompressed
+    static_brotli_quality: int = 5  # Runtime brotli level; build-time precompression uses 11
+    static_memory_limit_mb: float = 32.0  # Requested assets kept in memory up to this total
+    static_immutable_max_age: int = 31536000  # Cache lifetime of content-hashed files
+
+    # Fast JSON Responses (encode controller output without re-validating it)
+    fast_json_enabled: bool = True
+
+    # Logging (queued and written by a background thread)
+    log_level: str = "INFO"
+    log_format: str = "text"  # "text" or "json" (one object per line; set in the Docker image)
+    log_queue_size: int = 10000  # Records buffered for the writer; DEBUG/INFO overflow is dropped
+    log_sample_rate: float = 1.0  # Share of DEBUG/INFO records kept while handling requests
+    log_route_sample_rates: dict[str, float] = {}  # Per route template, overrides the default
+
+    # Request Timing and Profiling
+    server_timing_enabled: bool = True  # Per-request span breakdown in a Server-Timing header
+    profile_sample_rate: float = 0.0  # Share of requests profiled (only honoured with DEBUG)
+    profile_interval_ms: float = 5.0  # Stack sampling interval while profiling
+
+    # Output Post-processing
+    postprocess_strip_attribution: bool = True  # Drop trailing '— Author' attributions
+    postprocess_strip_diacritics: bool = False  # Remove Arabic harakat from quotes
+
+    # Novelty Filter (suppress quotes near-identical to recently served ones)
+    novelty_enabled: bool = True
+    novelty_threshold: float = 0.5  # Estimated Jaccard similarity treated as a repeat
+    novelty_window: int = 256  # Recent quotes remembered per category and language
+    novelty_shingle_size: int = 4  # Characters per shingle
+    novelty_max_attempts: int = 3  # Pool/cache/library candidates tried before moving on
+    novelty_max_regenerations: int = 1  # Extra model calls for a near-duplicate answer
+
+    # Inbound Rate Limiting (per client IP or X-API-Key, shared across workers)
+    rate_limit_enabled: bool = True
+    rate_limit_times: int = 10  # Requests allowed per window (also the burst size)
+    rate_limit_seconds: float = 60.0  # Window length in seconds
+    rate_limit_backend: str = "memory"  # 'memory' (per process) or 'sqlite' (shared by workers)
+    rate_limit_db_path: str = "/tmp/swan_rate_limits.sqlite3"  # Used by the sqlite backend
+    rate_limit_trust_proxy: bool = False  # Client IP from X-Forwarded-For; only behind a proxy
+    rate_limit_api_keys: list[str] = []  # X-API-Key values limited per key (JSON list)
+    rate_limit_evict_interval_seconds: float = 60.0  # How often idle clients are dropped
+
+    # Batch Generation (/api/quotes/batch)
+    batch_group_size: int = 10  # Max quotes requested in one multi-quote prompt
+    batch_concurrency: int = 4  # Concurrent backend calls per batch
+    batch_max_tokens: int = 4096  # Output token cap for one multi-quote prompt
+
     # CORS Settings (allow all for Vercel)
     allowed_origins: list[str] = ["*"]
 
@@ -0,0 +1,162 @@
+"""
+Logging setup: records are queued on the calling thread and formatted and
+written by a background listener, so request handlers never block on stderr.
+Output is the classic text format or one JSON object per line, and
+DEBUG/INFO records on busy routes can be sampled while warnings and errors
+always pass.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+
+from app.config import settings
+
+
+# Route template of the request being handled (set by the API route class)
+current_route: ContextVar[str | None] = ContextVar("log_route", default=None)
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# LogRecord attributes that are not user-supplied ``extra`` fields (uvicorn
+# adds an ANSI-colored copy of its messages as ``color_message``)
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None)).keys()
+    | {"message", "asctime", "route", "taskName", "color_message"}
+)
+
+_listener: QueueListener | None = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route is not None:
+            payload["route"] = route
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class RouteSamplingFilter(logging.Filter):
+    """
+    Tags records with the current route and samples the chatty ones.
+
+    Records below WARNING logged while handling a request are kept with the
+    route's rate from ``route_rates``, or ``default_rate``; records outside a
+    request and anything at WARNING or above always pass.
+    """
+
+    def __init__(self, default_rate: float = 1.0, route_rates: dict[str, float] | None = None):
+        super().__init__()
+        self.default_rate = default_rate
+        self.route_rates = route_rates or {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        route = current_route.get()
+        record.route = route
+        if route is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.route_rates.get(route, self.default_rate)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that defers all formatting to the listener thread.
+
+    The stock handler formats the message before enqueueing (so records can
+    be pickled); with an in-process queue the record itself can be handed
+    over, leaving ``%`` interpolation, JSON encoding and tracebacks to the
+    writer. Arguments are therefore rendered after the call returns, so don't
+    log objects you mutate right after. When the queue is full, DEBUG/INFO
+    records are dropped and counted instead of blocking the caller; WARNING
+    and above are never dropped but written synchronously through
+    ``overflow`` (or, without one, enqueued once the writer makes room).
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: logging.Handler | None = None):
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self.overflowed = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+            elif self.overflow is not None:
+                self.overflowed += 1
+                self.overflow.handle(record)
+            else:
+                self.queue.put(record)
+
+
+def setup_logging() -> QueueListener:
+    """
+    Route all logging (including uvicorn's) through the queue and start the writer.
+
+    Safe to call more than once; later calls return the running listener.
+
+    Returns:
+        QueueListener: The background writer, stopped at interpreter exit.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream = logging.StreamHandler(sys.stderr)
+    if settings.log_format.lower() == "json":
+        stream.setFormatter(JSONFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.log_queue_size), stream)
+    handler.addFilter(
+        RouteSamplingFilter(settings.log_sample_rate, settings.log_route_sample_rates)
+    )
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+
+    # uvicorn installs its own stream handlers before importing the app
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
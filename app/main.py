@@ -4,22 +4,44 @@ Optimized for Vercel serverless deployment.
 """
 
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api.routes import quote_router
+from app.api.routes import admin_router, quote_router
+from app.api.routes.quote_routes import get_controller, rate_limiter
+from app.api.utils import HTTPCacheMiddleware, MetricsMiddleware, ServerTimingMiddleware
+from app.api.utils.metrics import registry as metrics_registry
+from app.api.utils.profiler import profiler
 from app.config import settings
+from app.logging_config import setup_logging
+from app.static_assets import StaticAssets
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+# Configure logging (queued, written off the event loop)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background work such as quote pool refills."""
+    controller = get_controller()
+    await controller.start()
+    if settings.metrics_enabled:
+        metrics_registry.add_collector(controller.metrics_samples)
+        await metrics_registry.start()
+    yield
+    await controller.stop()
+    await rate_limiter.close()
+    await metrics_registry.stop()
+
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.app_name,
@@ -27,6 +49,7 @@ app = FastAPI(
     description="AI Quote Generator powered by Google Gemini",
     docs_url="/docs" if settings.debug else None,
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 
@@ -36,10 +59,14 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     logger.error(f"Validation error for {request.url}: {exc.errors()}")
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": exc.errors(), "body": exc.body},
+        content=jsonable_encoder({"detail": exc.errors(), "body": exc.body}),
     )
 
 
+# ETag/Cache-Control/304 for the quote API (inside CORS, which then merges its Vary)
+if settings.http_cache_enabled:
+    app.add_middleware(HTTPCacheMiddleware)
+
 # Configure CORS - Allow all origins for Vercel
 app.add_middleware(
     CORSMiddleware,
@@ -49,20 +76,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request span breakdown (Server-Timing) and sampled profiling
+if settings.server_timing_enabled or profiler is not None:
+    app.add_middleware(ServerTimingMiddleware, profiler=profiler)
+
+# Count and time requests per route (outermost, so CORS preflights are included)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include API routers
 app.include_router(quote_router)
+app.include_router(admin_router)
 
 
 @app.get("/health", tags=["health"])
 async def health_check():
     """Health check endpoint for monitoring."""
-    return {"status": "healthy", "version": settings.app_version, "model": settings.default_model}
+    return {
+        "status": "healthy",
+        "version": settings.app_version,
+        "backend": settings.ai_backend,
+        "model": settings.default_model,
+    }
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics", tags=["health"], include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics: request and stage latencies, tokens, errors, hit ratios."""
+        return PlainTextResponse(
+            await metrics_registry.scrape(), media_type="text/plain; version=0.0.4"
+        )
 
 
 # Serve React build
 build_dir = Path(__file__).parent.parent / "static" / "build"
 if build_dir.exists():
-    app.mount("/", StaticFiles(directory=str(build_dir), html=True), name="static")
+    app.mount("/", StaticAssets(directory=build_dir, html=True), name="static")
     logger.info(f"React app served from {build_dir}")
 else:
 
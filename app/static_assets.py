@@ -0,0 +1,401 @@
+"""
+Static file serving for the React build.
+Each asset gets a strong ETag from its content and is compressed once (gzip,
+and brotli when the module is installed, or from ``.gz``/``.br`` files written
+at build time); requested assets are then kept in memory up to a budget.
+Content-hashed files are cached as immutable, everything else is revalidated.
+
+Build-time precompression:
+    python -m app.static_assets static/build
+"""
+
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+import posixpath
+import re
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from pathlib import Path
+
+import anyio
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.api.utils.http_cache import etag_matches
+from app.config import settings
+
+
+try:
+    import brotli
+except ImportError:  # Optional, see requirements.txt; gzip is always available
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# Content encodings in order of preference, with the suffix of precompressed files
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Media types worth compressing (images other than SVG/ICO already are)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+    "image/vnd.microsoft.icon",
+    "image/x-icon",
+)
+
+# Extensions mimetypes does not know
+MEDIA_TYPES = {".map": "application/json", ".webmanifest": "application/manifest+json"}
+
+# A compressed variant is only kept if it is at least this much smaller
+MIN_SAVING = 0.1
+
+# Content hash in a file name, as in main.8b2de2ef.js or main.60fec5bf.css.map
+_HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+
+REVALIDATE = "no-cache"
+
+
+@dataclass
+class StaticAsset:
+    """One file of the build and the representations it can be served in."""
+
+    path: Path
+    media_type: str
+    etag: str  # Quoted content hash of the uncompressed file
+    size: int
+    last_modified: str
+    immutable: bool
+    compressible: bool
+    precompressed: dict[str, Path] = field(default_factory=dict)  # Encoding -> file on disk
+    body: bytes | None = None  # Uncompressed content when held in memory
+    variants: dict[str, bytes] = field(default_factory=dict)  # Encoding -> compressed content
+    loaded: bool = False  # First request handled; body stays None if it did not fit
+
+    def encodings(self) -> list[str]:
+        """Encodings this asset can currently be served in."""
+        return list(self.variants) if self.body is not None else list(self.precompressed)
+
+    def etag_for(self, encoding: str | None) -> str:
+        """Strong ETag of one representation (each encoding is a different entity)."""
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+
+def media_type_for(path: Path) -> str:
+    media_type = MEDIA_TYPES.get(path.suffix) or mimetypes.guess_type(path.name)[0]
+    return media_type or "text/plain"
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """
+    Compress ``body`` with one of the supported content encodings.
+
+    Args:
+        body (bytes): Uncompressed content.
+        encoding (str): 'br' or 'gzip'.
+        best (bool): Use the highest (slowest) quality, for build-time runs.
+
+    Returns:
+        bytes: The compressed content.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else settings.static_brotli_quality)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def available_encodings() -> list[str]:
+    return [encoding for encoding, _ in ENCODINGS if encoding != "br" or brotli is not None]
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class StaticAssets:
+    """
+    ASGI app serving a directory of static files (drop-in for ``StaticFiles``).
+
+    The directory is indexed on the first request: file sizes, content hashes
+    and precompressed siblings. The first request for an asset loads it,
+    compresses it in a worker thread and keeps the result in memory while the
+    total stays within ``memory_limit`` bytes; larger or later assets are sent
+    from disk. Files added after the index was built are not served, which is
+    what a deployed build needs.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        html: bool = False,
+        precompress: bool | None = None,
+        memory_limit: int | None = None,
+        compress_min_bytes: int | None = None,
+    ):
+        self.directory = Path(directory)
+        self.html = html
+        self.precompress = settings.static_precompress if precompress is None else precompress
+        self.memory_limit = (
+            memory_limit
+            if memory_limit is not None
+            else int(settings.static_memory_limit_mb * 1024 * 1024)
+        )
+        self.compress_min_bytes = (
+            compress_min_bytes
+            if compress_min_bytes is not None
+            else settings.static_compress_min_bytes
+        )
+        self.immutable = f"public, max-age={settings.static_immutable_max_age}, immutable"
+        self.encodings = available_encodings()
+
+        self._assets: dict[str, StaticAsset] | None = None
+        self._lock = threading.Lock()
+        self.memory_used = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.compressed_responses = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse(
+                "Method Not Allowed", status_code=405, headers={"allow": "GET, HEAD"}
+            )
+            await response(scope, receive, send)
+            return
+
+        if self._assets is None:
+            await anyio.to_thread.run_sync(self._build_index)
+        self.requests += 1
+
+        asset = self._lookup(scope["path"])
+        status_code = 200
+        if asset is None and self.html:
+            asset = self._assets.get("404.html")
+            status_code = 404
+        if asset is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        if not asset.loaded:
+            await anyio.to_thread.run_sync(self._load, asset)
+        response = self._respond(asset, scope, status_code)
+        await response(scope, receive, send)
+
+    def _lookup(self, path: str) -> StaticAsset | None:
+        key = posixpath.normpath(path.lstrip("/"))
+        asset = self._assets.get(key)
+        if asset is None and self.html:
+            asset = self._assets.get("index.html" if key == "." else f"{key}/index.html")
+        return asset
+
+    def _respond(self, asset: StaticAsset, scope: Scope, status_code: int) -> Response:
+        request_headers = dict(scope["headers"])
+        encoding = self._choose_encoding(
+            asset, request_headers.get(b"accept-encoding", b"").decode("latin-1")
+        )
+        headers = {
+            "etag": asset.etag_for(encoding),
+            "last-modified": asset.last_modified,
+            "cache-control": self.immutable if asset.immutable else REVALIDATE,
+        }
+        if asset.encodings():
+            headers["vary"] = "Accept-Encoding"
+
+        if_none_match = request_headers.get(b"if-none-match")
+        if (
+            status_code == 200
+            and if_none_match is not None
+            and etag_matches(if_none_match.decode("latin-1"), headers["etag"])
+        ):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers["content-encoding"] = encoding
+            self.compressed_responses += 1
+            body = asset.variants.get(encoding)
+            if body is None:
+                return FileResponse(
+                    asset.precompressed[encoding],
+                    status_code=status_code,
+                    headers=headers,
+                    media_type=asset.media_type,
+                )
+        else:
+            body = asset.body
+            if body is None:
+                return FileResponse(
+                    asset.path,
+                    status_code=status_code,
+                    headers=headers,
+                    media_type=asset.media_type,
+                )
+        return Response(body, status_code=status_code, headers=headers, media_type=asset.media_type)
+
+    @staticmethod
+    def _choose_encoding(asset: StaticAsset, accept_encoding: str) -> str | None:
+        available = asset.encodings()
+        if not available or not accept_encoding:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for encoding, _ in ENCODINGS:
+            if encoding in available and accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return None
+
+    def _build_index(self) -> None:
+        with self._lock:
+            if self._assets is not None:
+                return
+            assets = {}
+            for path in sorted(self.directory.rglob("*")):
+                if not path.is_file() or self._is_precompressed_copy(path):
+                    continue
+                key = path.relative_to(self.directory).as_posix()
+                assets[key] = self._index_file(path)
+            self._assets = assets
+            logger.info(f"Indexed {len(assets)} static assets in {self.directory}")
+
+    @staticmethod
+    def _is_precompressed_copy(path: Path) -> bool:
+        return any(
+            path.name.endswith(suffix) and path.with_name(path.name[: -len(suffix)]).is_file()
+            for _, suffix in ENCODINGS
+        )
+
+    def _index_file(self, path: Path) -> StaticAsset:
+        stat = path.stat()
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        media_type = media_type_for(path)
+        compressible = self.precompress and is_compressible(media_type)
+
+        precompressed = {}
+        if compressible:
+            for encoding, suffix in ENCODINGS:
+                sibling = path.with_name(path.name + suffix)
+                if sibling.is_file() and sibling.stat().st_mtime >= stat.st_mtime:
+                    precompressed[encoding] = sibling
+
+        return StaticAsset(
+            path=path,
+            media_type=media_type,
+            etag=f'"{digest.hexdigest()[:32]}"',
+            size=stat.st_size,
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            immutable=bool(_HASHED_NAME_RE.search(path.name)),
+            compressible=compressible,
+            precompressed=precompressed,
+        )
+
+    def _load(self, asset: StaticAsset) -> None:
+        """Read and compress an asset on its first request, keeping it in memory if it fits."""
+        with self._lock:
+            if asset.loaded:
+                return
+            asset.loaded = True
+            if self.memory_used + asset.size > self.memory_limit:
+                return  # Served from disk, precompressed files included
+
+            body = asset.path.read_bytes()
+            variants = {}
+            if asset.compressible and asset.size >= self.compress_min_bytes:
+                for encoding in dict.fromkeys([*asset.precompressed, *self.encodings]):
+                    if encoding in asset.precompressed:
+                        variant = asset.precompressed[encoding].read_bytes()
+                    else:
+                        variant = compress(body, encoding)
+                    if len(variant) <= len(body) * (1 - MIN_SAVING):
+                        variants[encoding] = variant
+
+            size = len(body) + sum(len(v) for v in variants.values())
+            if self.memory_used + size > self.memory_limit:
+                return
+            asset.body = body
+            asset.variants = variants
+            self.memory_used += size
+
+    def stats(self) -> dict[str, float]:
+        """Request counters and memory use."""
+        assets = self._assets or {}
+        return {
+            "assets": len(assets),
+            "in_memory": sum(1 for asset in assets.values() if asset.body is not None),
+            "memory_bytes": self.memory_used,
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "compressed_responses": self.compressed_responses,
+        }
+
+
+def precompress_directory(directory: str | Path, min_bytes: int | None = None) -> tuple[int, int]:
+    """
+    Write ``.gz`` (and ``.br``) files next to every compressible file, at best quality.
+
+    Args:
+        directory (str | Path): Build directory, e.g. ``static/build``.
+        min_bytes (Optional[int]): Skip smaller files (default from settings).
+
+    Returns:
+        tuple[int, int]: Total bytes of the originals and of the smallest variants.
+    """
+    min_bytes = settings.static_compress_min_bytes if min_bytes is None else min_bytes
+    directory = Path(directory)
+    original_total = compressed_total = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or StaticAssets._is_precompressed_copy(path):
+            continue
+        body = path.read_bytes()
+        original_total += len(body)
+        smallest = len(body)
+        if is_compressible(media_type_for(path)) and len(body) >= min_bytes:
+            for encoding, suffix in ENCODINGS:
+                if encoding not in available_encodings():
+                    continue
+                variant = compress(body, encoding, best=True)
+                if len(variant) <= len(body) * (1 - MIN_SAVING):
+                    path.with_name(path.name + suffix).write_bytes(variant)
+                    smallest = min(smallest, len(variant))
+        compressed_total += smallest
+    return original_total, compressed_total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompress a static build directory.")
+    parser.add_argument("directory", nargs="?", default="static/build")
+    args = parser.parse_args()
+    original, compressed = precompress_directory(args.directory)
+    print(
+        f"Precompressed {args.directory}: {original / 1024:.0f} KiB -> {compressed / 1024:.0f} KiB"
+        f" ({', '.join(available_encodings())})"
+    )
@@ -0,0 +1,117 @@
+"""
+Cold-start benchmark for the Vercel/Mangum entry point.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 5] [--backend simulated] [--json]
+
+Each run starts a fresh interpreter, imports ``api.index`` and invokes its
+``handler`` with API Gateway (v2) events, reporting the import time, the first
+response (lifespan startup included, as on a cold serverless instance) and the
+first quote generation, which is where the backend SDK is loaded.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Runs in the fresh interpreter; prints one JSON line of timings in milliseconds
+CHILD = r"""
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from api.index import handler
+imported = time.perf_counter()
+
+
+def event(method, path, body=None):
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "localhost", "content-type": "application/json"},
+        "requestContext": {
+            "http": {"method": method, "path": path, "sourceIp": "127.0.0.1"},
+            "stage": "$default",
+        },
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def invoke(method, path, body=None):
+    t = time.perf_counter()
+    response = handler(event(method, path, body), None)
+    return (time.perf_counter() - t) * 1000, response["statusCode"]
+
+
+sdk_after_import = "google.generativeai" in sys.modules
+health_ms, health_status = invoke("GET", "/health")
+quote_ms, quote_status = invoke("POST", "/api/quotes/generate", {"category": "wisdom"})
+second_quote_ms, _ = invoke("POST", "/api/quotes/generate", {"category": "love"})
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": health_ms,
+    "first_quote_ms": quote_ms,
+    "warm_quote_ms": second_quote_ms,
+    "statuses": [health_status, quote_status],
+    "sdk_loaded_at_import": sdk_after_import,
+}))
+"""
+
+
+def run_once(env: dict[str, str]) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--backend", default="simulated", help="AI_BACKEND for the runs")
+    parser.add_argument("--warmup", action="store_true", help="Set AI_WARMUP=true")
+    parser.add_argument("--json", action="store_true", help="Print the raw runs as JSON")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "AI_BACKEND": args.backend,
+        "AI_WARMUP": str(args.warmup).lower(),
+        "SIM_LATENCY_MS": os.environ.get("SIM_LATENCY_MS", "0"),
+        "SIM_LATENCY_JITTER_MS": os.environ.get("SIM_LATENCY_JITTER_MS", "0"),
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    runs = [run_once(env) for _ in range(args.runs)]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return
+
+    for key in ("import_ms", "first_response_ms", "first_quote_ms", "warm_quote_ms"):
+        values = [run[key] for run in runs]
+        print(
+            f"{key:<18} median {statistics.median(values):8.1f} ms"
+            f"   min {min(values):8.1f}   max {max(values):8.1f}"
+        )
+    print(f"statuses           {runs[-1]['statuses']}")
+    print(f"SDK loaded at import: {runs[-1]['sdk_loaded_at_import']}")
+
+
+if __name__ == "__main__":
+    main()
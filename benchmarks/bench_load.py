@@ -0,0 +1,394 @@
+"""
+Load and latency benchmark for the quote API.
+
+Usage:
+    python benchmarks/bench_load.py [--transport asgi|socket] [--concurrency 32]
+        [--duration 10] [--mix generate=4,generate_topic=2,random=3,categories=1,static=1]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+        [--min-delta-ms 1.0]
+
+Drives ``app.main:app`` against the simulated backend, either in-process
+through an ASGI transport or over a real socket served by uvicorn in a child
+process. ``concurrency`` clients send requests back to back, each picking a
+scenario from the weighted mix, for ``duration`` seconds after a warmup.
+Throughput and p50/p95/p99 latency are reported per scenario and overall.
+
+Results can be saved as JSON and compared with a baseline saved the same
+way; the exit status is 1 when a compared metric regressed by more than
+``threshold`` (0.2 = 20%). Baselines are machine-specific: record one with
+``make bench-baseline`` on the machine that runs ``make bench``.
+
+Settings such as ``SIM_LATENCY_MS`` can be overridden through the
+environment; ``--sim-latency-ms 0`` turns the backend into an instant mock
+so that only the API's own overhead is measured.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+CATEGORIES = ["motivation", "inspiration", "wisdom", "humor", "love", "success", "life"]
+TOPICS = ["courage", "patience", "the sea", "friendship", "change", "time", "home", "failure"]
+DEFAULT_MIX = "generate=4,generate_topic=2,random=3,categories=1,static=1"
+
+# Metrics compared with the baseline, and whether higher values are better
+COMPARED = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+# Request = (method, path, JSON body or None, extra headers)
+Request = tuple[str, str, dict | None, dict[str, str]]
+
+
+def _static_paths() -> list[str]:
+    """Index page plus the JS/CSS bundles listed in the React build manifest."""
+    manifest = ROOT / "static" / "build" / "asset-manifest.json"
+    if not manifest.exists():
+        return []
+    files = json.loads(manifest.read_text())["files"].values()
+    return ["/", *(path for path in files if path.endswith((".js", ".css")))]
+
+
+def _scenarios(rng: random.Random) -> dict[str, Callable[[], Request]]:
+    static_paths = _static_paths()
+    scenarios = {
+        "generate": lambda: (
+            "POST",
+            "/api/quotes/generate",
+            {"category": rng.choice(CATEGORIES), "language": rng.choice(["en", "ar"])},
+            {},
+        ),
+        "generate_topic": lambda: (
+            "POST",
+            "/api/quotes/generate",
+            {"category": rng.choice(CATEGORIES), "topic": rng.choice(TOPICS)},
+            {},
+        ),
+        "random": lambda: ("GET", "/api/quotes/random", None, {}),
+        "categories": lambda: ("GET", "/api/quotes/categories", None, {}),
+    }
+    if static_paths:
+        scenarios["static"] = lambda: (
+            "GET",
+            rng.choice(static_paths),
+            None,
+            {"accept-encoding": "br, gzip"},
+        )
+    return scenarios
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parse ``name=weight,...`` into scenario weights."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def bench_environment(args: argparse.Namespace, workdir: str) -> dict[str, str]:
+    """Settings for the app under test; values already in the environment win."""
+    defaults = {
+        "AI_BACKEND": "simulated",
+        "SIM_LATENCY_MS": str(args.sim_latency_ms),
+        "SIM_LATENCY_JITTER_MS": str(args.sim_latency_ms / 4),
+        "SIM_SEED": str(args.seed),
+        "LOG_LEVEL": "WARNING",
+        "DEBUG": "false",
+        # Measure the API, not the quota guards
+        "RATE_LIMIT_ENABLED": "false",
+        "ADMISSION_RATE_PER_MINUTE": "0",
+        # Keep runtime files out of the working tree
+        "LIBRARY_DIR": str(Path(workdir) / "library"),
+        "HISTORY_DB_PATH": str(Path(workdir) / "history.sqlite3"),
+        "POOL_DB_PATH": str(Path(workdir) / "pool.sqlite3"),
+        "RATE_LIMIT_DB_PATH": str(Path(workdir) / "rate_limits.sqlite3"),
+    }
+    return {**defaults, **os.environ}
+
+
+@contextlib.asynccontextmanager
+async def asgi_client(env: dict[str, str]) -> AsyncIterator[httpx.AsyncClient]:
+    """Client calling the app in this process, with its lifespan running."""
+    os.environ.update(env)
+    from app.main import app
+
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        ) as client,
+    ):
+        yield client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def socket_client(
+    env: dict[str, str], concurrency: int, workers: int
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Client calling uvicorn over TCP, started in a child process for the run."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                with contextlib.suppress(httpx.TransportError):
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become healthy within 30s")
+                await asyncio.sleep(0.1)
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, float]:
+    """Throughput and latency percentiles (ms) of one scenario."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput_rps": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(values) / count if count else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    weights: dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict[str, dict[str, float]]:
+    """Run the mix with ``concurrency`` closed-loop clients and summarize per scenario."""
+    rng = random.Random(seed)
+    scenarios = _scenarios(rng)
+    unknown = set(weights) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown or unavailable scenarios: {sorted(unknown)}")
+    names = list(weights)
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors = dict.fromkeys(names, 0)
+
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker() -> None:
+        while (now := time.perf_counter()) < stop_at:
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            method, path, body, headers = scenarios[name]()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            finished = time.perf_counter()
+            if now >= measure_from:
+                latencies[name].append((finished - now) * 1000)
+                errors[name] += failed
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+
+    results = {name: summarize(latencies[name], errors[name], elapsed) for name in names}
+    results["overall"] = summarize(
+        [value for name in names for value in latencies[name]], sum(errors.values()), elapsed
+    )
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+    min_delta_ms: float = 1.0,
+) -> list[str]:
+    """
+    Describe every compared metric that is worse than the baseline by more than ``threshold``.
+
+    Latency changes under ``min_delta_ms`` are ignored: sub-millisecond
+    routes would otherwise flag scheduling noise as large relative changes.
+    """
+    regressions = []
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric.endswith("_ms") and new - old < min_delta_ms:
+                continue
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{scenario}.{metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+        if current["error_rate"] > previous.get("error_rate", 0.0) + 0.01:
+            regressions.append(
+                f"{scenario}.error_rate: {previous.get('error_rate', 0.0):.1%} -> "
+                f"{current['error_rate']:.1%}"
+            )
+    return regressions
+
+
+def print_table(results: dict[str, dict[str, float]]) -> None:
+    print(
+        f"{'scenario':<16}{'requests':>9}{'errors':>8}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:<16}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>10.1f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+        )
+
+
+async def run(args: argparse.Namespace) -> int:
+    weights = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory(prefix="swan-bench-") as workdir:
+        env = bench_environment(args, workdir)
+        if args.transport == "asgi":
+            client_context = asgi_client(env)
+        else:
+            client_context = socket_client(env, args.concurrency, args.workers)
+        async with client_context as client:
+            results = await run_load(
+                client, weights, args.concurrency, args.duration, args.warmup, args.seed
+            )
+
+    print(
+        f"{args.transport} transport, concurrency {args.concurrency}, {args.duration:.0f}s, "
+        f"simulated latency {env['SIM_LATENCY_MS']} ms"
+    )
+    print_table(results)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "transport": args.transport,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "workers": args.workers if args.transport == "socket" else 1,
+            "mix": weights,
+            "sim_latency_ms": float(env["SIM_LATENCY_MS"]),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"results saved to {args.output}")
+
+    if not args.baseline:
+        return 0
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}; record one with --output {baseline_path}")
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    if (
+        baseline["meta"].get("transport") != args.transport
+        or baseline["meta"].get("concurrency") != args.concurrency
+    ):
+        print("warning: baseline was recorded with a different transport or concurrency")
+    regressions = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"regressions beyond {args.threshold:.0%} against {baseline_path}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"no regressions beyond {args.threshold:.0%} against {baseline_path}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--transport", choices=["asgi", "socket"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, name=weight,...")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (socket only)")
+    parser.add_argument("--sim-latency-ms", type=float, default=50.0, help="Backend latency")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the mix and the backend")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with results saved by an earlier run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)"
+    )
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=1.0, help="Ignore smaller latency changes"
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for the model output post-processing pipeline.
+
+Usage:
+    python benchmarks/bench_postprocess.py [--number 20000]
+
+Reports the per-quote cost of cleaning whole answers, a batch of answers and
+a streamed answer split into small chunks.
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.api.utils.postprocess import quote_postprocessor
+
+
+SAMPLES = [
+    "Perseverance turns dreams into reality with every bold step.",
+    'Here is your quote: "Courage is the quiet voice at the end of the day."',
+    '"Life is short; make your days wide instead of long." — Unknown',
+    "**Arabic:** الحــب لحن يدفئ كل القلوب.\n**English Translation:** Love warms every heart.",
+    "‏الحكمة أن تعرف حدود معرفتك.‏",
+    "As an AI, **Dreams** soar like stars guiding you through darkness.",
+]
+
+
+def _chunks(text: str, size: int = 8) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _stream(chunks: list[str]) -> str:
+    cleaner = quote_postprocessor.stream()
+    return "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.finish()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per case")
+    args = parser.parse_args()
+
+    chunked = [_chunks(text) for text in SAMPLES]
+    cases = {
+        "process": lambda: [quote_postprocessor.process(text) for text in SAMPLES],
+        "process_many": lambda: quote_postprocessor.process_many(SAMPLES),
+        "stream (8-char chunks)": lambda: [_stream(chunks) for chunks in chunked],
+    }
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=args.number // len(SAMPLES), repeat=3))
+        per_quote = seconds / (args.number // len(SAMPLES) * len(SAMPLES)) * 1e6
+        print(f"{name:<24} {per_quote:7.2f} µs/quote")
+
+
+if __name__ == "__main__":
+    main()
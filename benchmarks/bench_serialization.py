@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for quote response serialization.
+
+Usage:
+    python benchmarks/bench_serialization.py [--number 20000]
+
+Compares FastAPI's default path (response_model re-validation, jsonable
+encoding, json.dumps) with the fast path (ModelJSONResponse) for a single
+quote, a 10-quote batch and the category list, and checks that both produce
+the same bytes.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.api.models import BatchQuoteResponse, QuoteCategory, QuoteResponse
+from app.api.routes.quote_routes import CATEGORIES_JSON
+from app.api.utils.serialization import ModelJSONResponse, orjson
+from app.main import app
+
+
+QUOTE = QuoteResponse(
+    quote="الحكمة أن تعرف حدود معرفتك، والشجاعة أن تتجاوزها بخطوة.",
+    category="wisdom",
+    timestamp="2025-10-27T18:30:00Z",
+    source="cache",
+)
+BATCH = BatchQuoteResponse(quotes=[QUOTE] * 10, count=10)
+
+
+def _response_field(path: str):
+    return next(route.response_field for route in app.routes if getattr(route, "path", "") == path)
+
+
+async def _default_path(field, content) -> bytes:
+    value = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(value).body
+
+
+async def _fast_path(field, content) -> bytes:
+    return ModelJSONResponse(content).body
+
+
+async def _time(func, field, content, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        await func(field, content)
+    return (time.perf_counter() - started) / number * 1e6
+
+
+async def run(number: int) -> None:
+    categories = [category.value for category in QuoteCategory]
+    cases = {
+        "quote": (_response_field("/api/quotes/random"), QUOTE),
+        "batch of 10": (_response_field("/api/quotes/batch"), BATCH),
+        "categories": (_response_field("/api/quotes/categories"), categories),
+    }
+    print(f"encoder for plain data: {'orjson' if orjson is not None else 'json'}")
+    for name, (field, content) in cases.items():
+        fast_content = CATEGORIES_JSON if name == "categories" else content
+        default_body = await _default_path(field, content)
+        fast_body = await _fast_path(field, fast_content)
+        assert default_body == fast_body, f"{name}: fast path output differs"
+
+        default_us = await _time(_default_path, field, content, number)
+        fast_us = await _time(_fast_path, field, fast_content, number)
+        print(
+            f"{name:<12} default {default_us:7.2f} µs   fast {fast_us:7.2f} µs"
+            f"   ({default_us / fast_us:4.1f}x)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per case")
+    args = parser.parse_args()
+    asyncio.run(run(args.number))
+
+
+if __name__ == "__main__":
+    main()
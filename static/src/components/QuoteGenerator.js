@@ -33,10 +33,12 @@ const QuoteGenerator = () => {
         requestBody.style = style.trim();
       }
 
-      const response = await fetch('/api/quotes/generate', {
+      // Stream the quote so text appears as soon as the first words are ready
+      const response = await fetch('/api/quotes/generate/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
         },
         body: JSON.stringify(requestBody),
       });
@@ -46,10 +48,40 @@ const QuoteGenerator = () => {
         throw new Error(errorData.detail || `HTTP ${response.status}`);
       }
 
-      const data = await response.json();
-      setQuote(data.quote);
-      setAuthor(data.author || 'Swan');
-      setQuoteCount(prev => prev + 1);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streamedText = '';
+      setQuote('');
+      setAuthor('Swan');
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-sent events are separated by a blank line
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          const lines = rawEvent.split('\n');
+          const eventType = (lines.find(line => line.startsWith('event: ')) || '').slice(7);
+          const dataLine = lines.find(line => line.startsWith('data: '));
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine.slice(6));
+
+          if (eventType === 'chunk') {
+            streamedText += data.text;
+            setQuote(streamedText);
+          } else if (eventType === 'done') {
+            setQuote(data.quote);
+            setAuthor(data.author || 'Swan');
+            setQuoteCount(prev => prev + 1);
+          } else if (eventType === 'error') {
+            throw new Error(data.detail || `HTTP ${data.status}`);
+          }
+        }
+      }
     } catch (error) {
       console.error('Error generating quote:', error);
       setQuote('Failed to generate quote.');
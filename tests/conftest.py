@@ -0,0 +1,81 @@
+"""
+Shared fixtures: settings isolated from the developer's environment and an
+offline generation backend with predictable output.
+"""
+
+import asyncio
+import random
+import string
+
+import pytest
+
+from app.api.utils import BaseAIClient
+from app.config import settings
+
+
+class FakeAIClient(BaseAIClient):
+    """
+    Backend returning a fresh, unrelated sentence per call and counting calls.
+
+    ``delay`` emulates model latency; exceptions put in ``errors`` are raised
+    by the next calls, one each, before falling back to sentences.
+    """
+
+    name = "fake"
+
+    def __init__(self, seed: int = 0, delay: float = 0.0):
+        self.random = random.Random(seed)
+        self.delay = delay
+        self.errors: list[Exception] = []
+        self.calls = 0
+
+    def sentence(self) -> str:
+        words = ("".join(self.random.choices(string.ascii_lowercase, k=6)) for _ in range(8))
+        return " ".join(words).capitalize() + "."
+
+    async def generate_quote(self, prompt, max_tokens=None, temperature=None, tier=None) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        if "different" in prompt:
+            # Batch prompt: "Create N different ..." answered as a numbered list
+            count = int(prompt.split("Create ", 1)[1].split(" ", 1)[0])
+            return "\n".join(f"{i}. {self.sentence()}" for i in range(1, count + 1))
+        return self.sentence()
+
+
+@pytest.fixture
+def offline_settings(monkeypatch, tmp_path):
+    """
+    Settings for tests that build a QuoteController: no network, no shared
+    files, and none of the background or quota machinery unless a test turns
+    it back on. Tests may change any setting on the returned object; every
+    field is restored afterwards.
+    """
+    for name in type(settings).model_fields:
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    overrides = {
+        "ai_backend": "simulated",
+        "ai_warmup": False,
+        "sim_latency_ms": 0.0,
+        "pool_enabled": False,
+        "single_flight_enabled": False,
+        "admission_enabled": False,
+        "hedge_enabled": False,
+        "library_enabled": False,
+        "library_dir": str(tmp_path / "library"),
+        "history_enabled": False,
+        "history_db_path": str(tmp_path / "history.sqlite3"),
+        "pool_db_path": str(tmp_path / "pool.sqlite3"),
+        "metrics_dir": None,
+    }
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    return settings
+
+
+@pytest.fixture
+def fake_client():
+    return FakeAIClient()
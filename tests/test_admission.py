@@ -0,0 +1,138 @@
+"""
+Tests for admission control of model calls: priorities, fast rejection and
+the AIMD concurrency limit.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.utils.admission import AdmissionController, AdmissionRejected, Priority, TokenBucket
+
+
+def _controller(
+    rate_per_minute: float = 0,
+    burst: float | None = None,
+    min_concurrency: int = 1,
+    max_concurrency: int = 1,
+    max_queue: int = 10,
+    max_wait: float = 1.0,
+    latency_target: float = 1.0,
+) -> AdmissionController:
+    return AdmissionController(
+        rate_per_minute=rate_per_minute,
+        burst=burst,
+        min_concurrency=min_concurrency,
+        max_concurrency=max_concurrency,
+        max_queue=max_queue,
+        max_wait=max_wait,
+        latency_target=latency_target,
+    )
+
+
+async def _call(admission: AdmissionController, priority: Priority, order: list[str], name: str):
+    async with admission.slot(priority):
+        order.append(name)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate_per_second=1, burst=2)
+    assert bucket.try_take() and bucket.try_take()
+    assert not bucket.try_take()
+    assert 0 < bucket.time_until() <= 1
+    assert TokenBucket(rate_per_second=0, burst=1).try_take()
+
+
+async def test_queued_calls_are_admitted_by_priority():
+    admission, order = _controller(), []
+    await admission.acquire()
+    waiters = [
+        asyncio.create_task(_call(admission, Priority.BACKGROUND, order, "background")),
+        asyncio.create_task(_call(admission, Priority.BATCH, order, "batch")),
+        asyncio.create_task(_call(admission, Priority.INTERACTIVE, order, "interactive")),
+    ]
+    await asyncio.sleep(0)
+    assert admission.stats()["queued"] == 3
+
+    admission.release(0.01)
+    await asyncio.gather(*waiters)
+    assert order == ["interactive", "batch", "background"]
+    assert admission.stats()["in_flight"] == 0
+
+
+async def test_full_queue_preempts_lower_priority_work():
+    admission = _controller(max_queue=1)
+    await admission.acquire()
+    background = asyncio.create_task(admission.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+
+    interactive = asyncio.create_task(admission.acquire(Priority.INTERACTIVE))
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await background
+    assert exc_info.value.status_code == 503
+    assert admission.preempted == 1
+
+    # A call of the same priority as the queued one is turned away
+    with pytest.raises(AdmissionRejected):
+        await admission.acquire(Priority.INTERACTIVE)
+    admission.release(0.01)
+    await interactive
+
+
+async def test_quota_that_cannot_serve_in_time_is_rejected_with_429():
+    admission = _controller(rate_per_minute=6, burst=1, max_wait=0.5)
+    await admission.acquire()
+    admission.release(0.01)
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await admission.acquire()
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+
+async def test_queued_background_work_does_not_get_interactive_calls_rejected():
+    # One token per 0.1s: the queued refills would take the next two tokens
+    admission = _controller(rate_per_minute=600, burst=1, max_concurrency=10, max_wait=0.25)
+    await admission.acquire()
+    order: list[str] = []
+    refills = [
+        asyncio.create_task(_call(admission, Priority.BACKGROUND, order, f"refill {i}"))
+        for i in range(2)
+    ]
+    await asyncio.sleep(0)
+
+    await _call(admission, Priority.INTERACTIVE, order, "interactive")
+    assert order == ["interactive"]
+    await asyncio.gather(*refills, return_exceptions=True)
+    assert admission.stats()["rejected"] == 0
+
+
+async def test_waiters_time_out_with_503():
+    admission = _controller(max_wait=0.02)
+    await admission.acquire()
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await admission.acquire()
+    assert exc_info.value.status_code == 503
+    assert admission.timed_out == 1
+    assert admission.stats()["queued"] == 0
+
+
+async def test_limit_is_cut_on_slow_calls_and_429s_and_grows_back():
+    admission = _controller(min_concurrency=1, max_concurrency=8, latency_target=0.05)
+    await admission.acquire()
+    admission.release(latency=1.0)
+    assert admission.limit == 4
+
+    for _ in range(20):
+        await admission.acquire()
+        admission.release(latency=0.001)
+    grown = admission.limit
+    assert grown > 4
+
+    await asyncio.sleep(0.06)  # One decrease per latency target
+    with pytest.raises(HTTPException):
+        async with admission.slot():
+            raise HTTPException(429)
+    assert admission.limit == max(1, grown / 2)
+    assert admission.bucket.tokens == 0
+    assert admission.stats()["overloads"] == 1
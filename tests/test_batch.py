@@ -0,0 +1,67 @@
+"""
+Tests for batch generation: compatible requests share one multi-quote call.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import BatchQuoteRequest, QuoteCategory, QuoteRequest
+from app.api.routes import quote_routes
+
+
+@pytest.fixture
+def controller(offline_settings, fake_client) -> QuoteController:
+    offline_settings.cache_enabled = False
+    offline_settings.retry_max_attempts = 1
+    offline_settings.batch_group_size = 4
+    return QuoteController(ai_client=fake_client)
+
+
+async def test_count_is_split_into_grouped_calls(controller, fake_client):
+    batch = BatchQuoteRequest(count=6, template=QuoteRequest(category=QuoteCategory.LOVE))
+    response = await controller.generate_batch(batch)
+
+    assert response.count == 6
+    assert len({quote.quote for quote in response.quotes}) == 6
+    assert {quote.category for quote in response.quotes} == {"love"}
+    assert fake_client.calls == 2  # Groups of 4 and 2
+
+
+async def test_different_requests_keep_their_order(controller, fake_client):
+    categories = [QuoteCategory.LOVE, QuoteCategory.LIFE, QuoteCategory.LOVE]
+    batch = BatchQuoteRequest(requests=[QuoteRequest(category=c) for c in categories])
+    response = await controller.generate_batch(batch)
+
+    assert [quote.category for quote in response.quotes] == ["love", "life", "love"]
+    assert fake_client.calls == 2  # One grouped call for love, one single call for life
+
+
+async def test_failed_grouped_call_falls_back_to_single_calls(controller, fake_client):
+    fake_client.errors = [ConnectionError("upstream down")]
+    batch = BatchQuoteRequest(count=3, template=QuoteRequest(category=QuoteCategory.WISDOM))
+    response = await controller.generate_batch(batch)
+
+    assert [quote.source for quote in response.quotes] == ["model"] * 3
+    assert fake_client.calls == 4
+
+
+def test_batch_request_validation():
+    with pytest.raises(ValueError):
+        BatchQuoteRequest()
+    with pytest.raises(ValueError):
+        BatchQuoteRequest(count=2, requests=[QuoteRequest()])
+    assert len(BatchQuoteRequest(count=3).expand()) == 3
+
+
+def test_batch_endpoint(controller, offline_settings, monkeypatch):
+    offline_settings.rate_limit_enabled = False
+    monkeypatch.setattr(quote_routes, "_controller", controller)
+    app = FastAPI()
+    app.include_router(quote_routes.router)
+    client = TestClient(app)
+    response = client.post("/api/quotes/batch", json={"count": 2, "template": {"category": "life"}})
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    assert client.post("/api/quotes/batch", json={"count": 51}).status_code == 422
@@ -0,0 +1,74 @@
+"""
+Tests for the load benchmark's statistics and baseline comparison.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+
+PATH = Path(__file__).resolve().parents[1] / "benchmarks" / "bench_load.py"
+spec = importlib.util.spec_from_file_location("bench_load", PATH)
+bench_load = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_load)
+
+
+def test_parse_mix():
+    assert bench_load.parse_mix("generate=4, random") == {"generate": 4.0, "random": 1.0}
+
+
+def test_percentiles_use_the_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert bench_load.percentile(values, 50) == 50
+    assert bench_load.percentile(values, 99) == 99
+    assert bench_load.percentile([], 95) == 0.0
+
+    summary = bench_load.summarize([30.0, 10.0, 20.0, 40.0], errors=1, elapsed=2.0)
+    assert summary["throughput_rps"] == 2.0
+    assert summary["error_rate"] == 0.25
+    assert summary["p50_ms"] == 20.0
+    assert summary["max_ms"] == 40.0
+
+
+def _result(**overrides) -> dict[str, float]:
+    base = {"throughput_rps": 100.0, "p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0}
+    return {**base, "error_rate": 0.0, **overrides}
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"random": _result(), "categories": _result(p95_ms=0.2)}
+    results = {
+        "random": _result(throughput_rps=70.0, p99_ms=40.0, error_rate=0.05),
+        "categories": _result(p95_ms=0.5),  # +150%, but within min_delta_ms
+        "static": _result(p50_ms=99.0),  # Not in the baseline
+    }
+    regressions = bench_load.compare(results, baseline, threshold=0.2, min_delta_ms=1.0)
+    assert [line.split(":")[0] for line in regressions] == [
+        "random.throughput_rps",
+        "random.p99_ms",
+        "random.error_rate",
+    ]
+    assert bench_load.compare(baseline, baseline, threshold=0.2) == []
+
+
+async def test_run_load_summarizes_each_scenario():
+    app = FastAPI()
+
+    @app.get("/api/quotes/categories")
+    async def categories():
+        return ["life"]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = await bench_load.run_load(
+            client, {"categories": 1.0}, concurrency=2, duration=0.05, warmup=0.0, seed=0
+        )
+    assert results["categories"]["requests"] > 0
+    assert results["categories"]["errors"] == 0
+    assert results["overall"]["requests"] == results["categories"]["requests"]
+
+    with pytest.raises(SystemExit):
+        await bench_load.run_load(client, {"unknown": 1.0}, 1, 0.01, 0.0, 0)
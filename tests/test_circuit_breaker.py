@@ -0,0 +1,103 @@
+"""
+Tests for the circuit breaker, the fallback corpus and their place in the
+model call path.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import QuoteCategory, QuoteRequest
+from app.api.utils import CircuitBreaker, CircuitOpenError, CircuitState, FallbackCorpus
+
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        window=4,
+        min_calls=2,
+        failure_rate=0.5,
+        slow_call_rate=0.5,
+        slow_call_seconds=1.0,
+        open_seconds=0.05,
+        half_open_probes=1,
+    )
+
+
+async def _call(breaker: CircuitBreaker, error: BaseException | None = None) -> None:
+    async with breaker.guard():
+        if error is not None:
+            raise error
+
+
+async def test_opens_on_failures_then_recovers_through_a_probe():
+    breaker = _breaker()
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await _call(breaker, HTTPException(503))
+    assert breaker.state is CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        await _call(breaker)
+    assert exc_info.value.status_code == 503
+    assert "Retry-After" in exc_info.value.headers
+
+    await asyncio.sleep(0.06)
+    await _call(breaker)  # The half-open probe succeeds
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_failed_probe_reopens():
+    breaker = _breaker()
+    breaker.record(failed=True, latency=0.0)
+    breaker.record(failed=True, latency=0.0)
+    await asyncio.sleep(0.06)
+    with pytest.raises(TimeoutError):
+        await _call(breaker, TimeoutError())
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.opened == 2
+
+
+async def test_opens_on_slow_calls():
+    breaker = _breaker()
+    breaker.record(failed=False, latency=2.0)
+    breaker.record(failed=False, latency=2.0)
+    assert breaker.state is CircuitState.OPEN
+
+
+async def test_invalid_requests_and_cancellations_do_not_count():
+    breaker = _breaker()
+    for error in (HTTPException(400), asyncio.CancelledError(), HTTPException(400)):
+        with pytest.raises(type(error)):
+            await _call(breaker, error)
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.stats()["recent_calls"] == 0
+
+
+def test_fallback_corpus_covers_every_category_and_language():
+    corpus = FallbackCorpus()
+    for category in QuoteCategory:
+        for language in ("en", "ar"):
+            assert corpus.pick(category.value, language)
+
+
+async def test_queue_wait_is_not_counted_as_a_slow_call(offline_settings, fake_client):
+    offline_settings.cache_enabled = False
+    offline_settings.admission_enabled = True
+    offline_settings.admission_rate_per_minute = 0
+    offline_settings.admission_min_concurrency = 1
+    offline_settings.admission_max_concurrency = 1
+    offline_settings.circuit_min_calls = 2
+    offline_settings.circuit_slow_call_rate = 0.5
+    offline_settings.circuit_slow_call_ms = 60
+    fake_client.delay = 0.02
+    controller = QuoteController(ai_client=fake_client)
+
+    # One call at a time: the last callers wait ~4x the model latency for admission
+    responses = await asyncio.gather(
+        *(controller.generate_quote(QuoteRequest(category=QuoteCategory.LIFE)) for _ in range(6))
+    )
+
+    assert [response.source for response in responses] == ["model"] * 6
+    assert controller.breaker.state is CircuitState.CLOSED
@@ -0,0 +1,60 @@
+"""
+Cold-start regression tests for the serverless entry point.
+
+The import budget is read from ``COLD_START_BUDGET_MS`` (default 1000 ms);
+set it to what your CI machines achieve with some headroom.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", "1000"))
+RUNS = 3
+
+# Heavy modules that must not load before the first generation
+DEFERRED_MODULES = ("google.generativeai", "google.api_core", "grpc")
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import api.index
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{
+    "import_ms": elapsed,
+    "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _probe() -> dict:
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "AI_BACKEND": "gemini", "AI_WARMUP": "false"}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.slow
+def test_entry_point_defers_sdk_imports():
+    assert _probe()["loaded"] == []
+
+
+@pytest.mark.slow
+def test_entry_point_import_within_budget():
+    # Best of a few fresh interpreters, to ignore a cold disk cache or a busy machine
+    best = min(_probe()["import_ms"] for _ in range(RUNS))
+    assert best <= BUDGET_MS, (
+        f"Importing api.index took {best:.0f}ms, over the {BUDGET_MS:.0f}ms cold-start budget"
+    )
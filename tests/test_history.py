@@ -0,0 +1,92 @@
+"""
+Tests for the persistent quote history: batched writes and cursor paging.
+"""
+
+import pytest
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import QuoteCategory, QuoteRequest
+from app.api.utils.history import HistoryRecord, QuoteHistory, decode_cursor, encode_cursor
+
+
+def _entry(i: int, category: str = "wisdom", language: str = "en") -> HistoryRecord:
+    return HistoryRecord(
+        created_at=f"2025-01-01T00:00:{i:02d}Z",
+        quote=f"quote {i}",
+        category=category,
+        language=language,
+        length="medium",
+        topic=None,
+        style=None,
+        temperature=None,
+        max_tokens=None,
+        source="model",
+        prompt="fingerprint",
+        latency_ms=12.5,
+        prompt_tokens=10,
+        completion_tokens=20,
+    )
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = QuoteHistory(str(tmp_path / "history.sqlite3"), batch_size=4, flush_interval=0.01)
+    yield history
+    history.close()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor!")
+
+
+def test_pages_are_newest_first_and_cover_every_entry_once(history):
+    for i in range(10):
+        history.record(_entry(i))
+    assert history.flush()
+    assert history.stats()["written"] == 10
+
+    quotes, cursor = [], None
+    while True:
+        entries, cursor = history.page(limit=3, cursor=cursor)
+        quotes += [entry["quote"] for entry in entries]
+        if cursor is None:
+            break
+    assert quotes == [f"quote {i}" for i in reversed(range(10))]
+
+
+def test_pages_filter_by_category_and_language(history):
+    for i in range(6):
+        history.record(
+            _entry(i, category=("wisdom", "life")[i % 2], language=("en", "ar")[i % 3 == 0])
+        )
+    history.flush()
+
+    entries, cursor = history.page(limit=10, category="life")
+    assert [entry["quote"] for entry in entries] == ["quote 5", "quote 3", "quote 1"]
+    assert cursor is None
+    entries, _ = history.page(limit=10, category="wisdom", language="ar")
+    assert [entry["quote"] for entry in entries] == ["quote 0"]
+    assert entries[0]["completion_tokens"] == 20
+
+
+def test_full_queue_drops_entries_instead_of_blocking(tmp_path):
+    history = QuoteHistory(str(tmp_path / "history.sqlite3"), queue_size=1)
+    history._writer = object()  # Stand-in writer that never drains the queue
+    history.record(_entry(0))
+    history.record(_entry(1))
+    assert history.stats()["dropped"] == 1
+
+
+async def test_served_quotes_are_recorded(offline_settings, fake_client):
+    offline_settings.history_enabled = True
+    offline_settings.history_flush_interval_seconds = 0.01
+    controller = QuoteController(ai_client=fake_client)
+    response = await controller.generate_quote(QuoteRequest(category=QuoteCategory.LIFE))
+    await controller.stop()
+
+    entries, _ = controller.history.page(limit=5)
+    assert [entry["quote"] for entry in entries] == [response.quote]
+    assert entries[0]["category"] == "life"
+    assert entries[0]["source"] == "model"
@@ -0,0 +1,80 @@
+"""
+Tests for quote ETags, conditional requests and per-route Cache-Control.
+"""
+
+from datetime import UTC, datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.models import QuoteResponse
+from app.api.routes import quote_routes
+from app.api.utils import HTTPCacheMiddleware
+from app.api.utils.http_cache import etag_matches, merge_vary, weak_etag
+
+
+POLICIES = {"/api/quotes/random": "no-cache", "/api/quotes/categories": "max-age=60"}
+
+
+class FixedController:
+    """Serves the same quote every time, with a fresh timestamp."""
+
+    async def get_random_quote(self) -> QuoteResponse:
+        return QuoteResponse(
+            quote="Small steps carry far.",
+            category="wisdom",
+            timestamp=datetime.now(UTC).isoformat(),
+        )
+
+
+@pytest.fixture
+def client(offline_settings, monkeypatch) -> TestClient:
+    offline_settings.rate_limit_enabled = False
+    monkeypatch.setattr(quote_routes, "_controller", FixedController())
+    app = FastAPI()
+    app.include_router(quote_routes.router)
+    app.add_middleware(HTTPCacheMiddleware, policies=POLICIES)
+    return TestClient(app)
+
+
+def test_etag_helpers():
+    assert weak_etag("a", "b") != weak_etag("ab")
+    assert etag_matches('"x", W/"y"', 'W/"y"')
+    assert etag_matches("*", '"z"')
+    assert not etag_matches('"x"', '"y"')
+    assert merge_vary("Accept, origin", "Origin") == "Accept, origin"
+
+
+@pytest.mark.parametrize("fast_json", [True, False])
+def test_quote_etag_ignores_the_timestamp_and_answers_304(client, offline_settings, fast_json):
+    offline_settings.fast_json_enabled = fast_json
+    first = client.get("/api/quotes/random")
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    assert first.headers["cache-control"] == "no-cache"
+    assert "Origin" in first.headers["vary"]
+
+    second = client.get("/api/quotes/random", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_quote_etag_does_not_depend_on_fast_json(client, offline_settings):
+    offline_settings.fast_json_enabled = True
+    fast = client.get("/api/quotes/random").headers["etag"]
+    offline_settings.fast_json_enabled = False
+    assert client.get("/api/quotes/random").headers["etag"] == fast
+
+
+def test_other_responses_get_a_strong_etag(client):
+    response = client.get("/api/quotes/categories")
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["cache-control"] == "max-age=60"
+    assert (
+        client.get(
+            "/api/quotes/categories", headers={"If-None-Match": response.headers["etag"]}
+        ).status_code
+        == 304
+    )
@@ -0,0 +1,63 @@
+"""
+Tests for queued logging: formatting, per-route sampling and overflow.
+"""
+
+import json
+import logging
+import queue
+
+from app.logging_config import (
+    JSONFormatter,
+    NonBlockingQueueHandler,
+    RouteSamplingFilter,
+    current_route,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def _record(level: int, message: str = "message", **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 1, message, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JSONFormatter().format(_record(logging.INFO, quote_id="q1", route="/api/quotes/random"))
+    payload = json.loads(line)
+    assert payload["level"] == "INFO"
+    assert payload["message"] == "message"
+    assert payload["quote_id"] == "q1"
+    assert payload["route"] == "/api/quotes/random"
+
+
+def test_sampling_keeps_warnings_on_sampled_routes():
+    sampler = RouteSamplingFilter(route_rates={"/busy": 0.0})
+    token = current_route.set("/busy")
+    try:
+        assert not sampler.filter(_record(logging.INFO))
+        assert sampler.filter(_record(logging.WARNING))
+    finally:
+        current_route.reset(token)
+    assert sampler.filter(_record(logging.INFO))  # Outside a request
+    assert sampler.sampled_out == 1
+
+
+def test_full_queue_drops_info_but_writes_warnings_through():
+    overflow = ListHandler()
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1), overflow)
+    handler.handle(_record(logging.INFO, "queued"))
+    handler.handle(_record(logging.INFO, "dropped"))
+    handler.handle(_record(logging.ERROR, "kept"))
+
+    assert handler.dropped == 1
+    assert handler.overflowed == 1
+    assert [record.getMessage() for record in overflow.records] == ["kept"]
+    assert handler.queue.get_nowait().getMessage() == "queued"
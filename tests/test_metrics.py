@@ -0,0 +1,73 @@
+"""
+Tests for the metrics registry and its sharing over worker processes.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from app.api.utils import MetricsRegistry
+
+
+def _registry(directory=None) -> MetricsRegistry:
+    registry = MetricsRegistry(directory, flush_interval=1.0)
+    registry.counter("requests_total", "Requests.", ("route",))
+    registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    return registry
+
+
+def _write_worker(directory, pid: int, value: float, age: float = 0.0):
+    path = directory / f"{pid}.json"
+    path.write_text(json.dumps({"requests_total": [[["/a"], value]]}))
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_renders_prometheus_text():
+    registry = _registry()
+    registry.counter("requests_total", "Requests.", ("route",)).inc("/a")
+    registry.histogram("latency_seconds", "Latency.").observe(0.5)
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+
+
+def test_collectors_add_gauges_and_failures_are_skipped():
+    registry = _registry()
+    registry.add_collector(lambda: [("hit_ratio", "Hits.", {"component": "cache"}, 0.5)])
+    registry.add_collector(lambda: 1 / 0)
+    assert 'hit_ratio{component="cache"} 0.5' in registry.render()
+
+
+async def test_scrape_sums_live_workers_and_drops_stale_ones(tmp_path):
+    registry = _registry(tmp_path)
+    registry.counter("requests_total", "Requests.", ("route",)).inc("/a", amount=1)
+    _write_worker(tmp_path, 1_000_001, 10)
+    # Stale: no longer counted, and deleted because no such process runs
+    stale = _write_worker(tmp_path, 1_000_002, 100, age=10)
+    # Stale but its process is alive (it may just be stuck): skipped, not deleted
+    stuck = _write_worker(tmp_path, os.getppid(), 1000, age=10)
+
+    text = await registry.scrape()
+
+    assert 'requests_total{route="/a"} 11' in text
+    assert not stale.exists()
+    assert stuck.exists()
+
+
+async def test_worker_removes_its_snapshot_on_stop(tmp_path):
+    registry = _registry(tmp_path)
+    await registry.start()
+    await asyncio.sleep(0.05)  # The first snapshot is written right away
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+    await registry.stop()
+    assert list(tmp_path.glob("*.json")) == []
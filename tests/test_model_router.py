@@ -0,0 +1,166 @@
+"""
+Tests for routing Gemini calls over API keys and models, and for the Gemini
+client's failover, using fake service clients instead of the network.
+"""
+
+import pytest
+from fastapi import HTTPException
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.utils import AIClient, ModelRouter, model_tier
+from app.api.utils.model_router import FAST_TIER, LARGE_TIER
+
+
+TIERS = {FAST_TIER: ["flash-8b"], LARGE_TIER: ["flash"]}
+
+
+def _response(*texts: str, prompt_tokens: int = 0) -> glm.GenerateContentResponse:
+    return glm.GenerateContentResponse(
+        candidates=[glm.Candidate(content=glm.Content(parts=[glm.Part(text=t) for t in texts]))],
+        usage_metadata={"prompt_token_count": prompt_tokens},
+    )
+
+
+class FakeService:
+    """Stand-in for GenerativeServiceAsyncClient; raises ``error`` when set."""
+
+    def __init__(self, text: str = "Patience is a quiet strength.", error: Exception | None = None):
+        self.text = text
+        self.error = error
+        self.requests: list[glm.GenerateContentRequest] = []
+
+    async def generate_content(self, request):
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+        return _response(self.text, prompt_tokens=7)
+
+    async def stream_generate_content(self, request):
+        self.requests.append(request)
+
+        async def chunks():
+            if self.error is not None:
+                raise self.error  # Errors of a stream surface on its first read
+            for word in self.text.split(" "):
+                yield _response(word + " ")
+
+        return chunks()
+
+
+def _router(keys=("key-a", "key-b"), **kwargs) -> ModelRouter:
+    return ModelRouter(api_keys=list(keys), tiers=TIERS, **{"rate_per_minute": 60, **kwargs})
+
+
+def _client(router: ModelRouter, services: dict[str, FakeService]) -> AIClient:
+    client = AIClient(router=router)
+    for candidate in router.candidates:
+        candidate.handle = services[candidate.label]
+    return client
+
+
+def test_model_tier():
+    assert model_tier("short", None) == FAST_TIER
+    assert model_tier("long", None) == LARGE_TIER
+    assert model_tier("medium", "poetic") == LARGE_TIER
+
+
+def test_acquire_prefers_the_tier_and_then_the_fastest_candidate():
+    router = _router()
+    first = router.acquire(FAST_TIER)
+    assert first.tier == FAST_TIER
+    router.record(first, 0.5, failed=False)
+    # The unused key is tried before the measured one
+    second = router.acquire(FAST_TIER)
+    assert second.key_index != first.key_index
+    router.record(second, 0.1, failed=False)
+    assert router.acquire(FAST_TIER) is second
+
+
+def test_errors_weigh_on_the_score():
+    router = _router(error_penalty=10)
+    slow, flaky = (c for c in router.candidates if c.tier == FAST_TIER)
+    router.record(slow, 0.3, failed=False)
+    router.record(flaky, 0.1, failed=True)
+    assert router.acquire(FAST_TIER) is slow
+
+
+def test_empty_buckets_move_calls_to_the_other_tier():
+    router = _router(keys=("key-a",), rate_per_minute=0.001, burst=1)
+    assert router.acquire(FAST_TIER).tier == FAST_TIER
+    assert router.acquire(FAST_TIER).tier == LARGE_TIER
+    assert router.acquire(FAST_TIER) is None
+    assert router.stats()["unavailable"] == 1
+
+
+def test_quota_exhaustion_rests_the_candidate():
+    router = _router(keys=("key-a",), cooldown=60)
+    candidate = router.acquire(FAST_TIER)
+    router.record_quota_exhausted(candidate)
+    assert router.acquire(FAST_TIER, exclude=[]).tier == LARGE_TIER
+    assert router.stats()[f"{candidate.label}.cooling"] == 1
+    assert "key-a" not in repr(candidate)
+
+
+async def test_client_fails_over_to_the_next_key_on_quota_errors():
+    router = _router()
+    exhausted = google_exceptions.ResourceExhausted("quota")
+    services = {
+        "flash-8b#0": FakeService(error=exhausted),
+        "flash-8b#1": FakeService(error=exhausted),
+        "flash#0": FakeService(text="From the large model."),
+        "flash#1": FakeService(error=exhausted),
+    }
+    client = _client(router, services)
+
+    assert await client.generate_quote("prompt", tier=FAST_TIER) == "From the large model."
+    assert router.failovers == 2
+    request = services["flash#0"].requests[0]
+    assert request.model == "models/flash"
+    assert request.system_instruction.parts[0].text
+    assert len(request.safety_settings) == 4
+
+
+async def test_client_returns_429_when_every_key_is_exhausted():
+    router = _router(keys=("key-a",))
+    exhausted = google_exceptions.ResourceExhausted("quota")
+    client = _client(router, {c.label: FakeService(error=exhausted) for c in router.candidates})
+    with pytest.raises(HTTPException) as exc_info:
+        await client.generate_quote("prompt", tier=FAST_TIER)
+    assert exc_info.value.status_code == 429
+
+
+async def test_stream_fails_over_before_the_first_delta():
+    router = _router(keys=("key-a",))
+    services = {
+        "flash-8b#0": FakeService(error=google_exceptions.ResourceExhausted("quota")),
+        "flash#0": FakeService(text="Small steps carry far."),
+    }
+    client = _client(router, services)
+    deltas = [delta async for delta in client.stream_quote("prompt", tier=FAST_TIER)]
+    assert "".join(deltas).strip() == "Small steps carry far."
+
+
+async def test_each_key_gets_one_service_client():
+    client = AIClient(router=_router())
+    handles = {c.label: client._client(c) for c in client.router.candidates}
+    assert handles["flash-8b#0"] is handles["flash#0"]
+    assert handles["flash-8b#0"] is not handles["flash-8b#1"]
+
+
+def test_missing_key_is_an_error():
+    with pytest.raises(RuntimeError):
+        AIClient(router=ModelRouter(api_keys=[""], tiers=TIERS))
+
+
+def test_admission_rate_grows_with_the_keys(offline_settings):
+    offline_settings.admission_enabled = True
+    offline_settings.admission_rate_per_minute = 15
+    offline_settings.ai_backend = "gemini"
+    offline_settings.gemini_api_key = "key-a"
+    offline_settings.gemini_api_keys = ["key-b", "key-c", "key-a"]
+    assert QuoteController().admission.bucket.rate == pytest.approx(45 / 60)
+
+    offline_settings.ai_backend = "simulated"
+    assert QuoteController().admission.bucket.rate == pytest.approx(15 / 60)
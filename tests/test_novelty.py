@@ -0,0 +1,62 @@
+"""
+Tests for near-duplicate suppression of served quotes.
+"""
+
+import pytest
+
+from app.api.utils.novelty import NoveltyFilter
+
+
+QUOTE = "The quiet mind finds its way through the storm."
+KEY = ("wisdom", "en")
+
+
+def _filter(**kwargs) -> NoveltyFilter:
+    return NoveltyFilter(**{"threshold": 0.6, "window": 3, "shingle_size": 4, **kwargs})
+
+
+def test_identical_and_near_identical_quotes_are_rejected():
+    novelty = _filter()
+    novelty.remember(KEY, QUOTE)
+    assert not novelty.is_novel(KEY, QUOTE)
+    assert not novelty.is_novel(KEY, '"The quiet mind finds its way through the storm!"')
+    assert not novelty.is_novel(KEY, "The quiet mind finds its way through the storms.")
+    assert novelty.stats()["rejected"] == 3
+
+
+def test_unrelated_quotes_and_other_keys_are_novel():
+    novelty = _filter()
+    novelty.remember(KEY, QUOTE)
+    assert novelty.is_novel(KEY, "Courage grows each time you choose to begin again.")
+    assert novelty.is_novel(("wisdom", "ar"), QUOTE)
+
+
+def test_arabic_near_duplicates_are_rejected():
+    novelty = _filter()
+    key = ("wisdom", "ar")
+    novelty.remember(key, "الصبر مفتاح الفرج، والأمل نور الطريق")
+    assert not novelty.is_novel(key, "الصبر مفتاح الفرج، والأمل نور الطريق.")
+    assert novelty.is_novel(key, "العلم في الصغر كالنقش على الحجر")
+
+
+def test_only_the_last_window_quotes_are_remembered():
+    novelty = _filter(window=2)
+    novelty.remember(KEY, QUOTE)
+    novelty.remember(KEY, "Courage grows each time you choose to begin again.")
+    novelty.remember(KEY, "Kindness is a language every heart understands.")
+    assert novelty.is_novel(KEY, QUOTE)
+    assert not novelty.is_novel(KEY, "Kindness is a language every heart understands.")
+
+
+def test_signatures_estimate_jaccard_similarity():
+    novelty = _filter()
+    same = novelty.signature(QUOTE)
+    assert len(same) == novelty.num_bins
+    assert novelty.similarity(same, novelty.signature(QUOTE.upper())) == 1.0
+    other = novelty.signature("Courage grows each time you choose to begin again.")
+    assert novelty.similarity(same, other) < 0.3
+
+
+def test_bins_must_split_into_bands():
+    with pytest.raises(ValueError):
+        NoveltyFilter(num_bins=30, bands=16)
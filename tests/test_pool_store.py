@@ -0,0 +1,103 @@
+"""
+Tests for the SQLite pool store shared by worker processes.
+"""
+
+import threading
+
+import pytest
+
+from app.api.utils.quote_pool import (
+    MemoryPoolStore,
+    PoolKey,
+    QuotePool,
+    SQLitePoolStore,
+    create_pool_store,
+)
+
+
+KEY = PoolKey("wisdom", "en", "medium", "fingerprint")
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """Two connections to one file, standing in for two workers."""
+    path = str(tmp_path / "pool.sqlite3")
+    first, second = SQLitePoolStore(path, busy_timeout=1.0), SQLitePoolStore(path, busy_timeout=1.0)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_workers_share_one_inventory(stores):
+    first, second = stores
+    assert first.push(KEY, "one", NOW, NOW + 60, capacity=2)
+    assert second.push(KEY, "two", NOW, NOW + 60, capacity=2)
+    assert not first.push(KEY, "three", NOW, NOW + 60, capacity=2)
+
+    assert second.pop(KEY, NOW) == ("one", 1)
+    assert first.pop(KEY, NOW) == ("two", 0)
+    assert second.pop(KEY, NOW) == (None, 0)
+
+
+def test_concurrent_pops_never_hand_out_a_quote_twice(stores):
+    first = stores[0]
+    for i in range(50):
+        first.push(KEY, f"quote {i}", NOW, NOW + 60, capacity=50)
+    served: list[str] = []
+
+    def drain(store: SQLitePoolStore) -> None:
+        while (text := store.pop(KEY, NOW)[0]) is not None:
+            served.append(text)
+
+    threads = [threading.Thread(target=drain, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(served) == sorted(f"quote {i}" for i in range(50))
+
+
+def test_expired_quotes_are_skipped_and_evicted(stores):
+    first, second = stores
+    first.push(KEY, "old", NOW, NOW + 1, capacity=5)
+    first.push(KEY, "fresh", NOW, NOW + 60, capacity=5)
+    assert second.sizes([KEY], NOW + 10) == {KEY: 1}
+    assert second.evict_expired(NOW + 10) == 1
+    assert first.pop(KEY, NOW + 10) == ("fresh", 0)
+
+
+def test_one_worker_holds_the_refill_lease(stores):
+    first, second = stores
+    assert first.acquire_refill_lease("a", NOW, duration=30)
+    assert not second.acquire_refill_lease("b", NOW + 1, duration=30)
+    assert first.acquire_refill_lease("a", NOW + 20, duration=30)  # Renewed
+    assert not second.acquire_refill_lease("b", NOW + 40, duration=30)
+    assert second.acquire_refill_lease("b", NOW + 51, duration=30)  # Expired
+
+
+async def test_only_the_lease_holder_refills(stores):
+    calls = 0
+
+    async def generate(key: PoolKey) -> str:
+        nonlocal calls
+        calls += 1
+        return f"quote {calls}"
+
+    pools = [
+        QuotePool(generate, keys=[KEY], target_size=3, low_watermark=2, store=store)
+        for store in stores
+    ]
+    await pools[0].refill()
+    await pools[1].refill()
+    assert calls == 3
+    assert pools[1].pop(KEY) == "quote 1"
+
+
+def test_create_pool_store(offline_settings):
+    assert isinstance(create_pool_store("memory"), MemoryPoolStore)
+    store = create_pool_store("sqlite")
+    assert isinstance(store, SQLitePoolStore)
+    store.close()
+    with pytest.raises(ValueError):
+        create_pool_store("redis")
@@ -0,0 +1,68 @@
+"""
+Tests for cleaning model output, whole and streamed.
+"""
+
+import pytest
+
+from app.api.utils import QuotePostProcessor
+from app.api.utils.postprocess import default_steps
+
+
+@pytest.fixture
+def processor() -> QuotePostProcessor:
+    return QuotePostProcessor(default_steps(strip_attributions=True, strip_arabic_diacritics=True))
+
+
+def _stream(processor: QuotePostProcessor, text: str, size: int = 3) -> str:
+    stream = processor.stream()
+    deltas = [stream.feed(text[i : i + size]) for i in range(0, len(text), size)]
+    return "".join(deltas) + stream.finish()
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ('Here is your quote: "Courage grows in small steps."', "Courage grows in small steps."),
+        ("**Arabic:** الصبر مفتاح الفرج", "الصبر مفتاح الفرج"),
+        ("Be kind.\n\nEnglish Translation: Be kind.", "Be kind."),
+        ("Be kind. — Rumi", "Be kind."),
+        ("Know thyself. - Marcus Aurelius, Meditations", "Know thyself."),
+        ("Hope endures. ~ Leonardo da Vinci", "Hope endures."),
+        ("Seek. -- Jalal ad-Din Rumi (1207)", "Seek."),
+        ("الصبر مفتاح الفرج. — جلال الدين الرومي", "الصبر مفتاح الفرج."),
+        ("Keep going.  It  matters.", "Keep going. It matters."),
+    ],
+)
+def test_process(processor, raw, expected):
+    assert processor.process(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Love is patient. Love is kind. - it does not envy",
+        "Love is kind. - Love is patient and it does not envy",
+        "Wait a moment. - then speak.",
+    ],
+)
+def test_dash_continuing_the_sentence_is_not_an_attribution(processor, text):
+    assert processor.process(text) == text
+    assert _stream(processor, text) == text
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        'Here is a quote: "Small steps carry far. Keep walking." — Lao Tzu',
+        "Love is patient. Love is kind. - it does not envy",
+        "**English:** Be kind.\nTranslation: كن لطيفا",
+    ],
+)
+@pytest.mark.parametrize("size", [1, 4, 16])
+def test_stream_matches_process(processor, raw, size):
+    assert _stream(processor, raw, size) == processor.process(raw)
+
+
+def test_attributions_are_kept_when_disabled():
+    processor = QuotePostProcessor(default_steps(strip_attributions=False))
+    assert processor.process("Be kind. — Rumi") == "Be kind. — Rumi"
@@ -0,0 +1,86 @@
+"""
+Tests for the compiled prompt table, prompt fingerprints and batch parsing.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.api.utils import PromptBuilder, prompt_builder
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_prompts_render_from_the_table():
+    assert PromptBuilder.build_quote_prompt("motivation", topic="perseverance", length="short") == (
+        "Create a motivation quote about perseverance in about 15 words. "
+        "Write ONLY in English. Output only the quote text."
+    )
+    assert "Arabic" in PromptBuilder.build_quote_prompt("love", language="ar")
+    assert PromptBuilder.compile_prompt("unknown", "medium", "fr") is (
+        PromptBuilder.compile_prompt("random", "medium", "en")
+    )
+    with pytest.raises(ValueError):
+        PromptBuilder.build_quote_prompt("love", length="epic")
+
+
+def test_fingerprints_tell_templates_apart_but_ignore_the_topic():
+    fingerprints = {
+        PromptBuilder.fingerprint(category, length, language)
+        for category in ("love", "wisdom")
+        for length in ("short", "long")
+        for language in ("en", "ar")
+    }
+    assert len(fingerprints) == 8
+    compiled = PromptBuilder.compile_prompt("love", "short", "en")
+    assert compiled.render("rain") != compiled.render("sun")
+    assert PromptBuilder.fingerprint("love", "short", "en") == compiled.fingerprint
+
+
+def test_fingerprints_are_stable_across_processes():
+    script = "from app.api.utils import PromptBuilder; print(PromptBuilder.fingerprint('love'))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == PromptBuilder.fingerprint("love")
+
+
+def test_prompt_version_changes_the_fingerprint(monkeypatch):
+    before = prompt_builder.prompt_fingerprint("head", "tail")
+    monkeypatch.setattr(prompt_builder, "PROMPT_VERSION", prompt_builder.PROMPT_VERSION + 1)
+    assert prompt_builder.prompt_fingerprint("head", "tail") != before
+
+
+def test_batch_answers_are_split_cleaned_and_deduplicated():
+    prompt = PromptBuilder.build_batch_prompt("love", 3, length="short")
+    assert prompt.startswith("Create 3 different love quotes in about 15 words each.")
+
+    answer = (
+        "Here are your quotes:\n"
+        '1. "Love is a quiet harbor."\n'
+        "2) **Love is a quiet harbor.**\n"
+        "3. Hearts grow where kindness is sown.\n"
+        "4. Extra quote."
+    )
+    assert PromptBuilder.parse_batch_response(answer, expected=3) == [
+        "Love is a quiet harbor.",
+        "Hearts grow where kindness is sown.",
+        "Extra quote.",
+    ]
+    assert PromptBuilder.parse_batch_response(answer, expected=1) == ["Love is a quiet harbor."]
+
+
+def test_batch_prompts_come_from_the_table_and_share_its_fingerprint():
+    arabic = PromptBuilder.build_batch_prompt("love", 2, topic="rain", language="ar")
+    assert arabic.startswith("Create 2 different love quotes about rain in about 25 words each.")
+    assert "Output only the Arabic quotes" in arabic
+    assert PromptBuilder.build_batch_prompt("unknown", 2, language="fr") == (
+        PromptBuilder.build_batch_prompt("random", 2)
+    )
+    for key, compiled in PromptBuilder.PROMPT_TABLE.items():
+        assert PromptBuilder.BATCH_PROMPT_TABLE[key].fingerprint == compiled.fingerprint
+    with pytest.raises(ValueError):
+        PromptBuilder.build_batch_prompt("love", 2, length="epic")
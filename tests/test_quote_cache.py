@@ -0,0 +1,104 @@
+"""
+Tests for the response cache and its interaction with the novelty filter.
+"""
+
+import time
+
+import pytest
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import QuoteCategory, QuoteRequest
+from app.api.utils import QuoteCache
+
+
+def _key(**fields):
+    return QuoteCache.make_key(QuoteRequest(category=QuoteCategory.MOTIVATION, **fields))
+
+
+def test_equivalent_requests_share_a_key():
+    assert _key(topic="  Hope ", style="Poetic") == _key(topic="hope", style="poetic")
+    assert _key(temperature=0.81) == _key(temperature=0.79)
+    assert _key(topic="hope") != _key(topic="fear")
+    assert _key(language="en") != _key(language="ar")
+
+
+def test_hits_start_once_variants_are_full_and_rotate():
+    cache = QuoteCache(max_entries=10, ttl_seconds=60, variants_per_key=2)
+    key = _key()
+    cache.put(key, "A")
+    assert cache.get(key) is None
+    cache.put(key, "B")
+    assert [cache.get(key) for _ in range(4)] == ["A", "B", "A", "B"]
+    assert cache.stats()["hits"] == 4
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = QuoteCache(max_entries=2, ttl_seconds=60, variants_per_key=1)
+    first, second, third = _key(topic="a"), _key(topic="b"), _key(topic="c")
+    cache.put(first, "A")
+    cache.put(second, "B")
+    assert cache.get(first) == "A"  # first is now the most recently used
+    cache.put(third, "C")
+    assert cache.get(second) is None
+    assert cache.get(first) == "A"
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl_seconds = 0.01
+    cache.put(_key(topic="d"), "D")
+    time.sleep(0.02)
+    assert cache.get(_key(topic="d")) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_rejected_variants_are_dropped_and_not_counted_as_hits():
+    cache = QuoteCache(max_entries=10, ttl_seconds=60, variants_per_key=3)
+    key = _key()
+    for text in ("A", "B", "C"):
+        cache.put(key, text)
+
+    assert cache.get(key, accept=lambda text: text == "B") == "B"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["rejected"] == 1  # A was dropped on the way to B
+
+    # The key is no longer full, so it misses until a replacement is stored
+    assert cache.get(key) is None
+    cache.put(key, "D")
+    assert sorted(cache.get(key) for _ in range(3)) == ["B", "C", "D"]
+
+
+def test_no_accepted_variant_is_a_miss():
+    cache = QuoteCache(max_entries=10, ttl_seconds=60, variants_per_key=2)
+    key = _key()
+    cache.put(key, "A")
+    cache.put(key, "B")
+    assert cache.get(key, accept=lambda text: False) is None
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["rejected"] == 2
+
+
+@pytest.mark.parametrize("window", [1, 4])
+async def test_repeated_identical_requests(offline_settings, fake_client, window):
+    offline_settings.cache_variants_per_key = 3
+    offline_settings.novelty_window = window
+    controller = QuoteController(ai_client=fake_client)
+    request = QuoteRequest(category=QuoteCategory.WISDOM)
+
+    responses = [await controller.generate_quote(request) for _ in range(20)]
+
+    sources = [response.source for response in responses]
+    quotes = [response.quote for response in responses]
+    stats = controller.cache.stats()
+    # Hits are counted only for quotes actually served from the cache
+    assert stats["hits"] == sources.count("cache")
+    assert fake_client.calls == sources.count("model")
+    # No quote comes back while it is still in the novelty window
+    for i in range(len(quotes)):
+        assert quotes[i] not in quotes[max(0, i - window) : i]
+    if window == 1:
+        assert sources[3:] == ["cache"] * 17
+    else:
+        # Every cached variant is in the window, so each is dropped and the key
+        # refills with new model quotes rather than keeping stale ones
+        assert stats["rejected"] > 0
+        (entry,) = controller.cache._entries.values()
+        assert set(entry.variants) <= set(quotes[-window:])
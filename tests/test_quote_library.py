@@ -0,0 +1,104 @@
+"""
+Tests for the indexed quote library: search, journal, compaction and learning.
+"""
+
+import json
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import QuoteCategory, QuoteRequest
+from app.api.utils import LibraryRecord, QuoteLibrary
+from app.api.utils.quote_library import tokenize
+from app.config import Settings, settings
+
+
+HOPE = [
+    "Hope is the quiet light that carries us forward.",
+    "Where there is hope there is a way forward.",
+    "Hope grows in the hearts of the patient.",
+]
+
+
+def _library(path, compact_threshold: int = 100) -> QuoteLibrary:
+    return QuoteLibrary(
+        path,
+        min_score=0.8,
+        min_matches=2,
+        compact_threshold=compact_threshold,
+        refresh_interval=0,
+    )
+
+
+def test_tokenize_normalizes_and_stems():
+    assert tokenize("The Perseverance of heroes") == ["persev", "heroes"]
+    assert tokenize("persevering") == ["persev"]
+    # Diacritics, alef forms and the definite article are folded
+    assert tokenize("الأَمل") == tokenize("امل")
+
+
+def test_search_needs_enough_matching_quotes(tmp_path):
+    library = _library(tmp_path)
+    library.add(LibraryRecord(HOPE[0], "inspiration"))
+    assert library.search("hope", "inspiration") is None
+    library.add(LibraryRecord(HOPE[1], "inspiration"))
+    assert library.search("hope", "inspiration") in HOPE[:2]
+    assert library.stats()["hits"] == 1
+
+
+def test_search_filters_on_facets(tmp_path):
+    library = _library(tmp_path)
+    library.add_many(LibraryRecord(text, "inspiration") for text in HOPE)
+    assert library.search("hope", "wisdom") is None
+    assert library.search("hope", "random") in HOPE
+    assert library.search("hope", "inspiration", language="ar") is None
+    assert library.search("hope", "inspiration", style="poetic") is None
+
+
+def test_duplicates_are_skipped(tmp_path):
+    library = _library(tmp_path)
+    assert library.add_many(LibraryRecord(text, "inspiration") for text in HOPE) == 3
+    assert library.add(LibraryRecord(HOPE[0], "wisdom")) is False
+    assert len(library) == 3
+
+
+def test_compaction_keeps_quotes_searchable_after_reopening(tmp_path):
+    library = _library(tmp_path, compact_threshold=3)
+    lines = [json.dumps({"quote": text, "category": "inspiration"}) for text in HOPE]
+    assert library.import_jsonl([*lines, "not json", ""]) == (3, 1)
+    assert library.snapshot_path.exists() and not library.journal_path.exists()
+    library.close()
+
+    reopened = _library(tmp_path)
+    assert len(reopened) == 3
+    assert reopened.stats()["snapshot_quotes"] == 3
+    assert reopened.search("hope", "inspiration") in HOPE
+    reopened.close()
+
+
+def test_workers_see_each_others_additions(tmp_path):
+    first, second = _library(tmp_path), _library(tmp_path)
+    assert second.search("hope", "inspiration") is None
+    first.add_many(LibraryRecord(text, "inspiration") for text in HOPE)
+    assert second.search("hope", "inspiration") in HOPE
+
+
+async def test_generated_quotes_are_learned_and_compacted(offline_settings, fake_client):
+    offline_settings.library_enabled = True
+    offline_settings.library_compact_threshold = 2
+    offline_settings.cache_enabled = False
+    controller = QuoteController(ai_client=fake_client)
+    request = QuoteRequest(category=QuoteCategory.WISDOM, topic="patience")
+
+    for _ in range(3):
+        assert (await controller.generate_quote(request)).source == "model"
+    await controller.stop()
+
+    library = controller.library
+    assert library.snapshot_path.exists()
+    assert len(_library(library.directory)) == 3
+
+
+def test_default_directory_is_outside_the_source_tree(monkeypatch):
+    default = Settings.model_fields["library_dir"].default
+    monkeypatch.setattr(settings, "library_dir", default)
+    assert default.startswith("/tmp/")
+    assert str(QuoteLibrary().directory) == default
@@ -0,0 +1,125 @@
+"""
+Tests for the pre-generated quote pools and their background refill.
+"""
+
+import asyncio
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.utils.quote_pool import MemoryPoolStore, PoolKey, QuotePool
+
+
+KEY = PoolKey("wisdom", "en", "medium", "fingerprint")
+OTHER = PoolKey("life", "en", "medium", "fingerprint")
+
+
+class Generator:
+    """Numbers the quotes it generates; fails while ``failing`` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    async def __call__(self, key: PoolKey) -> str:
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("upstream down")
+        return f"{key.category} quote {self.calls}"
+
+
+def _pool(generator: Generator, ttl_seconds: float = 3600) -> QuotePool:
+    return QuotePool(
+        generator,
+        keys=[KEY],
+        target_size=4,
+        low_watermark=2,
+        refill_concurrency=2,
+        refill_interval=60,
+        ttl_seconds=ttl_seconds,
+        store=MemoryPoolStore(),
+    )
+
+
+async def test_refill_tops_up_pools_below_the_watermark():
+    generator = Generator()
+    pool = _pool(generator)
+    assert await pool.refill() == 0
+    assert pool.stats()["available"] == 4
+
+    pool.pop(KEY)
+    await pool.refill()  # 3 left, above the watermark
+    assert generator.calls == 4
+    pool.pop(KEY)
+    pool.pop(KEY)
+    await pool.refill()
+    assert generator.calls == 7
+    assert pool.stats()["available"] == 4
+
+
+async def test_pops_are_fifo_and_never_wait():
+    pool = _pool(Generator())
+    assert pool.pop(KEY) is None
+    await pool.refill()
+    assert [pool.pop(KEY) for _ in range(5)] == [
+        "wisdom quote 1",
+        "wisdom quote 2",
+        "wisdom quote 3",
+        "wisdom quote 4",
+        None,
+    ]
+    assert pool.stats()["hits"] == 4
+    assert pool.stats()["misses"] == 2
+
+
+async def test_unknown_pools_are_misses_without_lookups():
+    pool = _pool(Generator())
+    await pool.refill()
+    assert OTHER not in pool
+    assert pool.pop(OTHER) is None
+    assert not pool.push(OTHER, "stray")
+    assert pool.stats()["misses"] == 0
+
+
+async def test_expired_quotes_are_not_served():
+    pool = _pool(Generator(), ttl_seconds=0.01)
+    await pool.refill()
+    await asyncio.sleep(0.02)
+    assert pool.pop(KEY) is None
+
+
+async def test_failed_generations_are_counted():
+    generator = Generator()
+    generator.failing = True
+    pool = _pool(generator)
+    assert await pool.refill() == 4
+    assert pool.stats()["refill_errors"] == 4
+
+
+async def test_pop_below_the_watermark_wakes_the_refill_task():
+    generator = Generator()
+    pool = _pool(generator)
+    await pool.start()
+    try:
+        await asyncio.sleep(0.01)
+        assert pool.stats()["available"] == 4
+        for _ in range(3):
+            pool.pop(KEY)
+        await asyncio.sleep(0.01)
+        assert pool.stats()["available"] == 4
+    finally:
+        await pool.stop()
+
+
+async def test_random_quotes_are_served_from_the_pool(offline_settings, fake_client):
+    offline_settings.pool_enabled = True
+    offline_settings.pool_backend = "memory"
+    offline_settings.pool_languages = ["en"]
+    offline_settings.pool_size = 3
+    offline_settings.pool_low_watermark = 1
+    controller = QuoteController(ai_client=fake_client)
+    await controller.pool.refill()
+    calls = fake_client.calls
+
+    response = await controller.get_random_quote()
+    assert response.source == "pool"
+    assert fake_client.calls == calls
+    await controller.stop()
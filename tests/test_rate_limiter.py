@@ -0,0 +1,84 @@
+"""
+Tests for the GCRA rate limiter, its stores and client identification.
+"""
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.utils import MemoryRateLimitStore, RateLimiter, SQLiteRateLimitStore
+from app.config import settings
+
+
+def _request(headers: dict[str, str] | None = None, client: str = "10.0.0.1") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": (client, 1234),
+        }
+    )
+
+
+@pytest.fixture
+def limiter_settings(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_trust_proxy", False)
+    monkeypatch.setattr(settings, "rate_limit_api_keys", ["known-key"])
+    return settings
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_burst_then_limited_with_retry_after(backend, tmp_path, limiter_settings):
+    if backend == "memory":
+        store = MemoryRateLimitStore()
+    else:
+        store = SQLiteRateLimitStore(str(tmp_path / "rate_limits.sqlite3"))
+    limiter = RateLimiter(times=3, seconds=60, store=store)
+    request = _request()
+
+    for _ in range(3):
+        await limiter.check(request)
+    with pytest.raises(HTTPException) as exc_info:
+        await limiter.check(request)
+    assert exc_info.value.status_code == 429
+    assert 1 <= int(exc_info.value.headers["Retry-After"]) <= 20
+    assert (limiter.allowed, limiter.limited) == (3, 1)
+    await limiter.close()
+
+
+async def test_batch_cost_is_capped_at_the_burst(limiter_settings):
+    limiter = RateLimiter(times=3, seconds=60, store=MemoryRateLimitStore())
+    await limiter.check(_request(), cost=50)  # Drains the allowance instead of failing forever
+    with pytest.raises(HTTPException):
+        await limiter.check(_request())
+
+
+async def test_idle_clients_are_evicted():
+    store = MemoryRateLimitStore()
+    await store.hit("a", now=100.0, increment=1.0, tolerance=5.0)
+    await store.hit("b", now=100.0, increment=10.0, tolerance=50.0)
+    assert await store.evict_idle(now=105.0) == 1
+    assert len(store) == 1
+
+
+def test_only_configured_api_keys_identify_a_client(limiter_settings):
+    known = RateLimiter.client_key(_request({"X-API-Key": "known-key"}))
+    assert known.startswith("key:") and "known-key" not in known
+    # Made-up keys fall back to the IP, so rotating them does not reset the limit
+    assert RateLimiter.client_key(_request({"X-API-Key": "made-up"})) == "ip:10.0.0.1"
+
+
+def test_forwarded_for_ignored_unless_proxy_is_trusted(limiter_settings):
+    request = _request({"X-Forwarded-For": "1.2.3.4"})
+    assert RateLimiter.client_key(request) == "ip:10.0.0.1"
+
+
+def test_trusted_proxy_uses_the_entry_it_appended(limiter_settings):
+    limiter_settings.rate_limit_trust_proxy = True
+    # The client forged the first entry; the proxy appended the real address last
+    request = _request({"X-Forwarded-For": "1.2.3.4, 203.0.113.9"})
+    assert RateLimiter.client_key(request) == "ip:203.0.113.9"
+    assert RateLimiter.client_key(_request({"X-Forwarded-For": " "})) == "ip:10.0.0.1"
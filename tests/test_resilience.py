@@ -0,0 +1,142 @@
+"""
+Tests for hedged model calls and retries paid for from the retry budget.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import QuoteCategory, QuoteRequest
+from app.api.utils.admission import AdmissionRejected
+from app.api.utils.resilience import (
+    LatencyTracker,
+    ResilientCaller,
+    RetryBudget,
+    is_retryable,
+)
+
+
+class Attempts:
+    """Fails with the queued ``errors`` first, then answers after ``delays`` (one per call)."""
+
+    def __init__(self, errors=(), delays=()):
+        self.errors = list(errors)
+        self.delays = list(delays)
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        call = self.calls
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"attempt {call}"
+
+
+@pytest.fixture
+def fast_retries(offline_settings):
+    offline_settings.retry_backoff_base_ms = 1
+    offline_settings.retry_backoff_max_ms = 2
+    offline_settings.hedge_enabled = True
+    offline_settings.hedge_percentile = 50
+    offline_settings.hedge_min_delay_ms = 10
+    return offline_settings
+
+
+def _caller(ratio=1.0, burst=10.0, min_samples=1) -> ResilientCaller:
+    return ResilientCaller(
+        tracker=LatencyTracker(window=10, min_samples=min_samples),
+        budget=RetryBudget(ratio=ratio, burst=burst),
+        max_attempts=3,
+    )
+
+
+def test_is_retryable():
+    assert is_retryable(HTTPException(503))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(HTTPException(400))
+    assert not is_retryable(AdmissionRejected(503))
+
+
+def test_latency_percentile_waits_for_samples():
+    tracker = LatencyTracker(window=4, min_samples=2)
+    tracker.record(0.1)
+    assert tracker.percentile(50) is None
+    for seconds in (0.4, 0.2, 0.3):
+        tracker.record(seconds)
+    assert tracker.percentile(50) == 0.2
+    assert tracker.percentile(100) == 0.4
+
+
+async def test_transient_errors_are_retried(fast_retries):
+    caller, attempts = _caller(), Attempts(errors=[HTTPException(503), ConnectionError()])
+    assert await caller.call(attempts) == "attempt 3"
+    assert caller.retries == 2
+
+
+async def test_permanent_errors_are_not_retried(fast_retries):
+    caller, attempts = _caller(), Attempts(errors=[HTTPException(400)])
+    with pytest.raises(HTTPException):
+        await caller.call(attempts)
+    assert attempts.calls == 1
+
+
+async def test_empty_budget_fails_fast(fast_retries):
+    caller, attempts = _caller(ratio=0, burst=0), Attempts(errors=[TimeoutError()])
+    with pytest.raises(TimeoutError):
+        await caller.call(attempts)
+    assert attempts.calls == 1
+    assert caller.stats()["budget_exhausted"] == 1
+
+
+async def test_slow_call_is_hedged_and_the_faster_attempt_wins(fast_retries):
+    caller = _caller()
+    caller.tracker.record(0.005)
+    attempts = Attempts(delays=[0.5, 0.0])
+
+    assert await caller.call(attempts, hedge=True) == "attempt 2"
+    assert caller.hedges == 1
+    assert caller.hedge_wins == 1
+
+
+async def test_no_hedge_without_history_or_budget(fast_retries):
+    caller = _caller(min_samples=5)
+    assert await caller.call(Attempts(delays=[0.03]), hedge=True) == "attempt 1"
+
+    caller = _caller(ratio=0, burst=0)
+    caller.tracker.record(0.005)
+    assert await caller.call(Attempts(delays=[0.03, 0.0]), hedge=True) == "attempt 1"
+    assert caller.hedges == 0
+
+
+async def test_only_the_measured_backend_call_is_timed(fast_retries):
+    caller = _caller()
+
+    async def attempt() -> str:
+        await asyncio.sleep(0.03)  # Waiting for admission
+        with caller.measure():
+            return "quote"
+
+    await caller.call(attempt)
+    assert caller.tracker.percentile(100) < 0.02
+
+
+async def test_admission_wait_does_not_raise_the_hedge_percentile(offline_settings, fake_client):
+    offline_settings.cache_enabled = False
+    offline_settings.admission_enabled = True
+    offline_settings.admission_rate_per_minute = 0
+    offline_settings.admission_min_concurrency = 1
+    offline_settings.admission_max_concurrency = 1
+    offline_settings.hedge_min_samples = 1
+    fake_client.delay = 0.02
+    controller = QuoteController(ai_client=fake_client)
+
+    # One call at a time: the last caller waits ~3x the model latency for admission
+    await asyncio.gather(
+        *(controller.generate_quote(QuoteRequest(category=QuoteCategory.LIFE)) for _ in range(4))
+    )
+    assert len(controller.resilience.tracker) == 4
+    assert controller.resilience.tracker.percentile(100) < 0.04
@@ -0,0 +1,70 @@
+"""
+Tests for the fast JSON path: same bytes as FastAPI's default encoding.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.api.models import BatchQuoteResponse, QuoteResponse
+from app.api.routes import quote_routes
+from app.api.utils.serialization import ModelJSONResponse, dumps
+
+
+QUOTE = QuoteResponse(
+    quote="الصبر مفتاح الفرج — patience is the key to relief",
+    category="wisdom",
+    timestamp="2025-01-01T00:00:00Z",
+)
+
+
+class FixedController:
+    """Serves fixed responses, so both encodings can be compared byte for byte."""
+
+    async def generate_quote(self, request) -> QuoteResponse:
+        return QUOTE
+
+    async def get_random_quote(self) -> QuoteResponse:
+        return QUOTE
+
+    async def generate_batch(self, request) -> BatchQuoteResponse:
+        return BatchQuoteResponse(quotes=[QUOTE, QUOTE], count=2)
+
+
+@pytest.fixture
+def client(offline_settings, monkeypatch) -> TestClient:
+    offline_settings.rate_limit_enabled = False
+    monkeypatch.setattr(quote_routes, "_controller", FixedController())
+    app = FastAPI()
+    app.include_router(quote_routes.router)
+    return TestClient(app)
+
+
+def test_dumps_matches_starlette():
+    content = {"quote": "Ünïcode ✓", "tags": ["a", 1, 2.5, None, True]}
+    assert dumps(content) == JSONResponse(content).body
+
+
+def test_model_response_matches_default_encoding():
+    assert ModelJSONResponse(QUOTE).body == JSONResponse(QUOTE.model_dump()).body
+    assert ModelJSONResponse(b'["raw"]').body == b'["raw"]'
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body"),
+    [
+        ("GET", "/api/quotes/random", None),
+        ("POST", "/api/quotes/generate", {"category": "wisdom"}),
+        ("POST", "/api/quotes/batch", {"count": 2, "category": "wisdom"}),
+        ("GET", "/api/quotes/categories", None),
+    ],
+)
+def test_fast_json_sends_the_same_bytes(client, offline_settings, method, path, body):
+    responses = {}
+    for fast_json in (True, False):
+        offline_settings.fast_json_enabled = fast_json
+        responses[fast_json] = client.request(method, path, json=body)
+    assert responses[True].status_code == 200
+    assert responses[True].content == responses[False].content
+    assert responses[True].headers["content-type"] == responses[False].headers["content-type"]
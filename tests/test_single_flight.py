@@ -0,0 +1,103 @@
+"""
+Tests for coalescing identical in-flight generation requests.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.api.utils import SingleFlight
+
+
+class Upstream:
+    """Records the counts it was asked for and returns that many quotes."""
+
+    def __init__(self, delay: float = 0.02, short_by: int = 0):
+        self.delay = delay
+        self.short_by = short_by
+        self.counts: list[int] = []
+
+    async def __call__(self, count: int) -> list[str]:
+        self.counts.append(count)
+        await asyncio.sleep(self.delay)
+        return [f"quote {len(self.counts)}.{i}" for i in range(count - self.short_by)]
+
+
+async def test_simultaneous_callers_share_one_call_with_distinct_quotes():
+    flight, upstream = SingleFlight(window=0, max_batch=10, spare_slots=0), Upstream()
+    results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(3)))
+    assert upstream.counts == [3]
+    assert len(set(results)) == 3
+    assert flight.stats()["saved_calls"] == 2
+
+
+async def test_lone_caller_is_not_delayed_by_default():
+    flight, upstream = SingleFlight(max_batch=10, spare_slots=0), Upstream(delay=0)
+    started = time.perf_counter()
+    await flight.do("k", upstream)
+    assert time.perf_counter() - started < 0.01
+
+
+async def test_late_callers_start_their_own_call_without_spare_slots():
+    flight, upstream = SingleFlight(window=0, max_batch=10, spare_slots=0), Upstream()
+    first = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0.005)  # First call is now in flight
+    await asyncio.gather(first, flight.do("k", upstream))
+    assert upstream.counts == [1, 1]
+
+
+async def test_spare_slots_let_late_callers_join():
+    flight, upstream = SingleFlight(window=0, max_batch=10, spare_slots=1), Upstream()
+    first = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0.005)
+    results = await asyncio.gather(first, flight.do("k", upstream))
+    assert upstream.counts == [2]
+    assert results[0] != results[1]
+
+
+async def test_window_collects_callers_and_max_batch_splits_them():
+    flight, upstream = SingleFlight(window=0.01, max_batch=2, spare_slots=0), Upstream()
+    first = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0.002)
+    await asyncio.gather(first, *(flight.do("k", upstream) for _ in range(2)))
+    assert sorted(upstream.counts) == [1, 2]
+
+
+async def test_short_answer_leaves_the_last_caller_without_a_quote():
+    flight, upstream = SingleFlight(window=0, max_batch=10), Upstream(short_by=1)
+    results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(2)))
+    assert results[1] is None and results[0] is not None
+
+
+async def test_joiner_left_without_a_quote_is_not_counted_as_saved():
+    flight, upstream = SingleFlight(window=0, max_batch=10, spare_slots=0), Upstream(short_by=1)
+    await asyncio.gather(*(flight.do("k", upstream) for _ in range(3)))
+    assert flight.stats()["saved_calls"] == 1
+
+
+async def test_errors_reach_every_waiter():
+    async def failing(count: int) -> list[str]:
+        raise ConnectionError("upstream down")
+
+    flight = SingleFlight(window=0, max_batch=10)
+    results = await asyncio.gather(
+        *(flight.do("k", failing) for _ in range(2)), return_exceptions=True
+    )
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+async def test_call_is_cancelled_only_when_every_waiter_leaves():
+    flight, upstream = SingleFlight(window=0, max_batch=10), Upstream(delay=0.05)
+    waiters = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    waiters[0].cancel()
+    assert await waiters[1] is not None
+
+    waiter = asyncio.create_task(flight.do("other", upstream))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert flight.stats()["cancelled_calls"] == 1
+    assert flight.stats()["in_flight"] == 0
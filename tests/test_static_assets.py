@@ -0,0 +1,88 @@
+"""
+Tests for serving the React build: compression, ETags and cache lifetimes.
+"""
+
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.static_assets import StaticAssets, parse_accept_encoding, precompress_directory
+
+
+SCRIPT = b"console.log('swan');\n" * 200
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "static" / "js" / "main.8b2de2ef.js").write_bytes(SCRIPT)
+    (tmp_path / "index.html").write_text("<html>swan</html>")
+    (tmp_path / "favicon.ico").write_bytes(b"\0" * 10)
+    return tmp_path
+
+
+def _client(build, **kwargs) -> TestClient:
+    return TestClient(StaticAssets(build, html=True, **{"precompress": True, **kwargs}))
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=x") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "identity": 0.0,
+    }
+
+
+def test_hashed_assets_are_immutable_and_html_is_revalidated(build):
+    client = _client(build)
+    script = client.get("/static/js/main.8b2de2ef.js")
+    assert "immutable" in script.headers["cache-control"]
+    assert script.headers["content-type"].startswith(("application/javascript", "text/javascript"))
+
+    index = client.get("/")
+    assert index.text == "<html>swan</html>"
+    assert index.headers["cache-control"] == "no-cache"
+
+
+def test_compressed_once_and_served_by_accept_encoding(build):
+    app = StaticAssets(build, html=True, precompress=True)
+    client = TestClient(app)
+    plain = client.get("/static/js/main.8b2de2ef.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == SCRIPT
+
+    compressed = client.get("/static/js/main.8b2de2ef.js", headers=GZIP)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.content == SCRIPT  # Decoded by the client
+    assert compressed.headers["etag"] != plain.headers["etag"]
+    assert app.stats()["in_memory"] == 1
+
+
+def test_matching_etag_gets_304(build):
+    client = _client(build)
+    etag = client.get("/static/js/main.8b2de2ef.js", headers=GZIP).headers["etag"]
+    response = client.get("/static/js/main.8b2de2ef.js", headers={**GZIP, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_precompressed_files_are_served_from_disk_over_the_memory_limit(build):
+    precompress_directory(build, min_bytes=0)
+    assert (build / "static" / "js" / "main.8b2de2ef.js.gz").exists()
+    assert not (build / "favicon.ico.gz").exists()  # Would not save enough
+
+    app = StaticAssets(build, html=True, precompress=True, memory_limit=0)
+    response = TestClient(app).get("/static/js/main.8b2de2ef.js", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == SCRIPT
+    assert app.stats()["in_memory"] == 0
+    assert gzip.decompress((build / "static" / "js" / "main.8b2de2ef.js.gz").read_bytes()) == SCRIPT
+
+
+def test_unknown_paths_and_methods(build):
+    client = _client(build)
+    assert client.get("/missing.js").status_code == 404
+    assert client.post("/").status_code == 405
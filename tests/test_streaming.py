@@ -0,0 +1,98 @@
+"""
+Tests for streamed quotes, from the controller to the server-sent events.
+"""
+
+import json
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.controllers.quote_controller import QuoteController
+from app.api.models import QuoteCategory, QuoteRequest, QuoteResponse
+from app.api.routes import quote_routes
+from app.api.utils import BaseAIClient
+
+
+class StreamingClient(BaseAIClient):
+    """Streams ``chunks``, failing with a 503 once ``fail_after`` of them were sent."""
+
+    name = "fake-stream"
+
+    def __init__(self, chunks=("Small steps ", "carry you ", "far."), fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def generate_quote(self, prompt, max_tokens=None, temperature=None, tier=None) -> str:
+        return "".join(self.chunks)
+
+    async def stream_quote(self, prompt, max_tokens=None, temperature=None, tier=None):
+        self.calls += 1
+        for sent, chunk in enumerate(self.chunks):
+            if sent == self.fail_after:
+                raise HTTPException(503, "Model unavailable")
+            yield chunk
+
+
+@pytest.fixture
+def stream_settings(offline_settings):
+    offline_settings.cache_enabled = False
+    offline_settings.rate_limit_enabled = False
+    return offline_settings
+
+
+async def _collect(controller: QuoteController) -> tuple[list[str], QuoteResponse]:
+    items = [
+        item async for item in controller.stream_quote(QuoteRequest(category=QuoteCategory.LIFE))
+    ]
+    return items[:-1], items[-1]
+
+
+def _events(client: TestClient) -> list[tuple[str, dict]]:
+    response = client.post("/api/quotes/generate/stream", json={"category": "life"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def _client(controller: QuoteController, monkeypatch) -> TestClient:
+    monkeypatch.setattr(quote_routes, "_controller", controller)
+    app = FastAPI()
+    app.include_router(quote_routes.router)
+    return TestClient(app)
+
+
+async def test_deltas_are_followed_by_the_full_response(stream_settings):
+    deltas, response = await _collect(QuoteController(ai_client=StreamingClient()))
+    assert deltas == ["Small steps ", "carry you ", "far."]
+    assert response.quote == "Small steps carry you far."
+    assert response.source == "model"
+
+
+async def test_failure_before_the_first_delta_falls_back(stream_settings):
+    deltas, response = await _collect(QuoteController(ai_client=StreamingClient(fail_after=0)))
+    assert response.source == "fallback"
+    assert deltas == [response.quote]
+
+
+async def test_failure_after_a_delta_is_raised(stream_settings):
+    controller = QuoteController(ai_client=StreamingClient(fail_after=1))
+    with pytest.raises(HTTPException):
+        await _collect(controller)
+
+
+def test_sse_events(stream_settings, monkeypatch):
+    events = _events(_client(QuoteController(ai_client=StreamingClient()), monkeypatch))
+    assert [event for event, _ in events] == ["chunk", "chunk", "chunk", "done"]
+    assert "".join(data["text"] for _, data in events[:-1]) == events[-1][1]["quote"]
+
+
+def test_sse_error_event(stream_settings, monkeypatch):
+    controller = QuoteController(ai_client=StreamingClient(fail_after=1))
+    events = _events(_client(controller, monkeypatch))
+    assert events[0] == ("chunk", {"text": "Small steps "})
+    assert events[-1] == ("error", {"status": 503, "detail": "Model unavailable"})
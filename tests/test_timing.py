@@ -0,0 +1,50 @@
+"""
+Tests for the Server-Timing header and the sampling profiler's per-route counts.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.utils import ServerTimingMiddleware
+from app.api.utils.profiler import StackSampler
+from app.api.utils.timing import format_server_timing, record_span
+
+
+def _app(**options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        record_span("lookup", 0.002)
+        return {"id": item_id}
+
+    app.add_middleware(ServerTimingMiddleware, **options)
+    return app
+
+
+def test_format_server_timing():
+    assert format_server_timing({"model": 0.8124, "total": 1.0}) == (
+        "model;dur=812.40, total;dur=1000.00"
+    )
+
+
+def test_header_lists_spans_when_enabled():
+    response = TestClient(_app(server_timing=True)).get("/items/1")
+    assert response.headers["server-timing"].startswith("lookup;dur=2.00, total;dur=")
+
+
+def test_no_header_when_disabled():
+    response = TestClient(_app(server_timing=False)).get("/items/1")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+
+def test_profiled_requests_are_counted_per_route_template():
+    profiler = StackSampler(interval=0.001)
+    client = TestClient(_app(profiler=profiler, sample_rate=1.0, server_timing=False))
+    for item_id in range(3):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+
+    assert dict(profiler.profiled_requests) == {"/items/{item_id}": 3, "other": 1}
+    assert profiler.report()["profiled_requests"]["/items/{item_id}"] == 3